@@ -0,0 +1,164 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after `ttl` seconds (or at `expires_at`)"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, expires_at: float | None = None) -> None:
+        expires_at = time.time() + self.ttl if expires_at is None else expires_at
+        if self.maxsize <= 0 or expires_at <= time.time():
+            return
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+# --- Authenticated user cache ---
+# AuthBearer loads the user of every request from here. Entries are dropped on user
+# save/delete (accounts.signals); other processes see the change after AUTH_USER_CACHE_TTL
+# seconds, or right away when AUTH_USER_CACHE_SHARED stores version stamps in Django's cache.
+
+user_cache = TTLCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+
+
+def _version_key(user_id) -> str:
+    return f"accounts:user-version:{user_id}"
+
+
+def _user_version(user_id) -> int:
+    if not settings.AUTH_USER_CACHE_SHARED:
+        return 0
+    return cache.get(_version_key(user_id), 0)
+
+
+def _cached_copy(user_id, version):
+    entry = user_cache.get(user_id)
+    if entry is None or entry[1] != version:
+        return None
+    # views change request.auth in place; never hand out the cached instance itself
+    return copy.copy(entry[0])
+
+
+def _store(user, version):
+    if user is None:
+        return None
+    user_cache.set(user.pk, (user, version))
+    return copy.copy(user)
+
+
+def get_cached_user(user_id):
+    """Return a copy of the user with this id (None if it does not exist)"""
+    version = _user_version(user_id)
+    user = _cached_copy(user_id, version)
+    if user is None:
+        user = _store(get_user_model().objects.filter(id=user_id).first(), version)
+    return user
+
+
+async def aget_cached_user(user_id):
+    """Async version of get_cached_user"""
+    version = await cache.aget(_version_key(user_id), 0) if settings.AUTH_USER_CACHE_SHARED else 0
+    user = _cached_copy(user_id, version)
+    if user is None:
+        user = _store(await get_user_model().objects.filter(id=user_id).afirst(), version)
+    return user
+
+
+def invalidate_user(user_id) -> None:
+    user_cache.pop(user_id)
+    if settings.AUTH_USER_CACHE_SHARED:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), 1, None)
+
+
+# --- Security versions (claims in access tokens) ---
+# Current User.security_version by user id in Django's cache, -1 for inactive or deleted
+# users. accounts.signals writes the new value once each save commits, so a worker sharing the
+# cache sees a deactivation right away; others once their entry expires. Reads only fill
+# missing entries, so a row read before that commit never replaces the committed value.
+
+def _security_key(user_id) -> str:
+    return f"accounts:security-version:{user_id}"
+
+
+def _security_timeout():
+    return None if settings.AUTH_USER_CACHE_SHARED else settings.AUTH_USER_CACHE_TTL
+
+
+def _current_security_version(row) -> int:
+    return -1 if row is None or not row[1] else row[0]
+
+
+def get_security_version(user_id) -> int:
+    """Security version of the user, -1 if it is inactive or does not exist"""
+    version = cache.get(_security_key(user_id))
+    if version is None:
+        row = get_user_model().objects.filter(id=user_id).values_list("security_version", "is_active").first()
+        version = _current_security_version(row)
+        # add, not set: a value written meanwhile by a commit is newer than the row read here
+        if not cache.add(_security_key(user_id), version, _security_timeout()):
+            version = cache.get(_security_key(user_id), version)
+    return version
+
+
+async def aget_security_version(user_id) -> int:
+    """Async version of get_security_version"""
+    version = await cache.aget(_security_key(user_id))
+    if version is None:
+        row = await get_user_model().objects.filter(id=user_id).values_list("security_version", "is_active").afirst()
+        version = _current_security_version(row)
+        if not await cache.aadd(_security_key(user_id), version, _security_timeout()):
+            version = await cache.aget(_security_key(user_id), version)
+    return version
+
+
+def set_security_version(user) -> None:
+    cache.set(_security_key(user.pk), _current_security_version((user.security_version, user.is_active)),
+              _security_timeout())
+
+
+def drop_security_version(user_id) -> None:
+    cache.set(_security_key(user_id), -1, _security_timeout())
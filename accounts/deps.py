@@ -1,22 +1,82 @@
+from uuid import UUID
+
 from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
 from ninja.security import HttpBearer
 
+from accounts.cache import aget_cached_user, aget_security_version, get_cached_user, get_security_version
 from accounts.utils import decode_token
 
-User = get_user_model()
 
 class AuthBearer(HttpBearer):
     def authenticate(self, request, token):
         payload = decode_token(token)
         if not payload or payload.get("type") != "access":
             return None
-        try:
-            user = User.objects.get(id=payload["user_id"])
-            if not user.is_active:
-                return None
-            return user
-        except User.DoesNotExist:
+        user = get_cached_user(payload["user_id"])
+        if user is None or not user.is_active:
+            return None
+        return user
+
+
+class AsyncAuthBearer(HttpBearer):
+    """AuthBearer for async views: the user comes from the cache or the async ORM"""
+
+    async def authenticate(self, request, token):
+        payload = decode_token(token)
+        if not payload or payload.get("type") != "access":
+            return None
+        user = await aget_cached_user(payload["user_id"])
+        if user is None or not user.is_active:
+            return None
+        return user
+
+
+# --- Claims (ACCESS_TOKEN_CLAIMS) ---
+# For routes that only need who the user is and whether they are staff: a token carrying
+# claims gives a principal without loading the user; other tokens fall back to AuthBearer.
+
+def _has_claims(payload: dict) -> bool:
+    return all(claim in payload for claim in ("uuid", "is_staff", "ver"))
+
+
+def token_principal(payload: dict):
+    """
+    User built from the claims, without a query. Only id, uuid, is_staff and is_active are
+    loaded; like with .only(), any other field is read from the database when accessed
+    """
+    User = get_user_model()
+    loaded = {"id": payload["user_id"], "uuid": UUID(payload["uuid"]), "is_staff": payload["is_staff"],
+              "is_active": True}
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+    return User.from_db(DEFAULT_DB_ALIAS, fields, [loaded[field] for field in fields])
+
+
+class ClaimsBearer(AuthBearer):
+    def authenticate(self, request, token):
+        payload = decode_token(token)
+        if not payload or payload.get("type") != "access":
+            return None
+        if not _has_claims(payload):
+            return super().authenticate(request, token)
+        # deactivated, deleted or is_staff changed since the token was issued: log in again
+        if get_security_version(payload["user_id"]) != payload["ver"]:
+            return None
+        return token_principal(payload)
+
+
+class AsyncClaimsBearer(AsyncAuthBearer):
+    """ClaimsBearer for async views"""
+
+    async def authenticate(self, request, token):
+        payload = decode_token(token)
+        if not payload or payload.get("type") != "access":
+            return None
+        if not _has_claims(payload):
+            return await super().authenticate(request, token)
+        if await aget_security_version(payload["user_id"]) != payload["ver"]:
             return None
+        return token_principal(payload)
 
 
 auth = AuthBearer()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.tokens import purge_refresh_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired refresh tokens from the rotation table"
+
+    def handle(self, *args, **options):
+        deleted = purge_refresh_tokens()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired refresh tokens"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0006_refreshtoken"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="security_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -8,6 +8,48 @@ class User(AbstractUser):
     # extra field (optional)
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     cpf = models.CharField(max_length=11, unique=True, null=True, blank=True)
+    # bumped whenever one of SECURITY_FIELDS changes: access tokens carrying claims of an
+    # older version (ACCESS_TOKEN_CLAIMS) are refused, so the user logs in again
+    security_version = models.PositiveIntegerField(default=0)
+
+    SECURITY_FIELDS = ("is_active", "is_staff", "is_superuser")
 
     def __str__(self):
         return self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._loaded_security = user._security_values()
+        return user
+
+    def _security_values(self) -> tuple:
+        # read from __dict__: deferred fields are not loaded just to compare them
+        return tuple(self.__dict__.get(field) for field in self.SECURITY_FIELDS)
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, "_loaded_security", None)
+        if loaded is not None and loaded != self._security_values():
+            self.security_version += 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "security_version"}
+        super().save(*args, **kwargs)
+        self._loaded_security = self._security_values()
+
+
+class RefreshToken(models.Model):
+    """
+    Issued refresh tokens (accounts.tokens). Every refresh uses its token up and issues the
+    next one of the same family; presenting a used token again revokes the whole family
+    """
+    jti = models.UUIDField(unique=True)
+    family = models.UUIDField(db_index=True)
+    # plain id, not a foreign key: tokens of deleted users are simply never accepted again
+    user_id = models.BigIntegerField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    used_at = models.DateTimeField(null=True, blank=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return str(self.jti)
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password, verify_password
+
+
+class PasswordHashingBusy(Exception):
+    """The hashing pool is full: the request is refused (503) instead of waiting in line"""
+
+
+class PasswordHashPool:
+    """
+    Bounded thread pool for the password hashing of the async auth views. Django's async
+    password helpers hash on the event loop (or on the one thread of sync_to_async), so a
+    login spike stalls every other request of the worker. argon2-cffi, bcrypt and hashlib's
+    PBKDF2 release the GIL while hashing, so threads hash in parallel.
+
+    At most PASSWORD_HASH_WORKERS jobs run and PASSWORD_HASH_QUEUE_SIZE wait; past that,
+    run() raises PasswordHashingBusy right away
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self.pending = 0  # running + waiting
+        self.rejected = 0
+
+    def _release(self, future) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.pending >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE:
+                self.rejected += 1
+                raise PasswordHashingBusy
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash",
+                )
+            self.pending += 1
+            future = self._executor.submit(func, *args)
+        # released when the job ends, not when the caller stops waiting (e.g. client gone)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        return {
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "queue_size": settings.PASSWORD_HASH_QUEUE_SIZE,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hashing = PasswordHashPool()
+
+
+async def acheck_user_password(user, raw_password: str) -> bool:
+    """check_password() hashing on the pool; an outdated hash is replaced, as in check_password()"""
+    is_correct, must_update = await password_hashing.run(verify_password, raw_password, user.password)
+    if is_correct and must_update:
+        await aset_user_password(user, raw_password)
+        await user.asave(update_fields=["password"])
+    return is_correct
+
+
+async def aset_user_password(user, raw_password: str) -> None:
+    """set_password() hashing on the pool (the user is not saved)"""
+    user.password = await password_hashing.run(make_password, raw_password)
+    user._password = raw_password  # like set_password(): password validators are told after save()
+
+
+async def aauthenticate(username: str, password: str):
+    """authenticate() with ModelBackend's rules, hashing on the pool. Returns the user or None"""
+    User = get_user_model()
+    user = await User._default_manager.filter(**{User.USERNAME_FIELD: username}).afirst()
+    if user is None:
+        # hash anyway, so an unknown username takes as long as a wrong password (as ModelBackend)
+        await password_hashing.run(make_password, password)
+        return None
+    if not await acheck_user_password(user, password) or not user.is_active:
+        return None
+    return user
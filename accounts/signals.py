@@ -0,0 +1,31 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.cache import drop_security_version, invalidate_user, set_security_version
+
+User = get_user_model()
+
+
+# save() covers profile updates, deactivation and password changes. Dropped right away for
+# this connection, and again on commit: until then other requests still read and cache the
+# old row
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, using, **kwargs):
+    invalidate_user(instance.pk)
+    transaction.on_commit(partial(invalidate_user, instance.pk), using=using)
+
+
+# after the commit: until then other connections still read the old row
+@receiver(post_save, sender=User)
+def store_security_version(sender, instance, using, **kwargs):
+    transaction.on_commit(partial(set_security_version, instance), using=using)
+
+
+@receiver(post_delete, sender=User)
+def drop_deleted_security_version(sender, instance, using, **kwargs):
+    transaction.on_commit(partial(drop_security_version, instance.pk), using=using)
@@ -1,8 +1,24 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+
+import jwt
 import pytest
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from accounts.utils import create_refresh_token, decode_token
+from accounts import cache as accounts_cache, tokens
+from accounts.cache import get_security_version, user_cache
+from accounts.models import RefreshToken
+from accounts.utils import (
+    ALGORITHM, SECRET_KEY, create_access_token, create_refresh_token, decode_token, token_cache_stats,
+)
 
 User = get_user_model()
 
@@ -246,6 +262,80 @@ def test_login_inactive_user(client, user):
     assert "error" in response_data
 
 
+# --- TESTES PARA OS HASHERS DE SENHA ---
+
+@pytest.fixture
+def hasher_stack(settings):
+    """Argon2 para senhas novas; PBKDF2 (com poucas iterações) só para hashes antigos"""
+    settings.PASSWORD_HASHERS = [
+        "accounts.hashers.Argon2PasswordHasher",
+        "accounts.hashers.BCryptSHA256PasswordHasher",
+        "accounts.hashers.PBKDF2PasswordHasher",
+    ]
+    settings.PASSWORD_PBKDF2_ITERATIONS = 1000
+    return settings
+
+
+def _login(client, username="testuser", password="testpass123"):
+    return client.post("/api/auth/login", data={"username": username, "password": password},
+                       content_type="application/json")
+
+
+@pytest.mark.django_db
+def test_signup_hashes_with_preferred_hasher(client, hasher_stack):
+    """Testa que senhas novas usam o hasher preferido com os custos configurados"""
+    hasher_stack.PASSWORD_ARGON2_TIME_COST = 3
+    data = {"username": "newuser", "email": "newuser@example.com", "password": "newpass123",
+            "first_name": "New", "last_name": "User", "cpf": "98765432100"}
+    client.post("/api/auth/signup", data=data, content_type="application/json")
+
+    user = User.objects.get(username="newuser")
+    assert user.password.startswith("argon2$argon2id$")
+    assert "t=3" in user.password
+    assert user.check_password("newpass123")
+
+
+@pytest.mark.django_db
+def test_login_rehashes_legacy_password(client, user, hasher_stack):
+    """Testa que o login converte um hash PBKDF2 antigo para o hasher preferido"""
+    user.password = make_password("testpass123", hasher="pbkdf2_sha256")
+    user.save(update_fields=["password"])
+
+    assert _login(client).status_code == 200
+
+    user.refresh_from_db()
+    assert user.password.startswith("argon2$")
+    assert _login(client).status_code == 200
+
+
+@pytest.mark.django_db
+def test_login_rehashes_when_cost_changes(client, user, hasher_stack):
+    """Testa que mudar o custo do Argon2 refaz o hash no próximo login, e só nele"""
+    user.password = make_password("testpass123")
+    user.save(update_fields=["password"])
+    hasher_stack.PASSWORD_ARGON2_MEMORY_COST = 8192
+
+    assert _login(client).status_code == 200
+    user.refresh_from_db()
+    assert "m=8192" in user.password
+
+    rehashed = user.password
+    assert _login(client).status_code == 200
+    user.refresh_from_db()
+    assert user.password == rehashed
+
+
+@pytest.mark.django_db
+def test_login_wrong_password_keeps_legacy_hash(client, user, hasher_stack):
+    """Testa que uma senha errada não altera o hash guardado"""
+    user.password = make_password("testpass123", hasher="pbkdf2_sha256")
+    user.save(update_fields=["password"])
+
+    assert _login(client, password="wrong").status_code == 401
+    user.refresh_from_db()
+    assert user.password.startswith("pbkdf2_sha256$1000$")
+
+
 # --- TESTES PARA REFRESH TOKEN ---
 
 @pytest.mark.django_db
@@ -299,7 +389,6 @@ def test_refresh_token_invalid_token(client):
 @pytest.mark.django_db
 def test_refresh_token_with_access_token(client, user):
     """Testa renovação usando access token ao invés de refresh token"""
-    from accounts.utils import create_access_token
     access_token = create_access_token(user.id)
 
     data = {
@@ -337,10 +426,6 @@ def test_refresh_token_expired(client, user):
     """Testa renovação com token expirado"""
     # Este teste documenta o comportamento com token expirado
     # A implementação real depende de como decode_token trata tokens expirados
-    import jwt
-    from accounts.utils import SECRET_KEY, ALGORITHM
-    from datetime import datetime, timedelta
-
     expired_payload = {
         "user_id": user.id,
         "type": "refresh",
@@ -385,3 +470,361 @@ def test_refresh_token_nonexistent_user(client):
     response_data = response.json()
     assert "access" in response_data
     assert "refresh" in response_data
+
+
+# --- TESTES PARA ROTAÇÃO E REVOGAÇÃO DE REFRESH TOKENS ---
+
+def _refresh(client, token):
+    return client.post("/api/auth/refresh", data={"refresh": token}, content_type="application/json")
+
+
+@pytest.mark.django_db
+def test_refresh_rotates_token_in_same_family(client, user):
+    """Testa que o refresh consome o token e emite o próximo da mesma família"""
+    old = create_refresh_token(user.id)
+
+    response = _refresh(client, old)
+
+    assert response.status_code == 200
+    new = response.json()["refresh"]
+    assert decode_token(new)["fam"] == decode_token(old)["fam"]
+    assert decode_token(new)["jti"] != decode_token(old)["jti"]
+    assert RefreshToken.objects.get(jti=decode_token(old)["jti"]).used_at is not None
+    assert _refresh(client, new).status_code == 200
+
+
+@pytest.mark.django_db
+def test_refresh_reuse_revokes_family(client, user):
+    """Testa que reapresentar um token usado revoga a família inteira"""
+    old = create_refresh_token(user.id)
+    new = _refresh(client, old).json()["refresh"]
+
+    assert _refresh(client, old).status_code == 401
+    # o token legítimo emitido depois também deixa de valer
+    assert _refresh(client, new).status_code == 401
+    family = decode_token(old)["fam"]
+    assert not RefreshToken.objects.filter(family=family, revoked_at__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_refresh_reuse_detected_without_cache(client, user):
+    """Testa que outro worker (sem o cache local) também detecta a reutilização pelo banco"""
+    old = create_refresh_token(user.id)
+    new = _refresh(client, old).json()["refresh"]
+    tokens._revoked.clear()
+
+    assert _refresh(client, old).status_code == 401
+    tokens._revoked.clear()
+    assert _refresh(client, new).status_code == 401
+
+
+@pytest.mark.django_db
+def test_refresh_refused_when_family_has_revoked_token(client, user):
+    """Testa que um token ainda válido é recusado se a família já tem um token revogado (logout concorrente)"""
+    old = create_refresh_token(user.id)
+    new = _refresh(client, old).json()["refresh"]
+    # o logout revogou a família antes de o refresh concorrente inserir o novo token
+    RefreshToken.objects.filter(jti=decode_token(old)["jti"]).update(revoked_at=datetime.now(UTC))
+    tokens._revoked.clear()
+
+    assert _refresh(client, new).status_code == 401
+    assert not RefreshToken.objects.filter(family=decode_token(old)["fam"], revoked_at__isnull=True).exists()
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="concurrent writers require PostgreSQL")
+@pytest.mark.django_db(transaction=True)
+def test_refresh_logout_race(user):
+    """Testa que, entre refresh e logout concorrentes, nenhum token da família sobrevive ao logout"""
+    def run(func, *args):
+        try:
+            return func(*args)
+        finally:
+            connection.close()
+
+    for _ in range(10):
+        token = tokens.new_refresh_token(user.id)
+        token.save()
+        payload = {"user_id": user.id, "jti": str(token.jti), "fam": str(token.family)}
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            executor.submit(run, tokens.rotate_refresh_token, payload)
+            executor.submit(run, tokens.revoke_family, token.family)
+
+        assert not RefreshToken.objects.filter(family=token.family, revoked_at__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_refresh_revoked_family_no_queries(client, user, django_assert_num_queries):
+    """Testa que um token de família revogada é recusado sem consultar o banco"""
+    token = create_refresh_token(user.id)
+    client.post("/api/auth/logout", data={"refresh": token}, content_type="application/json")
+
+    with django_assert_num_queries(0):
+        assert _refresh(client, token).status_code == 401
+
+
+@pytest.mark.django_db
+def test_refresh_legacy_token_rejected(client, user):
+    """Testa que refresh tokens sem jti (emitidos antes da rotação) são recusados"""
+    legacy = jwt.encode({"user_id": user.id, "type": "refresh", "exp": datetime.now(UTC) + timedelta(days=1)},
+                        SECRET_KEY, algorithm=ALGORITHM)
+
+    assert _refresh(client, legacy).status_code == 401
+
+
+@pytest.mark.django_db
+def test_logout_revokes_refresh_token(client, user):
+    """Testa que o logout revoga o refresh token"""
+    token = create_refresh_token(user.id)
+
+    response = client.post("/api/auth/logout", data={"refresh": token}, content_type="application/json")
+
+    assert response.status_code == 204
+    assert _refresh(client, token).status_code == 401
+
+
+@pytest.mark.django_db
+def test_logout_invalid_token(client):
+    """Testa logout com token inválido"""
+    response = client.post("/api/auth/logout", data={"refresh": "invalid.token.here"},
+                           content_type="application/json")
+
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_change_password_revokes_refresh_tokens(client, user):
+    """Testa que trocar a senha revoga os refresh tokens de todas as sessões"""
+    token = create_refresh_token(user.id)
+    other_session = create_refresh_token(user.id)
+
+    response = client.post(
+        "/api/users/me/change-password",
+        data={"old_password": "testpass123", "new_password": "newpass456"},
+        content_type="application/json",
+        HTTP_AUTHORIZATION=f"Bearer {create_access_token(user.id)}",
+    )
+
+    assert response.json()["success"] is True
+    assert _refresh(client, token).status_code == 401
+    assert _refresh(client, other_session).status_code == 401
+
+
+@pytest.mark.django_db
+def test_purge_refresh_tokens_command(user):
+    """Testa que o comando apaga apenas os refresh tokens expirados"""
+    create_refresh_token(user.id)
+    expired = decode_token(create_refresh_token(user.id))["jti"]
+    RefreshToken.objects.filter(jti=expired).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    call_command("purge_refresh_tokens", stdout=io.StringIO())
+
+    assert RefreshToken.objects.count() == 1
+    assert not RefreshToken.objects.filter(jti=expired).exists()
+
+
+# --- TESTES PARA O CACHE DE TOKENS DECODIFICADOS ---
+
+def test_decode_token_cached_until_expiration(mocker):
+    """Testa que um token repetido é decodificado uma única vez"""
+    token = create_access_token(12345)
+    spy = mocker.spy(jwt, "decode")
+    hits = token_cache_stats()["hits"]
+
+    first = decode_token(token)
+    second = decode_token(token)
+
+    assert first == second
+    assert first["user_id"] == 12345
+    assert spy.call_count == 1
+    assert token_cache_stats()["hits"] == hits + 1
+
+
+def test_decode_token_cache_returns_copies():
+    """Testa que alterar o payload retornado não contamina o cache"""
+    token = create_access_token(54321)
+
+    decode_token(token)["user_id"] = 0
+
+    assert decode_token(token)["user_id"] == 54321
+
+
+def test_decode_token_cache_respects_expiration(mocker):
+    """Testa que o cache não guarda o token além da sua expiração"""
+    token = create_access_token(777)
+    payload = decode_token(token)
+    spy = mocker.spy(jwt, "decode")
+
+    mocker.patch("accounts.cache.time.time", return_value=payload["exp"] + 1)
+    decode_token(token)
+
+    # entrada expirada: o token volta a ser verificado (e rejeitado) pelo PyJWT
+    assert spy.call_count == 1
+
+
+def test_decode_token_tampered_not_cached():
+    """Testa que tokens com assinatura inválida continuam rejeitados"""
+    token = create_access_token(888)
+    decode_token(token)
+
+    header, body, signature = token.split(".")
+    tampered = ".".join([header, body, signature[::-1]])
+
+    assert decode_token(tampered) is None
+
+
+# --- TESTES PARA CLAIMS NO ACCESS TOKEN ---
+
+@pytest.fixture
+def claims(settings):
+    settings.ACCESS_TOKEN_CLAIMS = True
+    return settings
+
+
+def _claims_headers(client, username="testuser", password="testpass123"):
+    access = _login(client, username, password).json()["access"]
+    return {"HTTP_AUTHORIZATION": f"Bearer {access}"}
+
+
+@pytest.mark.django_db
+def test_login_without_claims_by_default(client, user):
+    """Testa que, sem ACCESS_TOKEN_CLAIMS, o access token só carrega o user_id"""
+    payload = decode_token(_login(client).json()["access"])
+
+    assert "is_staff" not in payload
+    assert "ver" not in payload
+
+
+@pytest.mark.django_db
+def test_login_with_claims(client, user, claims):
+    """Testa que o access token carrega uuid, is_staff e a versão de segurança"""
+    payload = decode_token(_login(client).json()["access"])
+
+    assert payload["uuid"] == str(user.uuid)
+    assert payload["is_staff"] is False
+    assert payload["ver"] == user.security_version
+
+
+@pytest.mark.django_db
+def test_claims_read_route_does_not_query_users(client, user, claims):
+    """Testa que uma rota de leitura com ClaimsBearer não consulta a tabela de usuários"""
+    headers = _claims_headers(client)
+    client.get("/api/orders/", **headers)  # the first request caches the security version
+    user_cache.clear()
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get("/api/orders/", **headers)
+
+    assert response.status_code == 200
+    assert not any("accounts_user" in query["sql"] for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_claims_staff_route(client, claims):
+    """Testa que o is_staff do token libera as rotas de staff"""
+    User.objects.create_user(username="staff", password="staffpass123", is_staff=True)
+
+    response = client.get("/api/orders/admin", **_claims_headers(client, "staff", "staffpass123"))
+
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_claims_deactivation_forces_login(client, user, claims, django_capture_on_commit_callbacks):
+    """Testa que desativar o usuário invalida os access tokens com claims"""
+    headers = _claims_headers(client)
+    assert client.get("/api/orders/", **headers).status_code == 200
+
+    user.is_active = False
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+
+    assert client.get("/api/orders/", **headers).status_code == 401
+
+
+@pytest.mark.django_db
+def test_claims_staff_change_forces_login(client, claims, django_capture_on_commit_callbacks):
+    """Testa que retirar o is_staff invalida o token antigo, que dizia ser staff"""
+    staff = User.objects.create_user(username="staff", password="staffpass123", is_staff=True)
+    headers = _claims_headers(client, "staff", "staffpass123")
+
+    staff.is_staff = False
+    with django_capture_on_commit_callbacks(execute=True):
+        staff.save()
+
+    assert client.get("/api/orders/admin", **headers).status_code == 401
+    assert client.get("/api/orders/admin", **_claims_headers(client, "staff", "staffpass123")).status_code == 403
+
+
+@pytest.mark.django_db
+def test_claims_version_read_from_database_on_cache_miss(client, user, claims):
+    """Testa que, sem a versão no cache, ela é lida do banco e a desativação continua valendo"""
+    headers = _claims_headers(client)
+    User.objects.filter(id=user.id).update(is_active=False)
+    cache.clear()
+
+    assert client.get("/api/orders/", **headers).status_code == 401
+
+
+@pytest.mark.django_db
+def test_security_version_written_after_commit(user, claims, django_capture_on_commit_callbacks):
+    """Testa que o novo valor só vai para o cache no commit da transação que o salvou"""
+    cache.clear()
+    user.is_active = False
+    with django_capture_on_commit_callbacks() as callbacks:
+        user.save()
+        # antes do commit, outras conexões ainda leem a linha antiga
+        assert cache.get(f"accounts:security-version:{user.id}") is None
+
+    callbacks[-1]()
+    assert get_security_version(user.id) == -1
+
+
+@pytest.mark.django_db
+def test_security_version_read_does_not_overwrite_commit(user, claims, django_capture_on_commit_callbacks, mocker):
+    """Testa que uma leitura da linha antiga, intercalada com a desativação, não sobrescreve o cache"""
+    cache.clear()
+    current = accounts_cache._current_security_version
+
+    def deactivate_after_read(row):
+        # o leitor já leu a linha ativa; a desativação faz commit antes de ele gravar no cache
+        if user.is_active:
+            user.is_active = False
+            with django_capture_on_commit_callbacks(execute=True):
+                user.save()
+        return current(row)
+
+    mocker.patch("accounts.cache._current_security_version", side_effect=deactivate_after_read)
+    assert accounts_cache.get_security_version(user.id) == -1
+    mocker.stopall()
+
+    assert accounts_cache.get_security_version(user.id) == -1
+
+
+@pytest.mark.django_db
+def test_security_version_ignores_profile_changes(user):
+    """Testa que só mudanças de is_active/is_staff/is_superuser alteram a versão de segurança"""
+    user.first_name = "Other"
+    user.save()
+    assert user.security_version == 0
+
+    user = User.objects.get(id=user.id)
+    user.is_staff = True
+    user.save(update_fields=["is_staff"])
+
+    user.refresh_from_db()
+    assert user.security_version == 1
+
+
+@pytest.mark.django_db
+def test_refresh_with_claims(client, user, claims, django_capture_on_commit_callbacks):
+    """Testa que o refresh emite access tokens com claims atuais e recusa usuários desativados"""
+    refresh = _login(client).json()["refresh"]
+    response = _refresh(client, refresh)
+
+    assert response.status_code == 200
+    assert decode_token(response.json()["access"])["ver"] == user.security_version
+
+    user.is_active = False
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+    assert _refresh(client, response.json()["refresh"]).status_code == 401
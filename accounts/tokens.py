@@ -0,0 +1,110 @@
+import uuid
+from datetime import datetime, timedelta, UTC
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from accounts.cache import TTLCache
+from accounts.models import RefreshToken
+
+# --- Refresh token rotation ---
+# Each refresh token carries a jti (its row in RefreshToken) and a family (the login it
+# descends from). A refresh marks its jti used with one conditional UPDATE and issues the
+# next token of the family; a token that is presented again (stolen and replayed, or
+# replayed by the thief after the owner refreshed) revokes the whole family.
+#
+# Used jtis and revoked families are remembered here until they would have expired, so
+# replays and refreshes of logged-out sessions are answered without touching the database.
+# The database stays authoritative: a worker that has not seen a revocation still fails
+# the conditional UPDATE.
+#
+# Rotations and revocations of a family lock its oldest row first. A rotation that waited
+# for a revocation sees it and is refused; a revocation that waited for a rotation also
+# revokes the token that rotation issued.
+
+_revoked = TTLCache(maxsize=settings.REVOKED_TOKEN_CACHE_SIZE, ttl=0)
+
+
+def _lifetime() -> timedelta:
+    return timedelta(days=settings.REFRESH_TOKEN_LIFETIME_DAYS)
+
+
+def _forget_until_expired(key: str) -> None:
+    _revoked.set(key, True, expires_at=(datetime.now(UTC) + _lifetime()).timestamp())
+
+
+def new_refresh_token(user_id: int, family: str | None = None) -> RefreshToken:
+    """Unsaved row of a new refresh token, in a new family unless one is given"""
+    return RefreshToken(jti=uuid.uuid4(), family=family or uuid.uuid4(), user_id=user_id,
+                        expires_at=datetime.now(UTC) + _lifetime())
+
+
+def rotate_refresh_token(payload: dict) -> RefreshToken | None:
+    """
+    Use up the refresh token of this payload and save the next one of its family. Returns
+    None when the token may not be used (then a replayed token revokes its family)
+    """
+    jti, family = payload.get("jti"), payload.get("fam")
+    if not jti or not family:
+        return None  # issued before rotation: the user logs in again
+    if _revoked.get(family):
+        return None
+    if _revoked.get(jti):
+        revoke_family(family)  # used before: a replay
+        return None
+    with transaction.atomic():
+        _lock_families([family])
+        revoked = RefreshToken.objects.filter(family=OuterRef("family"), revoked_at__isnull=False)
+        used = RefreshToken.objects.filter(
+            ~Exists(revoked), jti=jti, used_at__isnull=True, revoked_at__isnull=True,
+        ).update(used_at=datetime.now(UTC))
+        if used:
+            token = new_refresh_token(payload["user_id"], family)
+            token.save()
+    if not used:
+        # used in another worker, revoked, or purged: a replay as far as this family goes
+        revoke_family(family)
+        return None
+    _forget_until_expired(jti)
+    return token
+
+
+def _lock_families(families) -> None:
+    # the oldest row of each family, in id order (the same order everywhere: no deadlocks);
+    # no-op on backends without SELECT ... FOR UPDATE
+    oldest = (
+        RefreshToken.objects.filter(family=OuterRef("family")).order_by("id").values("id")[:1]
+    )
+    list(RefreshToken.objects.select_for_update().filter(family__in=families, id=oldest).order_by("id")
+         .values_list("id", flat=True))
+
+
+def revoke_family(family: str) -> None:
+    """Refuse every token of a login (logout, reuse detected)"""
+    with transaction.atomic():
+        _lock_families([family])
+        RefreshToken.objects.filter(family=family, revoked_at__isnull=True).update(revoked_at=datetime.now(UTC))
+    _forget_until_expired(str(family))
+
+
+def revoke_user_tokens(user_id: int) -> None:
+    """Refuse every refresh token of the user (password change)"""
+    with transaction.atomic():
+        tokens = RefreshToken.objects.filter(user_id=user_id, revoked_at__isnull=True)
+        families = set(tokens.values_list("family", flat=True))
+        _lock_families(families)
+        tokens.update(revoked_at=datetime.now(UTC))
+    for family in families:
+        _forget_until_expired(str(family))
+
+
+def revoked_token_stats() -> dict:
+    """Hit/miss counters of the used/revoked token cache"""
+    return _revoked.stats()
+
+
+def purge_refresh_tokens() -> int:
+    """Delete the rows of expired refresh tokens (they are refused by their exp anyway)"""
+    deleted, _ = RefreshToken.objects.filter(expires_at__lte=datetime.now(UTC)).delete()
+    return deleted
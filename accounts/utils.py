@@ -1,37 +1,81 @@
+import hashlib
+
 import jwt
 from django.conf import settings
 from datetime import datetime, timedelta, UTC
 
+from accounts.cache import TTLCache
+from accounts.tokens import new_refresh_token
+
 # use the Django SECRET_KEY
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 
+# Verified payloads by token digest, kept until the token expires: clients reuse the same
+# access token for its whole lifetime, so repeat requests skip signature check and parsing.
+_decoded_tokens = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=0)
+
 
 # --- Utility functions ---
-def create_access_token(user_id: int):
+def create_access_token(user_id: int, claims: dict | None = None):
     payload = {
         "user_id": user_id,
         "type": "access",
         "exp": datetime.now(UTC) + timedelta(minutes=settings.ACCESS_TOKEN_LIFETIME_MINUTES),
         "iat": datetime.now(UTC),
+        **(claims or {}),
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def create_refresh_token(user_id: int):
+def access_token_claims(user) -> dict:
+    """Claims read by ClaimsBearer (accounts.deps), empty unless ACCESS_TOKEN_CLAIMS is on"""
+    if not settings.ACCESS_TOKEN_CLAIMS:
+        return {}
+    return {"uuid": str(user.uuid), "is_staff": user.is_staff, "ver": user.security_version}
+
+
+def encode_refresh_token(token) -> str:
     payload = {
-        "user_id": user_id,
+        "user_id": token.user_id,
         "type": "refresh",
-        "exp": datetime.now(UTC) + timedelta(days=settings.REFRESH_TOKEN_LIFETIME_DAYS),
+        "jti": str(token.jti),
+        "fam": str(token.family),
+        "exp": token.expires_at,
         "iat": datetime.now(UTC),
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def create_refresh_token(user_id: int, family: str | None = None):
+    """Refresh token recorded for rotation (accounts.tokens); a new login family unless one is given"""
+    token = new_refresh_token(user_id, family)
+    token.save()
+    return encode_refresh_token(token)
+
+
+async def acreate_refresh_token(user_id: int, family: str | None = None):
+    """Async version of create_refresh_token"""
+    token = new_refresh_token(user_id, family)
+    await token.asave()
+    return encode_refresh_token(token)
+
+
 def decode_token(token: str):
-    try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except jwt.ExpiredSignatureError:
-        return None
-    except jwt.InvalidTokenError:
-        return None
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _decoded_tokens.get(key)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            return None
+        except jwt.InvalidTokenError:
+            return None
+        if "exp" in payload:
+            _decoded_tokens.set(key, payload, expires_at=payload["exp"])
+    return dict(payload)
+
+
+def token_cache_stats() -> dict:
+    """Hit/miss counters of the decoded token cache"""
+    return _decoded_tokens.stats()
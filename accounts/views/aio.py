@@ -0,0 +1,45 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from ninja import Router
+from ninja.errors import ValidationError as NinjaValidationError
+
+from accounts.passwords import aauthenticate, aset_user_password
+from accounts.schemas import SignupSchema, TokenPairResponse, LoginSchema, ErrorResponse
+from accounts.utils import access_token_claims, acreate_refresh_token, create_access_token
+
+# Async login/signup (mounted at /api/async/auth/): the password hashing runs on the
+# bounded pool of accounts.passwords, and a full pool answers 503 instead of queueing.
+router = Router(tags=["auth (async)"])
+User = get_user_model()
+
+
+# --- Routes ---
+@router.post("/signup")
+async def signup(request, data: SignupSchema):
+    if await User.objects.filter(username=data.username).aexists():
+        return {"error": "User already exists"}
+    user = User(
+        username=data.username,
+        first_name=data.first_name,
+        last_name=data.last_name,
+        email=data.email,
+        cpf=data.cpf,
+    )
+    await aset_user_password(user, data.password)
+    try:
+        await sync_to_async(user.full_clean)()
+        await user.asave()
+        return {"message": "User successfully created", "uuid": user.uuid}
+    except ValidationError as e:
+        raise NinjaValidationError(e.message_dict)
+
+
+@router.post("/login", response={200: TokenPairResponse, 401: ErrorResponse})
+async def login(request, data: LoginSchema):
+    user = await aauthenticate(data.username, data.password)
+    if not user:
+        return 401, {"error": "Invalid credentials"}
+    access = create_access_token(user.id, access_token_claims(user))
+    refresh = await acreate_refresh_token(user.id)
+    return 200, {"access": access, "refresh": refresh}
@@ -1,10 +1,15 @@
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
 from django.core.exceptions import ValidationError
 from ninja import Router
 from ninja.errors import ValidationError as NinjaValidationError
 
+from accounts.cache import get_cached_user
 from accounts.schemas import SignupSchema, TokenPairResponse, LoginSchema, RefreshSchema, ErrorResponse
-from accounts.utils import create_access_token, create_refresh_token, decode_token
+from accounts.tokens import revoke_family, rotate_refresh_token
+from accounts.utils import (
+    access_token_claims, create_access_token, create_refresh_token, decode_token, encode_refresh_token,
+)
 
 router = Router(tags=["auth"])
 User = get_user_model()
@@ -36,7 +41,7 @@ def login(request, data: LoginSchema):
     user = authenticate(username=data.username, password=data.password)
     if not user:
         return 401, {"error": "Invalid credentials"}
-    access = create_access_token(user.id)
+    access = create_access_token(user.id, access_token_claims(user))
     refresh = create_refresh_token(user.id)
     return 200, {"access": access, "refresh": refresh}
 
@@ -46,7 +51,27 @@ def refresh_token(request, data: RefreshSchema):
     payload = decode_token(data.refresh)
     if not payload or payload.get("type") != "refresh":
         return 401, {"error": "Invalid refresh token"}
-    user_id = payload["user_id"]
-    access = create_access_token(user_id)
-    refresh = create_refresh_token(user_id)  # optional: generate new refresh
+    # the refresh token is used up: the next one continues its family
+    token = rotate_refresh_token(payload)
+    if token is None:
+        return 401, {"error": "Invalid refresh token"}
+    claims = {}
+    if settings.ACCESS_TOKEN_CLAIMS:
+        # the claims are read from the user as it is now
+        user = get_cached_user(token.user_id)
+        if user is None or not user.is_active:
+            return 401, {"error": "Invalid refresh token"}
+        claims = access_token_claims(user)
+    access = create_access_token(token.user_id, claims)
+    refresh = encode_refresh_token(token)
     return 200, {"access": access, "refresh": refresh}
+
+
+@router.post("/logout", response={204: None, 401: ErrorResponse})
+def logout(request, data: RefreshSchema):
+    """Revoke the refresh token and every token rotated from the same login"""
+    payload = decode_token(data.refresh)
+    if not payload or payload.get("type") != "refresh" or not payload.get("fam"):
+        return 401, {"error": "Invalid refresh token"}
+    revoke_family(payload["fam"])
+    return 204, None
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def _sync_order_number_sequence(sender, using, **kwargs):
+    from api.services.ordernumbers import ensure_order_number_sequence
+
+    ensure_order_number_sequence(using)
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from api import signals  # noqa: F401
+        from api.profiling import install_query_recorder
+
+        post_migrate.connect(_sync_order_number_sequence, sender=self)
+        connection_created.connect(install_query_recorder)
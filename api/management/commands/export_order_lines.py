@@ -0,0 +1,53 @@
+import argparse
+import gzip
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from ninja.errors import HttpError
+
+from api.schemas.orders import OrderFilters
+from api.services.exports import order_lines, write_order_lines
+from api.services.orders import filter_orders
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+class Command(BaseCommand):
+    help = "Dump order lines (order + item + product) to a gzip-compressed CSV or NDJSON file in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="file to write (default: order-lines-<today>.<format>.gz)")
+        parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+        parser.add_argument("--chunk-size", type=positive_int, help="rows fetched per round trip (default: EXPORT_CHUNK_SIZE)")
+        parser.add_argument("--status", help="only orders with this status")
+        parser.add_argument("--created-from", type=date.fromisoformat, help="only orders created on or after (YYYY-MM-DD)")
+        parser.add_argument("--created-to", type=date.fromisoformat, help="only orders created up to (YYYY-MM-DD, inclusive)")
+
+    def handle(self, *args, **options):
+        filters = OrderFilters(status=options["status"], created_from=options["created_from"],
+                               created_to=options["created_to"])
+        try:
+            orders = filter_orders(filters)
+        except HttpError as exc:
+            raise CommandError(exc.message)
+        output = options["output"] or f"order-lines-{date.today():%Y%m%d}.{options['format']}.gz"
+
+        started = time.perf_counter()
+
+        def progress(count):
+            elapsed = time.perf_counter() - started
+            self.stderr.write(f"{count} lines, {count / elapsed:.0f} rows/s")
+
+        with gzip.open(output, "wt", encoding="utf-8", newline="") as stream:
+            count = write_order_lines(order_lines(orders), stream, options["format"], options["chunk_size"],
+                                      progress if options["verbosity"] > 1 else None)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {count} lines to {output} in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Product
+from api.services.catalog import bump_catalog_version
+from api.services.images import store_variants
+
+
+class Command(BaseCommand):
+    help = "Create the thumbnail/medium/WebP variants of product images uploaded without them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="regenerate the variants of every image")
+
+    def handle(self, *args, **options):
+        products = Product._base_manager.exclude(image__isnull=True).exclude(image="")
+        if not options["all"]:
+            products = products.filter(image_variants={})
+        created = skipped = 0
+        for product in products.iterator():
+            try:
+                done = store_variants(product)
+            except Exception as exc:
+                self.stderr.write(f"{product.uuid}: {exc}")
+                done = False
+            created += done
+            skipped += not done
+        if created:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Variants created for {created} images, {skipped} skipped"))
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.products import import_products, product_file_format, read_product_file
+
+
+class Command(BaseCommand):
+    help = "Create or update products from a CSV or JSON file, upserting on sku in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV (with a header line) or JSON file of products")
+        parser.add_argument("--format", choices=["csv", "json"], help="default: from the file extension")
+        parser.add_argument("--batch-size", type=int, default=1000, help="products written per statement")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        try:
+            rows = read_product_file(path.read_bytes(), options["format"] or product_file_format(path.name))
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+
+        result = import_products(rows, batch_size=options["batch_size"])
+        for error in result["errors"]:
+            details = "; ".join(f"{field}: {' '.join(messages)}" for field, messages in error["errors"].items())
+            self.stderr.write(f"row {error['row']} ({error['sku']}): {details}")
+        self.stdout.write(self.style.SUCCESS(f"Created {result['created']} products, updated {result['updated']}"))
+        if result["errors"]:
+            raise CommandError(f"{len(result['errors'])} rows rejected")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.orderitems import reconcile_order_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute the items_count/total_amount columns of every order from its items"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="orders locked and fixed per transaction")
+        parser.add_argument("--check", action="store_true",
+                            help="only report drifted orders, and fail if there are any")
+
+    def handle(self, *args, **options):
+        checked, drifted = reconcile_order_totals(batch_size=options["batch_size"], fix=not options["check"])
+        if options["check"]:
+            if drifted:
+                raise CommandError(f"{drifted} of {checked} orders have totals out of step with their items")
+            self.stdout.write(self.style.SUCCESS(f"All {checked} orders match their items"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Checked {checked} orders, fixed {drifted}"))
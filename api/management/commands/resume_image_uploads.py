@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Product
+from api.services.images import upload_spooled_image
+
+
+class Command(BaseCommand):
+    help = "Upload the spooled images still PENDING (e.g. queued when the process stopped) or FAILED"
+
+    def handle(self, *args, **options):
+        pending = (
+            Product._base_manager
+            .filter(image_status__in=[Product.ImageStatus.PENDING, Product.ImageStatus.FAILED])
+            .exclude(pending_image="")
+            .values_list("pk", "pending_image")
+        )
+        uploaded = failed = 0
+        for product_id, spool_name in pending:
+            if upload_spooled_image(product_id, spool_name):
+                uploaded += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Uploaded {uploaded} images, {failed} still not uploaded"))
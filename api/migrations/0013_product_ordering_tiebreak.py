@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_product_promotion"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="product",
+            options={"ordering": ["-created_at", "id"]},
+        ),
+    ]
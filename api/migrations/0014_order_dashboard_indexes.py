@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:10
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and does not lock api_order for writes
+    atomic = False
+
+    dependencies = [
+        ("api", "0013_product_ordering_tiebreak"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(fields=["status", "-created_at"], name="order_status_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(fields=["user", "-created_at"], name="order_user_created_idx"),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:45
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("api", "0014_order_dashboard_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # replaced by the partial versions below, which also carry the id tiebreak
+        RemoveIndexConcurrently(
+            model_name="order",
+            name="order_status_created_idx",
+        ),
+        RemoveIndexConcurrently(
+            model_name="order",
+            name="order_user_created_idx",
+        ),
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["-created_at", "-id"],
+                name="order_active_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["status", "-created_at", "-id"],
+                name="order_active_status_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["user", "-created_at", "-id"],
+                name="order_active_user_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["-created_at", "id"],
+                name="product_active_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="deliveryaddress",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["user", "-created_at"],
+                name="address_active_user_idx",
+            ),
+        ),
+    ]
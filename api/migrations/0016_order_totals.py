@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:20
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model("api", "Order")
+    OrderItem = apps.get_model("api", "OrderItem")
+    totals = OrderItem.objects.filter(order=OuterRef("pk")).order_by().values("order")
+    Order._base_manager.update(
+        items_count=Coalesce(Subquery(totals.annotate(count=Count("pk")).values("count")), 0),
+        total_amount=Coalesce(
+            Subquery(totals.annotate(total=Sum(F("quantity") * F("unit_price"))).values("total")),
+            Decimal("0"),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0015_active_partial_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="items_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total_amount",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
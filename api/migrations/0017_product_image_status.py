@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:05
+
+from django.db import migrations, models
+
+
+def mark_existing_images_ready(apps, schema_editor):
+    Product = apps.get_model("api", "Product")
+    Product._base_manager.exclude(image__isnull=True).exclude(image="").update(image_status="READY")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_order_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_status",
+            field=models.CharField(
+                choices=[
+                    ("NONE", "Sem imagem"),
+                    ("PENDING", "Imagem aguardando upload"),
+                    ("READY", "Imagem disponível"),
+                    ("FAILED", "Falha no upload da imagem"),
+                ],
+                default="NONE",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="pending_image",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.RunPython(mark_existing_images_ready, migrations.RunPython.noop),
+    ]
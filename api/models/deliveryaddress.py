@@ -52,6 +52,11 @@ class DeliveryAddress(BaseModel):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # a user's active addresses, newest first
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_active=True),
+                         name='address_active_user_idx'),
+        ]
 
     def __str__(self):
         return f"{self.address_name}, {self.address_description} - {self.city}/{self.state}"
@@ -1,10 +1,13 @@
 import uuid
+from decimal import Decimal
 
 from django.conf import settings
-from django.db import models
+from django.db import models, router
+from django.db.models import F
 
 from api.models import DeliveryAddress
 from api.models.common import BaseModel, ActiveManager
+from api.services.ordernumbers import order_numbers
 
 
 class Order(BaseModel):
@@ -35,20 +38,47 @@ class Order(BaseModel):
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name="my_orders")
     delivery_address = models.ForeignKey(DeliveryAddress, on_delete=models.DO_NOTHING)
+    # denormalized from the items: kept in step by OrderItem.save()/delete() and by the bulk cart sync,
+    # recomputed by the reconcile_order_totals command
+    items_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         if self.order_number is None:
-            last = Order.objects.aggregate(models.Max("order_number"))["order_number__max"]
-            self.order_number = (last or 0) + 1
+            using = kwargs.get("using") or router.db_for_write(Order, instance=self)
+            self.order_number = order_numbers.next(using=using)
         super().save(*args, **kwargs)
 
+    def adjust_totals(self, items: int = 0, amount: Decimal = Decimal("0")) -> None:
+        """
+        Add to items_count/total_amount with one atomic UPDATE (concurrent item changes
+        cannot lose each other's deltas). Call it in the transaction of the item change
+        """
+        if not items and not amount:
+            return
+        Order._base_manager.filter(pk=self.pk).update(
+            items_count=F("items_count") + items,
+            total_amount=F("total_amount") + amount,
+        )
+        self.refresh_from_db(fields=["items_count", "total_amount"])
+
     objects = ActiveManager()
 
     class Meta:
         ordering = ['-created_at']
+        # partial (WHERE is_active), like every query through ActiveManager; the id tiebreak
+        # matches the keyset ordering of the staff dashboard (see api.services.orders)
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_active=True),
+                         name='order_active_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], condition=models.Q(is_active=True),
+                         name='order_active_status_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], condition=models.Q(is_active=True),
+                         name='order_active_user_idx'),
+        ]
 
     def __str__(self):
         return f"Order number {self.order_number} - Status {self.status}"
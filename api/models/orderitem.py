@@ -1,4 +1,6 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, router, transaction
 
 from api.models import Order, Product
 
@@ -14,5 +16,30 @@ class OrderItem(models.Model):
             models.UniqueConstraint(fields=['order', 'product'], name='unique_product_per_order')
         ]
 
+    def _stored_amount(self, using) -> Decimal:
+        quantity, unit_price = (
+            OrderItem.objects.using(using).select_for_update().values_list("quantity", "unit_price").get(pk=self.pk)
+        )
+        return quantity * unit_price
+
+    def save(self, *args, **kwargs):
+        """Save and move the order totals by the change, in one transaction"""
+        using = kwargs.get("using") or router.db_for_write(OrderItem, instance=self)
+        adding = self._state.adding
+        with transaction.atomic(using=using):
+            previous = Decimal("0") if adding else self._stored_amount(using)
+            super().save(*args, **kwargs)
+            # unit_price may still be a float/str here; the column stores it as a 2-place decimal
+            unit_price = self._meta.get_field("unit_price").to_python(self.unit_price)
+            self.order.adjust_totals(1 if adding else 0, self.quantity * unit_price - previous)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(OrderItem, instance=self)
+        with transaction.atomic(using=using):
+            amount = self._stored_amount(using)
+            result = super().delete(*args, **kwargs)
+            self.order.adjust_totals(-1, -amount)
+        return result
+
     def __str__(self):
         return f"{self.quantity} x {self.product.name} (Order {self.order.order_number})"
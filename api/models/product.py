@@ -1,23 +1,58 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 import uuid
 
 from api.models.common import BaseModel, ActiveManager
+from api.services.imageurls import storage_url
 
 
 class Product(BaseModel):
+    class ImageStatus(models.TextChoices):
+        NONE = 'NONE', 'Sem imagem'
+        PENDING = 'PENDING', 'Imagem aguardando upload'
+        READY = 'READY', 'Imagem disponível'
+        FAILED = 'FAILED', 'Falha no upload da imagem'
+
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    # stock keeping unit: the key bulk imports upsert on (products created one by one may have none)
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=100)
     description = models.TextField()
     price = models.DecimalField(decimal_places=2, max_digits=10)
     promotion = models.BooleanField(default=False)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    # uploads run in the background (api.services.images): the file waits in the spool meanwhile
+    image_status = models.CharField(max_length=10, choices=ImageStatus.choices, default=ImageStatus.NONE)
+    pending_image = models.CharField(max_length=255, blank=True, default='')
+    # storage names of the smaller renditions of the image, by variant ("thumbnail", "medium", "webp")
+    image_variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     objects = ActiveManager()
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', 'id']
+        indexes = [
+            # the catalog listing: active products in ordering order (keyset pagination)
+            models.Index(fields=['-created_at', 'id'], condition=models.Q(is_active=True),
+                         name='product_active_created_idx'),
+        ]
+
+    def validate_unique(self, exclude=None):
+        super().validate_unique(exclude)
+        # the check above goes through objects, which hides soft-deleted products; their SKUs
+        # still hold the unique constraint
+        if self.sku and "sku" not in (exclude or ()):
+            if Product._base_manager.filter(sku=self.sku).exclude(pk=self.pk).exists():
+                raise ValidationError({"sku": [self.unique_error_message(Product, ("sku",))]})
+
+    def image_url(self) -> str | None:
+        return storage_url(self.image.storage, self.image.name) if self.image else None
+
+    def image_variant_url(self, key: str) -> str | None:
+        name = self.image_variants.get(key)
+        return storage_url(self.image.storage, name) if name else None
 
     def __str__(self):
         return self.name
@@ -0,0 +1,92 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from ninja.errors import HttpError
+
+
+# --- Keyset (cursor) pagination ---
+# Pages are read with "WHERE (keys) after (last keys) ORDER BY keys LIMIT n" instead of OFFSET,
+# so the cost of a page does not depend on how deep in the listing it is.
+
+def _page_size(limit: int | None) -> int:
+    return min(limit or settings.PAGINATION_PAGE_SIZE, settings.PAGINATION_MAX_PAGE_SIZE)
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque cursor from the ordering values of the last row of a page"""
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, fields: list) -> list:
+    """Decode a cursor back to python values of the ordering fields"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError("Cursor does not match the ordering")
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        raise HttpError(400, "Invalid cursor")
+
+
+def _keyset_filter(ordering: list[str], values: list) -> Q:
+    """
+    Rows strictly after the cursor, e.g. for ("-created_at", "id"):
+    created_at < c OR (created_at = c AND id > i)
+    """
+    condition = Q()
+    for position, key in enumerate(ordering):
+        name = key.lstrip("-")
+        lookup = "lt" if key.startswith("-") else "gt"
+        step = Q(**{f"{name}__{lookup}": values[position]})
+        for previous, value in zip(ordering[:position], values):
+            step &= Q(**{previous.lstrip("-"): value})
+        condition |= step
+    return condition
+
+
+def _next_url(request, cursor: str) -> str:
+    params = request.GET.copy()
+    params["cursor"] = cursor
+    return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+
+def _page_queryset(queryset: QuerySet, ordering, cursor: str | None, page_size: int):
+    ordering = list(ordering)
+    fields = [queryset.model._meta.get_field(key.lstrip("-")) for key in ordering]
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_keyset_filter(ordering, decode_cursor(cursor, fields)))
+    # one extra row tells whether there is a next page without a COUNT(*)
+    return queryset[:page_size + 1], fields
+
+
+def _page(request, items: list, fields: list, page_size: int) -> dict:
+    next_url = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        # rows are model instances, or dicts for projections made with .values()
+        values = [last[field.attname] if isinstance(last, dict) else getattr(last, field.attname) for field in fields]
+        next_url = _next_url(request, encode_cursor(values))
+    return {"items": items, "next": next_url}
+
+
+def paginate_keyset(request, queryset: QuerySet, ordering, cursor: str | None = None,
+                    limit: int | None = None) -> dict:
+    """Return one page ({"items", "next"}) of the queryset ordered by the given keys"""
+    page_size = _page_size(limit)
+    page_queryset, fields = _page_queryset(queryset, ordering, cursor, page_size)
+    return _page(request, list(page_queryset), fields, page_size)
+
+
+async def apaginate_keyset(request, queryset: QuerySet, ordering, cursor: str | None = None,
+                           limit: int | None = None) -> dict:
+    """Async version of paginate_keyset"""
+    page_size = _page_size(limit)
+    page_queryset, fields = _page_queryset(queryset, ordering, cursor, page_size)
+    return _page(request, [obj async for obj in page_queryset], fields, page_size)
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+from ninja.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A route ran more SQL queries than declared with @query_budget (raised when QUERY_BUDGET_STRICT)"""
+
+
+@dataclass
+class RequestProfile:
+    queries: int = 0
+    db_time: float = 0.0
+    serialize_time: float = 0.0
+    budget: int | None = None
+
+
+# the profile of the request being served; copied into sync_to_async threads, so the
+# queries of async views are counted too
+_current_profile: ContextVar[RequestProfile | None] = ContextVar("request_profile", default=None)
+
+
+def current_profile() -> RequestProfile | None:
+    return _current_profile.get()
+
+
+# --- Query instrumentation (installed on every connection, see ApiConfig.ready) ---
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class ProfilingJSONRenderer(JSONRenderer):
+    """Ninja JSON renderer that adds its encoding time to the request profile"""
+
+    def render(self, request, data, *, response_status):
+        started = time.perf_counter()
+        try:
+            return super().render(request, data, response_status=response_status)
+        finally:
+            profile = _current_profile.get()
+            if profile is not None:
+                profile.serialize_time += time.perf_counter() - started
+
+
+# --- Aggregated stats per route (per process) ---
+
+_stats: dict[str, dict] = {}
+_stats_lock = threading.Lock()
+
+
+def _record_stats(route: str, profile: RequestProfile, total: float) -> None:
+    with _stats_lock:
+        stats = _stats.setdefault(route, {
+            "count": 0, "queries": 0, "db_ms": 0.0, "serialize_ms": 0.0, "total_ms": 0.0, "max_ms": 0.0,
+        })
+        stats["count"] += 1
+        stats["queries"] += profile.queries
+        stats["db_ms"] += profile.db_time * 1000
+        stats["serialize_ms"] += profile.serialize_time * 1000
+        stats["total_ms"] += total * 1000
+        stats["max_ms"] = max(stats["max_ms"], total * 1000)
+
+
+def route_stats() -> list[dict]:
+    """Per-route averages since the process started (or since reset_stats)"""
+    with _stats_lock:
+        return [
+            {
+                "route": route,
+                "count": stats["count"],
+                "avg_queries": round(stats["queries"] / stats["count"], 2),
+                "avg_db_ms": round(stats["db_ms"] / stats["count"], 3),
+                "avg_serialize_ms": round(stats["serialize_ms"] / stats["count"], 3),
+                "avg_total_ms": round(stats["total_ms"] / stats["count"], 3),
+                "max_total_ms": round(stats["max_ms"], 3),
+            }
+            for route, stats in sorted(_stats.items())
+        ]
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+# --- Middleware ---
+
+def _finish(request, response, profile: RequestProfile, started: float):
+    total = time.perf_counter() - started
+    match = request.resolver_match
+    if match is None:
+        return response
+    route = f"{request.method} /{match.route}"
+    _record_stats(route, profile, total)
+
+    if settings.REQUEST_PROFILING_HEADERS:
+        response["Server-Timing"] = (
+            f'db;desc="{profile.queries} queries";dur={profile.db_time * 1000:.2f}, '
+            f"serialize;dur={profile.serialize_time * 1000:.2f}, "
+            f"total;dur={total * 1000:.2f}"
+        )
+
+    if profile.budget is not None and profile.queries > profile.budget:
+        message = f"{route} ran {profile.queries} queries, over its budget of {profile.budget}"
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+    return response
+
+
+@sync_and_async_middleware
+def request_profiling_middleware(get_response):
+    """Record query count, DB time, serialization time and total latency of every request"""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            profile = RequestProfile()
+            token = _current_profile.set(profile)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current_profile.reset(token)
+            return _finish(request, response, profile, started)
+    else:
+        def middleware(request):
+            profile = RequestProfile()
+            token = _current_profile.set(profile)
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current_profile.reset(token)
+            return _finish(request, response, profile, started)
+    return middleware
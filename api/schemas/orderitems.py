@@ -1,9 +1,10 @@
 from datetime import date
 from uuid import UUID
 
-from ninja import Schema
+from ninja import Field, Schema
 
 from api.schemas.deliveryaddresses import DeliveryAddressOut
+from api.schemas.orders import OrderSummaryOut
 from api.schemas.products import ProductOut
 from api.schemas.users import UserOut
 
@@ -14,9 +15,41 @@ class OrderItemIn(Schema):
     quantity: int
 
 
+class CartItemIn(Schema):
+    product_uuid: UUID
+    quantity: int = Field(..., ge=0)  # 0 removes the product from the order
+
+
+class CartIn(Schema):
+    order_uuid: UUID
+    items: list[CartItemIn]
+
+
+def _resolved(obj, key):
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key)
+
+
 class ItemOut(ProductOut):
     quantity: int
 
+    # Built from keyword arguments with the URLs already resolved (see services.orderitems)
+    # and revalidated as part of the response, never from a Product
+    @staticmethod
+    def resolve_image(obj):
+        return _resolved(obj, "image")
+
+    @staticmethod
+    def resolve_image_thumbnail(obj):
+        return _resolved(obj, "image_thumbnail")
+
+    @staticmethod
+    def resolve_image_medium(obj):
+        return _resolved(obj, "image_medium")
+
+    @staticmethod
+    def resolve_image_webp(obj):
+        return _resolved(obj, "image_webp")
+
 
 class OrderItemOut(Schema):
     order_uuid: UUID
@@ -24,9 +57,21 @@ class OrderItemOut(Schema):
     order_date: date
     payment_method: str
     status: str
+    items_count: int
+    total_amount: float
     delivery_address: DeliveryAddressOut
     products: list[ItemOut]
 
 
 class OrderItemAdminOut(OrderItemOut):
     user: UserOut
+
+
+class OrderItemAdminPageOut(Schema):
+    items: list[OrderItemAdminOut]
+    next: str | None = None
+
+
+class OrderItemSummaryPageOut(Schema):
+    items: list[OrderSummaryOut]
+    next: str | None = None
@@ -1,9 +1,11 @@
-from datetime import date
+from datetime import date, datetime
+from typing import Literal
 from uuid import UUID
 
 from ninja import Schema
 
 from api.schemas.deliveryaddresses import DeliveryAddressOut
+from api.schemas.pagination import KeysetPageIn
 from api.schemas.users import UserOut
 
 
@@ -18,6 +20,8 @@ class OrderOut(Schema):
     order_date: date
     payment_method: str
     status: str
+    items_count: int
+    total_amount: float
     delivery_address: DeliveryAddressOut
 
 
@@ -27,3 +31,44 @@ class OrderAdminOut(OrderOut):
 
 class OrderInUpdate(OrderIn):
     status: str
+
+
+class OrderFilters(Schema):
+    status: str | None = None
+    payment_method: str | None = None
+    user_uuid: UUID | None = None
+    created_from: date | None = None
+    created_to: date | None = None  # inclusive
+    sort: Literal["-created_at", "created_at", "-order_number", "order_number"] = "-created_at"
+    view: Literal["full", "summary"] = "full"  # summary: order columns only, no address/user objects
+
+
+class OrderFilterIn(OrderFilters, KeysetPageIn):
+    pass
+
+
+class OrderExportIn(OrderFilters):
+    format: Literal["ndjson", "json"] = "ndjson"  # json: one array, streamed as well
+
+
+class OrderSummaryOut(Schema):
+    uuid: UUID
+    order_number: int
+    order_date: date
+    payment_method: str
+    status: str
+    created_at: datetime
+    items_count: int
+    total_amount: float
+    user_uuid: UUID
+    username: str
+
+
+class OrderAdminPageOut(Schema):
+    items: list[OrderAdminOut]
+    next: str | None = None
+
+
+class OrderSummaryPageOut(Schema):
+    items: list[OrderSummaryOut]
+    next: str | None = None
@@ -0,0 +1,6 @@
+from ninja import Field, Schema
+
+
+class KeysetPageIn(Schema):
+    cursor: str | None = None
+    limit: int | None = Field(None, ge=1)
@@ -1,20 +1,62 @@
 import uuid
-from typing import Optional
+from decimal import Decimal
+from typing import Annotated, Optional
 
 from ninja import Schema
+from pydantic import StringConstraints
 
 
 class ProductOut(Schema):
     uuid: uuid.UUID
+    sku: Optional[str] = None
     name: str
     description: str
     price: float
     promotion: bool
     image: Optional[str] = None
+    image_status: str
+    image_thumbnail: Optional[str] = None  # 240px JPEG
+    image_medium: Optional[str] = None     # 800px JPEG
+    image_webp: Optional[str] = None       # 800px WebP
 
     @staticmethod
     def resolve_image(obj):
         """Retorna a URL completa da imagem do Cloudinary"""
-        if obj.image:
-            return obj.image.url  # Cloudinary retorna URL completa automaticamente
-        return None
+        return obj.image_url()  # Cloudinary retorna URL completa automaticamente
+
+    @staticmethod
+    def resolve_image_thumbnail(obj):
+        return obj.image_variant_url("thumbnail")
+
+    @staticmethod
+    def resolve_image_medium(obj):
+        return obj.image_variant_url("medium")
+
+    @staticmethod
+    def resolve_image_webp(obj):
+        return obj.image_variant_url("webp")
+
+
+class ProductPageOut(Schema):
+    items: list[ProductOut]
+    next: Optional[str] = None
+
+
+class ProductImportRow(Schema):
+    sku: Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]  # " CUP-1" is CUP-1; blank is refused
+    name: str
+    description: str
+    price: Decimal
+    promotion: bool = False
+
+
+class ProductImportError(Schema):
+    row: int  # 1-based position of the product in the file
+    sku: Optional[str] = None
+    errors: dict[str, list[str]]
+
+
+class ProductImportOut(Schema):
+    created: int
+    updated: int
+    errors: list[ProductImportError]
@@ -0,0 +1,175 @@
+import hashlib
+import time
+from typing import Awaitable, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from pydantic import TypeAdapter
+
+from api.models import Product
+from api.schemas.products import ProductOut
+
+VERSION_KEY = "catalog:version"
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+
+
+# --- Catalog version ---
+# Every product write bumps the version, so cached responses of older versions are never
+# served again (they just expire). Needs a shared CACHES backend for multi-worker deployments.
+
+def catalog_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # never restart from a number that old entries may still use
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def acatalog_version() -> int:
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def _incr_catalog_version() -> None:
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def bump_catalog_version() -> None:
+    """
+    Invalidate cached catalog responses. Bumped right away and again on commit, so that a
+    response rebuilt while the write transaction was still open is not kept either (once per
+    transaction however many products it writes). The snapshot of the new version is
+    rendered by the first read that needs it
+    """
+    _incr_catalog_version()
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        # Django starts a new list of commit hooks at every commit and rollback (of savepoints
+        # too, which drop the hooks added since), so a hook already added to this list is
+        # still pending
+        if getattr(connection, "_catalog_bump_hooks", None) is connection.run_on_commit:
+            return
+        connection._catalog_bump_hooks = connection.run_on_commit
+    # robust: the write is committed either way, a cache error here must not fail the request
+    transaction.on_commit(_incr_catalog_version, robust=True)
+
+
+# --- Conditional responses ---
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    etags = [tag.removeprefix("W/") for tag in parse_etags(header)]
+    return "*" in etags or etag in etags
+
+
+def conditional_json_response(request, body: bytes, etag: str) -> HttpResponse:
+    """200 with the body, or 304 when the client already has this ETag"""
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type=JSON_CONTENT_TYPE)
+    response["ETag"] = etag
+    response["Cache-Control"] = f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}"
+    return response
+
+
+def cached_catalog_response(request, render: Callable[[], bytes]) -> HttpResponse:
+    """
+    Serve a public catalog endpoint from the cache: pre-serialized JSON bytes and their ETag
+    are stored per catalog version and URL, and `render` only runs on a miss
+    """
+    key = f"catalog:{catalog_version()}:{request.build_absolute_uri()}"
+    entry = cache.get(key)
+    if entry is None:
+        body = render()
+        entry = (make_etag(body), body)
+        cache.set(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+    etag, body = entry
+    return conditional_json_response(request, body, etag)
+
+
+async def acached_catalog_response(request, render: Callable[[], Awaitable[bytes]]) -> HttpResponse:
+    """Async version of cached_catalog_response (`render` is a coroutine function)"""
+    key = f"catalog:{await acatalog_version()}:{request.build_absolute_uri()}"
+    entry = await cache.aget(key)
+    if entry is None:
+        body = await render()
+        entry = (make_etag(body), body)
+        await cache.aset(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+    etag, body = entry
+    return conditional_json_response(request, body, etag)
+
+
+# --- Catalog snapshot ---
+# The whole active catalog as list[ProductOut] JSON, rendered once per catalog version and
+# kept in this process and in the shared cache: reads cost one cache lookup (the version).
+# The copy in this process expires after CATALOG_CACHE_TIMEOUT like the cached one: without
+# a shared cache, this worker never sees the version bumps of the others.
+
+_products_adapter = TypeAdapter(list[ProductOut])
+_local_snapshot: tuple[int, float, str, bytes] | None = None  # version, expires at (monotonic), etag, body
+
+
+def _fresh_local_snapshot(version: int) -> tuple[int, float, str, bytes] | None:
+    snapshot = _local_snapshot
+    if snapshot is None or snapshot[0] != version or snapshot[1] <= time.monotonic():
+        return None
+    return snapshot
+
+
+def _render_catalog() -> bytes:
+    products = _products_adapter.validate_python(list(Product.objects.all()))
+    return _products_adapter.dump_json(products)
+
+
+async def _arender_catalog() -> bytes:
+    products = _products_adapter.validate_python([product async for product in Product.objects.all()])
+    return _products_adapter.dump_json(products)
+
+
+def catalog_snapshot() -> tuple[str, bytes]:
+    """ETag and JSON bytes of the current catalog snapshot, built on first use of a version"""
+    global _local_snapshot
+    version = catalog_version()
+    snapshot = _fresh_local_snapshot(version)
+    if snapshot is None:
+        key = f"catalog:snapshot:{version}"
+        entry = cache.get(key)
+        if entry is None:
+            body = _render_catalog()
+            entry = (make_etag(body), body)
+            cache.set(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+        snapshot = _local_snapshot = (version, time.monotonic() + settings.CATALOG_CACHE_TIMEOUT, *entry)
+    return snapshot[2], snapshot[3]
+
+
+async def acatalog_snapshot() -> tuple[str, bytes]:
+    """Async version of catalog_snapshot"""
+    global _local_snapshot
+    version = await acatalog_version()
+    snapshot = _fresh_local_snapshot(version)
+    if snapshot is None:
+        key = f"catalog:snapshot:{version}"
+        entry = await cache.aget(key)
+        if entry is None:
+            body = await _arender_catalog()
+            entry = (make_etag(body), body)
+            await cache.aset(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+        snapshot = _local_snapshot = (version, time.monotonic() + settings.CATALOG_CACHE_TIMEOUT, *entry)
+    return snapshot[2], snapshot[3]
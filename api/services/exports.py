@@ -0,0 +1,149 @@
+import csv
+import json
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from typing import TextIO
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, QuerySet
+from django.http import StreamingHttpResponse
+from ninja import Schema
+
+from api.models import OrderItem
+
+# --- Streaming exports ---
+# Rows are read with .iterator(chunk_size) (a server-side cursor on PostgreSQL, prefetches
+# done per chunk) and written out as they are serialized, so memory stays flat whatever
+# the number of rows exported. The response is iterated after the view returns: the read
+# runs in its own transaction (without one PostgreSQL declares the cursor WITH HOLD and
+# materializes the whole result first), and under ASGI it is handed over as an async
+# iterator (a sync one would be read into a list before the first byte is sent).
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+# bytes gathered before each write to the client
+_BUFFER_SIZE = 64 * 1024
+
+
+def export_records(queryset: QuerySet, build: Callable[[object], Schema],
+                   chunk_size: int | None = None) -> Iterator[Schema]:
+    """Schema of every row of the queryset, built one chunk of rows at a time"""
+    for row in queryset.iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE):
+        yield build(row)
+
+
+def _encoded(records: Iterable[Schema], format: str) -> Iterator[bytes]:
+    if format == "ndjson":
+        for record in records:
+            yield record.model_dump_json().encode() + b"\n"
+        return
+    yield b"["
+    separator = b""
+    for record in records:
+        yield separator + record.model_dump_json().encode()
+        separator = b","
+    yield b"]"
+
+
+def _buffered(pieces: Iterable[bytes]) -> Iterator[bytes]:
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= _BUFFER_SIZE:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def encode_records(records: Iterable[Schema], format: str) -> Iterator[bytes]:
+    """NDJSON lines, or the pieces of one JSON array, in blocks of about 64 KiB"""
+    return _buffered(_encoded(records, format))
+
+
+def _in_transaction(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    # only reads: inside a transaction already, nothing to roll back to a savepoint
+    with transaction.atomic(savepoint=False):
+        yield from chunks
+
+
+async def _async_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    # every next() runs in the request's sync thread, the one holding the cursor's connection
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def streaming_export(request, records: Iterable[Schema], format: str, filename: str) -> StreamingHttpResponse:
+    """Download response that serializes the records while it is sent"""
+    chunks = _in_transaction(encode_records(records, format))
+    if isinstance(request, ASGIRequest):
+        chunks = _async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[format])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{format}"'
+    return response
+
+
+# --- Order line dumps (management command export_order_lines) ---
+# One row per order item, joined with its order, user and product in the same query.
+
+ORDER_LINE_COLUMNS = {
+    "order_number": F("order__order_number"),
+    "order_uuid": F("order__uuid"),
+    "order_date": F("order__order_date"),
+    "created_at": F("order__created_at"),
+    "status": F("order__status"),
+    "payment_method": F("order__payment_method"),
+    "user_uuid": F("order__user__uuid"),
+    "username": F("order__user__username"),
+    "product_uuid": F("product__uuid"),
+    "product_name": F("product__name"),
+    "item_quantity": F("quantity"),
+    "item_unit_price": F("unit_price"),
+    "line_total": ExpressionWrapper(F("quantity") * F("unit_price"), output_field=DecimalField()),
+}
+
+
+def order_lines(orders: QuerySet) -> QuerySet:
+    """Joined order lines of the given orders, as dicts in order number order"""
+    return (
+        OrderItem.objects.filter(order__in=orders.values("pk"))
+        .order_by("order__order_number", "id")
+        .values(**ORDER_LINE_COLUMNS)
+    )
+
+
+def write_order_lines(lines: QuerySet, stream: TextIO, format: str, chunk_size: int | None = None,
+                      progress: Callable[[int], None] | None = None) -> int:
+    """
+    Write the lines as CSV (with a header) or NDJSON, reading chunk_size rows per round
+    trip (a named server-side cursor on PostgreSQL, inside one read transaction). Returns the number of rows written;
+    progress, if given, is called with the running count after every chunk
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    writer = csv.writer(stream) if format == "csv" else None
+    if writer:
+        writer.writerow(ORDER_LINE_COLUMNS)
+    count = 0
+    # in a transaction the cursor is declared without WITH HOLD, so PostgreSQL sends the rows
+    # chunk by chunk instead of materializing the whole result before the first one
+    with transaction.atomic(using=lines.db):
+        for row in lines.iterator(chunk_size=chunk_size):
+            if writer:
+                writer.writerow(row.values())
+            else:
+                stream.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+            count += 1
+            if progress and count % chunk_size == 0:
+                progress(count)
+    return count
@@ -0,0 +1,256 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path, PurePosixPath
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.core.validators import validate_image_file_extension
+from django.db import connections, transaction
+
+from api.models import Product
+from api.services.catalog import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+# spool file names: "<random hex>__<original file name>"
+_SEPARATOR = "__"
+
+
+# --- Spool (local disk, where uploads wait for the storage backend) ---
+
+def spool_dir() -> Path:
+    path = Path(settings.IMAGE_SPOOL_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def spool_image(upload: UploadedFile) -> str:
+    """Write the request's upload to the spool, chunk by chunk; returns the spool file name"""
+    name = f"{uuid.uuid4().hex}{_SEPARATOR}{Path(upload.name).name}"
+    with (spool_dir() / name).open("wb") as spooled:
+        for chunk in upload.chunks():
+            spooled.write(chunk)
+    return name
+
+
+def validate_image(upload: UploadedFile) -> None:
+    """
+    Refuse an upload that is not an image, as ImageField and its form field do: the file
+    extension, then Pillow's check of the file contents. Raises ValidationError
+    """
+    try:
+        validate_image_file_extension(upload)
+    except ValidationError as e:
+        raise ValidationError({"image": e.messages})
+    try:
+        with Image.open(upload) as image:
+            image.verify()
+    except Exception:
+        # Pillow raises many exception types for broken files (like forms.ImageField, catch them all)
+        raise ValidationError({"image": [
+            "Upload a valid image. The file you uploaded was either not an image or a corrupted image."
+        ]})
+    finally:
+        upload.seek(0)
+
+
+def schedule_image_upload(product: Product, upload: UploadedFile) -> None:
+    """
+    Spool the image of a saved product and mark it PENDING; the upload to the storage
+    backend starts once the current transaction commits, off the request. Raises
+    ValidationError, before anything is spooled, when the upload is not an image
+    """
+    validate_image(upload)
+    spool_name = spool_image(upload)
+    Product._base_manager.filter(pk=product.pk).update(
+        image_status=Product.ImageStatus.PENDING, pending_image=spool_name,
+    )
+    product.image_status = Product.ImageStatus.PENDING
+    product.pending_image = spool_name
+    transaction.on_commit(lambda: image_uploads.submit(product.pk, spool_name))
+
+
+# --- Derivatives (smaller renditions for catalog and mobile clients) ---
+
+# key -> (longest side in px, Pillow format, extension)
+VARIANTS = {
+    "thumbnail": (240, "JPEG", "jpg"),
+    "medium": (800, "JPEG", "jpg"),
+    "webp": (800, "WEBP", "webp"),
+}
+
+
+def render_variants(source) -> dict[str, tuple[str, bytes]]:
+    """
+    Encode every variant of an image file: {key: (extension, bytes)}. Images are never
+    upscaled. Files Pillow cannot read, decode (over Image.MAX_IMAGE_PIXELS) or encode get
+    no variants (the original is still stored)
+    """
+    try:
+        with Image.open(source) as original:
+            original = ImageOps.exif_transpose(original)
+            original.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as exc:
+        logger.warning("No image variants: %s", exc)
+        return {}
+
+    rendered = {}
+    try:
+        for key, (size, image_format, extension) in VARIANTS.items():
+            image = original.copy()
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if image_format == "JPEG" and image.mode != "RGB":
+                # JPEG has no alpha: flatten transparent pixels onto white
+                background = Image.new("RGB", image.size, "white")
+                background.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+                image = background
+            buffer = BytesIO()
+            image.save(buffer, format=image_format, quality=82, optimize=True)
+            rendered[key] = (extension, buffer.getvalue())
+    except (OSError, ValueError) as exc:
+        # modes the encoders do not take (16-bit, CMYK with alpha...)
+        logger.warning("No image variants: %s", exc)
+        return {}
+    return rendered
+
+
+def _variant_name(stored: str, key: str, extension: str) -> str:
+    return str(PurePosixPath(stored).parent / "variants" / f"{PurePosixPath(stored).stem}_{key}.{extension}")
+
+
+def store_variants(product: Product) -> bool:
+    """Render and store the variants of a product's current image (backfill of older images)"""
+    storage = product.image.storage
+    with storage.open(product.image.name, "rb") as source:
+        rendered = render_variants(BytesIO(source.read()))
+    if not rendered:
+        return False
+    variants = {
+        key: storage.save(_variant_name(product.image.name, key, extension), ContentFile(data))
+        for key, (extension, data) in rendered.items()
+    }
+    Product._base_manager.filter(pk=product.pk, image=product.image.name).update(image_variants=variants)
+    product.image_variants = variants
+    return True
+
+
+# --- Upload ---
+
+def upload_spooled_image(product_id: int, spool_name: str) -> bool:
+    """
+    Send a spooled image and its variants to the storage backend (retrying with exponential
+    backoff) and swap them in. A newer upload of the same product supersedes this one.
+    Returns True when the product now shows this image
+    """
+    path = spool_dir() / spool_name
+    if not Product._base_manager.filter(pk=product_id, pending_image=spool_name).exists():
+        path.unlink(missing_ok=True)
+        return False
+
+    if not path.exists():
+        logger.error("Spooled image %s of product %s is gone", spool_name, product_id)
+        _mark_failed(product_id, spool_name)
+        return False
+
+    field = Product._meta.get_field("image")
+    target = field.generate_filename(None, spool_name.split(_SEPARATOR, 1)[-1])
+    with path.open("rb") as spooled:
+        rendered = render_variants(spooled)  # CPU work done once, not on every retry
+
+    stored, variants = None, {}
+    attempts = settings.IMAGE_UPLOAD_RETRIES + 1
+    for attempt in range(1, attempts + 1):
+        try:
+            # pieces already stored by an earlier attempt are not sent again
+            if stored is None:
+                with path.open("rb") as spooled:
+                    stored = field.storage.save(target, File(spooled), max_length=field.max_length)
+            for key, (extension, data) in rendered.items():
+                if key not in variants:
+                    variants[key] = field.storage.save(_variant_name(stored, key, extension), ContentFile(data))
+            break
+        except Exception:
+            if attempt == attempts:
+                logger.exception("Upload of image %s of product %s failed %s times", spool_name, product_id, attempts)
+                _mark_failed(product_id, spool_name)
+                return False
+            time.sleep(settings.IMAGE_UPLOAD_RETRY_DELAY * 2 ** (attempt - 1))
+
+    swapped = Product._base_manager.filter(pk=product_id, pending_image=spool_name).update(
+        image=stored, image_variants=variants, image_status=Product.ImageStatus.READY, pending_image="",
+    )
+    path.unlink(missing_ok=True)
+    if not swapped:
+        # another upload of the product started while this one was running
+        for name in [stored, *variants.values()]:
+            field.storage.delete(name)
+        return False
+    # update() sends no post_save, so the catalog caches are invalidated here
+    bump_catalog_version()
+    return True
+
+
+def _mark_failed(product_id: int, spool_name: str) -> None:
+    # the spool file is kept, so resume_image_uploads can try again later
+    Product._base_manager.filter(pk=product_id, pending_image=spool_name).update(
+        image_status=Product.ImageStatus.FAILED,
+    )
+    bump_catalog_version()
+
+
+class ImageUploadQueue:
+    """
+    Thread pool running upload_spooled_image off the request. With IMAGE_UPLOAD_ASYNC
+    off (tests, one-off scripts) uploads run inline when submitted
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def submit(self, product_id: int, spool_name: str) -> Future | None:
+        if not settings.IMAGE_UPLOAD_ASYNC:
+            # inline, in an on_commit callback: an error here must not fail the request
+            self._upload(product_id, spool_name)
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_UPLOAD_WORKERS, thread_name_prefix="image-upload",
+                )
+            return self._executor.submit(self._run, product_id, spool_name)
+
+    @staticmethod
+    def _upload(product_id: int, spool_name: str) -> bool:
+        try:
+            return upload_spooled_image(product_id, spool_name)
+        except Exception:
+            logger.exception("Image upload failed for product %s", product_id)
+            _mark_failed(product_id, spool_name)
+            return False
+
+    @classmethod
+    def _run(cls, product_id: int, spool_name: str) -> bool:
+        try:
+            return cls._upload(product_id, spool_name)
+        finally:
+            # worker threads are not request threads: nothing else closes their connections
+            connections.close_all()
+
+    def wait(self) -> None:
+        """Wait for the queued uploads to finish (shutdown, tests)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+image_uploads = ImageUploadQueue()
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.files.storage import Storage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from accounts.cache import TTLCache
+
+# Building a URL goes through the storage backend (for Cloudinary, a pure-Python URL
+# builder run per call), which dominated large listings. A stored name is never reused
+# for other content (uploads get fresh names), so name -> URL only changes with settings.
+_urls = TTLCache(maxsize=settings.IMAGE_URL_CACHE_SIZE, ttl=settings.IMAGE_URL_CACHE_TTL)
+
+
+def storage_url(storage: Storage, name: str) -> str:
+    """URL of a stored file, built once per process"""
+    url = _urls.get(name)
+    if url is None:
+        url = storage.url(name)
+        _urls.set(name, url)
+    return url
+
+
+def image_url_stats() -> dict:
+    """Hit/miss counters of the image URL cache"""
+    return _urls.stats()
+
+
+@receiver(setting_changed)
+def _clear_on_storage_change(setting, **kwargs):
+    if setting in ("STORAGES", "MEDIA_URL", "CLOUDINARY_STORAGE"):
+        _urls.clear()
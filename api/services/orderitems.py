@@ -1,57 +1,184 @@
-from api.models import Order
-from api.schemas.orderitems import OrderItemOut, ItemOut, OrderItemAdminOut
+from decimal import Decimal
 
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Prefetch, QuerySet, Subquery, Sum, Value, \
+    prefetch_related_objects
+from django.db.models.functions import Coalesce
+from ninja.errors import HttpError
 
-def build_order_item_response(order: Order) -> OrderItemOut:
-    """Helper to mount the OrderItemOut schema"""
+from api.models import Order, OrderItem, Product
+from api.schemas.orderitems import OrderItemOut, ItemOut, OrderItemAdminOut, CartItemIn
+
+
+def _items_prefetch() -> Prefetch:
+    return Prefetch("items", queryset=OrderItem.objects.select_related("product"))
+
+
+def order_aggregates(queryset: QuerySet | None = None, with_user: bool = False) -> QuerySet:
+    """
+    Load orders with delivery address, items and products (and the user, for staff)
+    in a constant number of queries, whatever the number of orders
+    """
+    if queryset is None:
+        queryset = Order.objects.all()
+    related = ["delivery_address", "user"] if with_user else ["delivery_address"]
+    return queryset.select_related(*related).prefetch_related(_items_prefetch())
+
+
+def _item_totals() -> dict:
+    items = OrderItem.objects.filter(order=OuterRef("pk")).order_by().values("order")
+    return {
+        "actual_count": Coalesce(Subquery(items.annotate(count=Count("pk")).values("count")), 0),
+        "actual_total": Coalesce(
+            Subquery(items.annotate(total=Sum(F("quantity") * F("unit_price"))).values("total")),
+            Value(Decimal("0")),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    }
+
+
+def reconcile_order_totals(batch_size: int = 1000, fix: bool = True) -> tuple[int, int]:
+    """
+    Recompute items_count/total_amount of every order (soft deleted included) from OrderItem,
+    batch by batch. Returns (orders checked, orders whose totals had drifted)
+    """
+    checked = drifted = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            # lock the batch first: the totals are then read by a later statement, which
+            # sees every item change committed by whoever held those locks
+            pks = list(
+                Order._base_manager.select_for_update().filter(pk__gt=last_pk).order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+            rows = (
+                Order._base_manager.filter(pk__in=pks).annotate(**_item_totals())
+                .values("pk", "items_count", "total_amount", "actual_count", "actual_total")
+            )
+            wrong = [
+                Order(pk=row["pk"], items_count=row["actual_count"], total_amount=row["actual_total"])
+                for row in rows
+                if (row["items_count"], row["total_amount"]) != (row["actual_count"], row["actual_total"])
+            ]
+            checked += len(pks)
+            drifted += len(wrong)
+            if wrong and fix:
+                Order._base_manager.bulk_update(wrong, ["items_count", "total_amount"])
+    return checked, drifted
+
+
+def load_order_items(order: Order) -> Order:
+    """Prefetch items and products of an already loaded order (e.g. after a mutation)"""
+    prefetch_related_objects([order], _items_prefetch())
+    return order
+
+
+def sync_cart(order: Order, items: list[CartItemIn]) -> Order:
+    """
+    Set the quantity of many products of an order at once (0 removes the product).
+    Products are resolved with one IN query and the changes applied with
+    bulk_create/bulk_update/delete in one transaction, whatever the number of items.
+    The order row stays locked meanwhile, and its status is checked again under the lock
+    """
+    quantities = {item.product_uuid: item.quantity for item in items}  # last one wins
+    products = Product.objects.in_bulk(list(quantities), field_name="uuid")
+    missing = [str(uuid) for uuid in quantities if uuid not in products]
+    if missing:
+        raise HttpError(404, f"Products not found: {', '.join(missing)}")
+
+    with transaction.atomic():
+        # concurrent syncs of the same order run one after the other: otherwise two that add
+        # the same product both insert it and one fails the unique (order, product) constraint
+        status = Order._base_manager.select_for_update().values_list("status", flat=True).get(pk=order.pk)
+        if status not in (Order.OrderStatus.DRAFT, Order.OrderStatus.PENDING):
+            raise HttpError(400, f"Order cannot change items at '{status}' status")
+        existing = {
+            item.product_id: item
+            for item in OrderItem.objects.select_for_update().filter(order=order, product__in=products.values())
+        }
+        to_create, to_update, to_delete = [], [], []
+        count_delta, amount_delta = 0, Decimal("0")
+        for uuid, quantity in quantities.items():
+            product = products[uuid]
+            item = existing.get(product.id)
+            if quantity == 0:
+                if item:
+                    to_delete.append(item.pk)
+                    count_delta -= 1
+                    amount_delta -= item.quantity * item.unit_price
+            elif item is None:
+                to_create.append(OrderItem(order=order, product=product, quantity=quantity, unit_price=product.price))
+                count_delta += 1
+                amount_delta += quantity * product.price
+            elif item.quantity != quantity:
+                amount_delta += (quantity - item.quantity) * item.unit_price
+                item.quantity = quantity
+                to_update.append(item)
+
+        if to_create:
+            OrderItem.objects.bulk_create(to_create)
+        if to_update:
+            OrderItem.objects.bulk_update(to_update, ["quantity"])
+        if to_delete:
+            OrderItem.objects.filter(pk__in=to_delete).delete()
+        # bulk operations skip OrderItem.save()/delete(), so the totals move here
+        order.adjust_totals(count_delta, amount_delta)
+
+    return load_order_items(order)
 
-    products = [
+
+def _build_items(order: Order) -> list[ItemOut]:
+    return [
         ItemOut(
             uuid=item.product.uuid,
+            sku=item.product.sku,
             name=item.product.name,
             description=item.product.description,
             price=float(item.unit_price),
             promotion=item.product.promotion,
-            image=item.product.image.url if item.product.image else None,
+            image=item.product.image_url(),
+            image_status=item.product.image_status,
+            image_thumbnail=item.product.image_variant_url("thumbnail"),
+            image_medium=item.product.image_variant_url("medium"),
+            image_webp=item.product.image_variant_url("webp"),
             quantity=item.quantity
         )
         for item in order.items.all()
     ]
 
+
+def build_order_item_response(order: Order) -> OrderItemOut:
+    """Helper to mount the OrderItemOut schema"""
+
     return OrderItemOut(
         order_uuid=order.uuid,
         order_number=order.order_number,
         order_date=order.order_date,
         payment_method=order.payment_method,
         status=order.status,
+        items_count=order.items_count,
+        total_amount=order.total_amount,
         delivery_address=order.delivery_address,
-        products=products
+        products=_build_items(order)
     )
 
 
 def build_order_item_response_staff(order: Order) -> OrderItemAdminOut:
     """Helper to mount the OrderItemOut schema for staff response"""
 
-    products = [
-        ItemOut(
-            uuid=item.product.uuid,
-            name=item.product.name,
-            description=item.product.description,
-            price=float(item.unit_price),
-            promotion=item.product.promotion,
-            image=item.product.image.url if item.product.image else None,
-            quantity=item.quantity
-        )
-        for item in order.items.all()
-    ]
-
     return OrderItemAdminOut(
         order_uuid=order.uuid,
         order_number=order.order_number,
         order_date=order.order_date,
         payment_method=order.payment_method,
         status=order.status,
+        items_count=order.items_count,
+        total_amount=order.total_amount,
         delivery_address=order.delivery_address,
-        products=products,
+        products=_build_items(order),
         user=order.user
     )
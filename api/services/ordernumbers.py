@@ -0,0 +1,80 @@
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connections, models
+
+# created by migration 0007 as the column default, but never advanced by Order.save() before
+SEQUENCE_NAME = "order_number_seq"
+
+
+def ensure_order_number_sequence(using: str = "default") -> None:
+    """
+    Create the order number sequence if needed (test databases are built without migrations)
+    and move it past the highest number in use. Idempotent: runs after every migrate
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql" or "api_order" not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {SEQUENCE_NAME} OWNED BY api_order.order_number")
+        # only ever moves forward, from the last number already handed out
+        cursor.execute(
+            f"SELECT setval('{SEQUENCE_NAME}', t.max_number) "
+            f"FROM (SELECT MAX(order_number) AS max_number FROM api_order) t "
+            f"WHERE t.max_number > (SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END "
+            f"FROM {SEQUENCE_NAME})"
+        )
+
+
+class OrderNumberAllocator:
+    """
+    Hands out order numbers from a Postgres sequence.
+
+    nextval() is O(1), never blocks concurrent checkouts and is not rolled back with the
+    transaction, so two orders can never get the same number. Each worker reserves
+    `block_size` numbers per round trip; with blocks > 1 numbers stay unique but are no
+    longer strictly increasing across workers.
+    """
+
+    def __init__(self, block_size: int | None = None):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._reserved: dict[str, deque] = {}
+
+    def next(self, using: str = "default") -> int:
+        connection = connections[using]
+        if connection.vendor != "postgresql":
+            return self._next_from_max(using)
+        with self._lock:
+            reserved = self._reserved.setdefault(using, deque())
+            if not reserved:
+                reserved.extend(self._reserve(using, self.block_size or settings.ORDER_NUMBER_BLOCK_SIZE))
+            return reserved.popleft()
+
+    def reserve(self, count: int, using: str = "default") -> list[int]:
+        """`count` fresh numbers in one round trip, for orders created with bulk_create"""
+        if connections[using].vendor != "postgresql":
+            first = self._next_from_max(using)
+            return list(range(first, first + count))
+        return self._reserve(using, count)
+
+    @staticmethod
+    def _reserve(using: str, count: int) -> list[int]:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                [SEQUENCE_NAME, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def _next_from_max(using: str) -> int:
+        # databases without sequences (local sqlite setups) keep the old behaviour
+        from api.models import Order
+
+        last = Order._base_manager.using(using).aggregate(models.Max("order_number"))["order_number__max"]
+        return (last or 0) + 1
+
+
+order_numbers = OrderNumberAllocator()
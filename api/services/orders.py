@@ -0,0 +1,53 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import F, QuerySet
+from django.utils import timezone
+from ninja.errors import HttpError
+
+from api.models import Order
+from api.schemas.orders import OrderFilters
+
+# keyset ordering of each sort option; created_at is not unique, so id breaks the ties
+SORT_KEYS = {
+    "-created_at": ["-created_at", "-id"],
+    "created_at": ["created_at", "id"],
+    "-order_number": ["-order_number"],
+    "order_number": ["order_number"],
+}
+
+# columns of the summary projection (id and created_at also feed the page cursor)
+SUMMARY_FIELDS = ("id", "uuid", "order_number", "order_date", "payment_method", "status", "created_at",
+                  "items_count", "total_amount")
+
+
+def _start_of_day(day) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_orders(filters: OrderFilters, queryset: QuerySet | None = None) -> QuerySet:
+    """
+    Apply the staff dashboard (and export) filters. Dates become a created_at range (not a cast of the
+    column), so the (status, created_at) and (user, created_at) indexes can serve it
+    """
+    if queryset is None:
+        queryset = Order.objects.all()
+    if filters.status is not None:
+        if filters.status not in Order.OrderStatus.values:
+            raise HttpError(400, f"Invalid status '{filters.status}'")
+        queryset = queryset.filter(status=filters.status)
+    if filters.payment_method is not None:
+        if filters.payment_method not in Order.PaymentMethod.values:
+            raise HttpError(400, f"Invalid payment method '{filters.payment_method}'")
+        queryset = queryset.filter(payment_method=filters.payment_method)
+    if filters.user_uuid is not None:
+        queryset = queryset.filter(user__uuid=filters.user_uuid)
+    if filters.created_from is not None:
+        queryset = queryset.filter(created_at__gte=_start_of_day(filters.created_from))
+    if filters.created_to is not None:
+        queryset = queryset.filter(created_at__lt=_start_of_day(filters.created_to + timedelta(days=1)))
+    return queryset
+
+
+def order_summaries(queryset: QuerySet) -> QuerySet:
+    """Projection for the summary view: order columns and totals plus user uuid/username, as dicts"""
+    return queryset.values(*SUMMARY_FIELDS, user_uuid=F("user__uuid"), username=F("user__username"))
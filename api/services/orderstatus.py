@@ -0,0 +1,101 @@
+from django.core.exceptions import ValidationError
+from django.db import connections, router
+from django.utils import timezone
+from ninja.errors import HttpError
+
+from api.models import Order
+
+# --- Order status workflow ---
+# Statuses an order may move to from each status. Staff move orders forward, skipping steps
+# if needed, and cancel them until they go out for delivery; customers only confirm their own
+# draft or pending orders. Finished and canceled orders never change status again.
+
+Status = Order.OrderStatus
+
+STAFF_TRANSITIONS = {
+    Status.DRAFT: {Status.PENDING, Status.CONFIRMED, Status.PREPARATION, Status.DELIVERY,
+                   Status.WAITING_PAYMENT, Status.DELIVERED, Status.FINISHED, Status.CANCELED},
+    Status.PENDING: {Status.CONFIRMED, Status.PREPARATION, Status.DELIVERY, Status.WAITING_PAYMENT,
+                     Status.DELIVERED, Status.FINISHED, Status.CANCELED},
+    Status.CONFIRMED: {Status.PREPARATION, Status.DELIVERY, Status.WAITING_PAYMENT, Status.DELIVERED,
+                       Status.FINISHED, Status.CANCELED},
+    Status.PREPARATION: {Status.DELIVERY, Status.WAITING_PAYMENT, Status.DELIVERED, Status.FINISHED,
+                         Status.CANCELED},
+    Status.DELIVERY: {Status.WAITING_PAYMENT, Status.DELIVERED, Status.FINISHED},
+    Status.WAITING_PAYMENT: {Status.DELIVERED, Status.FINISHED},
+    Status.DELIVERED: {Status.FINISHED},
+    Status.FINISHED: set(),
+    Status.CANCELED: set(),
+}
+
+USER_TRANSITIONS = {
+    Status.DRAFT: {Status.CONFIRMED},
+    Status.PENDING: {Status.CONFIRMED},
+}
+
+
+def allowed_sources(target: str, transitions: dict, keep: bool = False) -> list[str]:
+    """Statuses from which target may be set (and target itself if keep: only other columns change)"""
+    sources = [str(status) for status, targets in transitions.items() if target in targets]
+    if keep and target not in sources:
+        sources.append(str(target))
+    return sources
+
+
+def _update_returning(filters: dict, sources: list[str], values: dict) -> Order | None:
+    """
+    UPDATE of the one active order matching filters whose status is one of sources, in a
+    single statement that returns the updated row (None if no row matched). RETURNING
+    needs PostgreSQL or SQLite 3.35+
+    """
+    using = router.db_for_write(Order)
+    connection = connections[using]
+    meta, quote = Order._meta, connection.ops.quote_name
+    fields = {name: meta.get_field(name) for name in [*values, *filters]}
+
+    assignments = ", ".join(f"{quote(fields[name].column)} = %s" for name in values)
+    conditions = " AND ".join(f"{quote(fields[name].column)} = %s" for name in filters)
+    sql = (
+        f"UPDATE {quote(meta.db_table)} SET {assignments}"
+        f" WHERE {conditions} AND {quote('is_active')} = %s"
+        f" AND {quote(meta.get_field('status').column)} IN ({', '.join(['%s'] * len(sources))})"
+        f" RETURNING {', '.join(quote(field.column) for field in meta.concrete_fields)}"
+    )
+    params = [
+        *(fields[name].get_db_prep_save(value, connection) for name, value in values.items()),
+        *(fields[name].get_db_prep_value(value, connection) for name, value in filters.items()),
+        True,
+        *sources,
+    ]
+    # a raw queryset converts the returned columns like any query of the model
+    return next(iter(Order._base_manager.raw(sql, params, using=using)), None)
+
+
+def transition_order(filters: dict, target: str, transitions: dict, **changes) -> Order:
+    """
+    Move the active order matching filters (e.g. uuid, user) to target, with any other column
+    changes, if the workflow allows it from its current status. Checked and applied by one
+    conditional UPDATE, so of two concurrent transitions only the first valid one is applied.
+
+    Raises ValidationError for values outside the field choices, HttpError(404) when no order
+    matches and HttpError(400) when the transition is not allowed
+    """
+    target = str(target)
+    errors = {}
+    for name, value in {"status": target, **changes}.items():
+        try:
+            Order._meta.get_field(name).clean(value, None)
+        except ValidationError as e:
+            errors[name] = e.messages
+    if errors:
+        raise ValidationError(errors)
+
+    sources = allowed_sources(target, transitions, keep=bool(changes))
+    values = {"status": target, **changes, "updated_at": timezone.now()}
+    order = _update_returning(filters, sources, values) if sources else None
+    if order is None:
+        current = Order.objects.filter(**filters).values_list("status", flat=True).first()
+        if current is None:
+            raise HttpError(404, "Not Found")
+        raise HttpError(400, f"Order cannot go from '{current}' to '{target}' status")
+    return order
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+from pathlib import PurePath
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from pydantic import ValidationError as SchemaValidationError
+
+from api.models import Product
+from api.schemas.products import ProductImportRow
+from api.services.catalog import bump_catalog_version
+
+# --- Bulk import ---
+# Rows are validated without touching the database (schema types, then the model field
+# rules) and written with one INSERT ... ON CONFLICT (sku) DO UPDATE per batch, instead
+# of a full_clean() and save() (and their uniqueness queries) per product.
+
+# columns an import sets on products that already exist (created_at and uuid are kept);
+# is_active too, so importing the SKU of a soft-deleted product puts it back in the catalog
+IMPORT_UPDATE_FIELDS = ["name", "description", "price", "promotion", "is_active", "updated_at"]
+
+
+def product_file_format(filename: str) -> str:
+    """csv or json, from the file extension"""
+    suffix = PurePath(filename or "").suffix.lower().lstrip(".")
+    if suffix not in ("csv", "json"):
+        raise ValueError("use a .csv or .json file")
+    return suffix
+
+
+def read_product_file(content: bytes, format: str) -> list[dict]:
+    """Rows of a CSV file (with a header line) or of a JSON array of objects"""
+    try:
+        text = content.decode("utf-8-sig")
+        if format == "csv":
+            # an empty cell means "not given", so optional columns fall back to their default
+            return [
+                {key: value for key, value in row.items() if key and value not in ("", None)}
+                for row in csv.DictReader(io.StringIO(text))
+            ]
+        rows = json.loads(text)
+    except csv.Error as exc:
+        raise ValueError(str(exc))
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("expected a JSON array of objects")
+    return rows
+
+
+def _schema_errors(exc: SchemaValidationError) -> dict[str, list[str]]:
+    errors = {}
+    for error in exc.errors():
+        field = ".".join(str(part) for part in error["loc"]) or "__all__"
+        errors.setdefault(field, []).append(error["msg"])
+    return errors
+
+
+def _validated_product(raw: dict) -> tuple[Product | None, dict[str, list[str]] | None]:
+    try:
+        row = ProductImportRow.model_validate(raw)
+    except SchemaValidationError as exc:
+        return None, _schema_errors(exc)
+    product = Product(sku=row.sku, name=row.name, description=row.description, price=row.price,
+                      promotion=row.promotion)
+    try:
+        product.clean_fields()  # max lengths, decimal places...; no uniqueness queries
+    except ValidationError as exc:
+        return None, exc.message_dict
+    return product, None
+
+
+def import_products(rows: list[dict], batch_size: int = 1000) -> dict:
+    """
+    Create or update (keyed on sku) the products of the rows, batch_size per statement.
+    Invalid rows are skipped and reported; the others are imported
+    """
+    created = updated = 0
+    errors = []
+    first_seen = {}
+    for start in range(0, len(rows), batch_size):
+        batch = []
+        for position, raw in enumerate(rows[start:start + batch_size], start=start + 1):
+            product, row_errors = _validated_product(raw)
+            if product is not None and product.sku in first_seen:
+                product, row_errors = None, {"sku": [f"Duplicate SKU, first used in row {first_seen[product.sku]}"]}
+            if product is None:
+                sku = raw.get("sku")
+                errors.append({"row": position, "sku": None if sku is None else str(sku), "errors": row_errors})
+                continue
+            first_seen[product.sku] = position
+            batch.append(product)
+        if not batch:
+            continue
+        with transaction.atomic():
+            existing = Product._base_manager.filter(sku__in=[product.sku for product in batch]).count()
+            Product._base_manager.bulk_create(batch, update_conflicts=True, unique_fields=["sku"],
+                                              update_fields=IMPORT_UPDATE_FIELDS)
+        created += len(batch) - existing
+        updated += existing
+    if created or updated:
+        # bulk_create sends no post_save, so the catalog caches are invalidated here
+        bump_catalog_version()
+    return {"created": created, "updated": updated, "errors": errors}
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.models import Product
+from api.services.catalog import bump_catalog_version
+
+
+# save() covers create, update, soft_delete/restore and image upload
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog(sender, instance, **kwargs):
+    bump_catalog_version()
@@ -0,0 +1,45 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+
+from accounts.utils import create_access_token
+
+User = get_user_model()
+
+
+# Fixtures shared by the api tests; a test module may still define its own with the same name.
+
+@pytest.fixture
+def client():
+    return Client()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        username="testuser",
+        email="test@example.com",
+        password="testpass123"
+    )
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(
+        username="staffuser",
+        email="staff@example.com",
+        password="staffpass123",
+        is_staff=True
+    )
+
+
+@pytest.fixture
+def auth_headers(user):
+    token = create_access_token(user.id)
+    return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+
+@pytest.fixture
+def staff_auth_headers(staff_user):
+    token = create_access_token(staff_user.id)
+    return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
@@ -0,0 +1,165 @@
+import csv
+import gzip
+import json
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.db import connection
+
+from api.models import Order, DeliveryAddress, Product, OrderItem
+
+User = get_user_model()
+
+
+@pytest.fixture
+def another_user():
+    return User.objects.create_user(
+        username="anotheruser",
+        email="another@example.com",
+        password="anotherpass123"
+    )
+
+
+@pytest.fixture
+def delivery_address(user):
+    return DeliveryAddress.objects.create(
+        user=user,
+        address_name="Minha Casa",
+        address_description="Rua Teste, 123",
+        city="São Paulo",
+        state="SP",
+        zip_code="01234567"
+    )
+
+
+@pytest.fixture
+def another_delivery_address(another_user):
+    return DeliveryAddress.objects.create(
+        user=another_user,
+        address_name="Casa do Outro",
+        address_description="Rua Outro, 456",
+        city="Rio de Janeiro",
+        state="RJ",
+        zip_code="20000000"
+    )
+
+
+@pytest.fixture
+def order(user, delivery_address):
+    return Order.objects.create(
+        user=user,
+        delivery_address=delivery_address,
+        payment_method=Order.PaymentMethod.PIX,
+        status=Order.OrderStatus.DRAFT
+    )
+
+
+@pytest.fixture
+def another_order(another_user, another_delivery_address):
+    return Order.objects.create(
+        user=another_user,
+        delivery_address=another_delivery_address,
+        payment_method=Order.PaymentMethod.CREDIT_CARD,
+        status=Order.OrderStatus.DRAFT
+    )
+
+
+@pytest.fixture
+def product():
+    return Product.objects.create(
+        name="Produto Teste",
+        description="Descrição do produto",
+        price=100.00,
+        promotion=False
+    )
+
+
+@pytest.fixture
+def order_item(order, product):
+    return OrderItem.objects.create(
+        order=order,
+        product=product,
+        quantity=2,
+        unit_price=product.price
+    )
+
+
+@pytest.fixture
+def another_order_item(another_order, product):
+    return OrderItem.objects.create(
+        order=another_order,
+        product=product,
+        quantity=1,
+        unit_price=product.price
+    )
+
+
+# --- TESTES PARA EXPORTAÇÃO DAS LINHAS DE PEDIDO (COMANDO) ---
+
+@pytest.mark.django_db
+def test_export_order_lines_csv(order, another_order, order_item, another_order_item, product, tmp_path):
+    """Testa o dump em CSV compactado, uma linha por item com pedido, usuário e produto"""
+    output = tmp_path / "lines.csv.gz"
+    out = StringIO()
+    call_command("export_order_lines", "--output", str(output), "--chunk-size", "1", stdout=out)
+
+    with gzip.open(output, "rt", newline="") as stream:
+        rows = list(csv.DictReader(stream))
+    assert [row["order_uuid"] for row in rows] == [
+        str(o.uuid) for o in sorted([order, another_order], key=lambda o: o.order_number)
+    ]
+    line = next(row for row in rows if row["order_uuid"] == str(order.uuid))
+    assert line["username"] == order.user.username
+    assert line["product_name"] == product.name
+    assert Decimal(line["line_total"]) == order_item.quantity * order_item.unit_price
+    assert "Exported 2 lines" in out.getvalue()
+    assert "rows/s" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_export_order_lines_ndjson_filtered(order, another_order, order_item, another_order_item, tmp_path):
+    """Testa o dump em NDJSON filtrado por status"""
+    Order.objects.filter(pk=another_order.pk).update(status=Order.OrderStatus.CONFIRMED)
+    output = tmp_path / "lines.ndjson.gz"
+    call_command("export_order_lines", "--output", str(output), "--format", "ndjson", "--status", "CONFIRMED",
+                 stdout=StringIO())
+
+    with gzip.open(output, "rt") as stream:
+        rows = [json.loads(line) for line in stream]
+    assert [row["order_uuid"] for row in rows] == [str(another_order.uuid)]
+    assert rows[0]["item_quantity"] == another_order_item.quantity
+
+
+@pytest.mark.django_db(transaction=True)
+def test_write_order_lines_reads_inside_transaction(order, order_item):
+    """Testa que as linhas são lidas dentro de uma transação (cursor sem WITH HOLD no PostgreSQL)"""
+    from api.services.exports import order_lines, write_order_lines
+
+    seen = []
+    count = write_order_lines(order_lines(Order.objects.all()), StringIO(), "ndjson", chunk_size=1,
+                              progress=lambda _: seen.append(connection.in_atomic_block))
+
+    assert count == 1
+    assert seen == [True]
+    assert not connection.in_atomic_block
+
+
+@pytest.mark.django_db
+def test_export_order_lines_invalid_status(tmp_path):
+    """Testa que um status inexistente interrompe o comando"""
+    with pytest.raises(CommandError):
+        call_command("export_order_lines", "--output", str(tmp_path / "x.gz"), "--status", "LOST",
+                     stdout=StringIO())
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("chunk_size", ["0", "-5"])
+def test_export_order_lines_invalid_chunk_size(tmp_path, chunk_size):
+    """Testa que um --chunk-size que não é positivo é recusado antes de exportar"""
+    output = tmp_path / "x.gz"
+    with pytest.raises(CommandError, match="chunk-size"):
+        call_command("export_order_lines", "--output", str(output), "--chunk-size", chunk_size, stdout=StringIO())
+    assert not output.exists()
@@ -0,0 +1,369 @@
+from uuid import uuid4
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+from django.test import Client
+
+from accounts.passwords import password_hashing
+from accounts.utils import create_access_token, decode_token
+from api.models import Order, DeliveryAddress, Product, OrderItem
+
+User = get_user_model()
+
+
+@pytest.fixture
+def client():
+    return Client()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        username="testuser",
+        email="test@example.com",
+        password="testpass123"
+    )
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(
+        username="staffuser",
+        email="staff@example.com",
+        password="staffpass123",
+        is_staff=True
+    )
+
+
+@pytest.fixture
+def another_user():
+    return User.objects.create_user(
+        username="anotheruser",
+        email="another@example.com",
+        password="anotherpass123"
+    )
+
+
+@pytest.fixture
+def delivery_address(user):
+    return DeliveryAddress.objects.create(
+        user=user,
+        address_name="Minha Casa",
+        address_description="Rua Teste, 123",
+        city="São Paulo",
+        state="SP",
+        zip_code="01234567"
+    )
+
+
+@pytest.fixture
+def another_delivery_address(another_user):
+    return DeliveryAddress.objects.create(
+        user=another_user,
+        address_name="Casa do Outro",
+        address_description="Rua Outro, 456",
+        city="Rio de Janeiro",
+        state="RJ",
+        zip_code="20000000"
+    )
+
+
+@pytest.fixture
+def product():
+    return Product.objects.create(
+        name="Cupcake de Chocolate",
+        description="Delicioso cupcake de chocolate com cobertura",
+        price=15.50
+    )
+
+
+@pytest.fixture
+def order(user, delivery_address, product):
+    order = Order.objects.create(
+        user=user,
+        delivery_address=delivery_address,
+        payment_method=Order.PaymentMethod.PIX
+    )
+    OrderItem.objects.create(order=order, product=product, quantity=2, unit_price=product.price)
+    return order
+
+
+@pytest.fixture
+def another_order(another_user, another_delivery_address):
+    return Order.objects.create(
+        user=another_user,
+        delivery_address=another_delivery_address,
+        payment_method=Order.PaymentMethod.CREDIT_CARD
+    )
+
+
+@pytest.fixture
+def auth_headers(user):
+    token = create_access_token(user.id)
+    return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+
+@pytest.fixture
+def staff_auth_headers(staff_user):
+    token = create_access_token(staff_user.id)
+    return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+
+# --- TESTES PARA PRODUTOS (ASYNC) ---
+
+@pytest.mark.django_db
+def test_async_list_products(client, product):
+    """Testa listagem assíncrona de produtos com a mesma resposta da versão síncrona"""
+    response = client.get("/api/async/products/")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["uuid"] for item in data["items"]] == [str(product.uuid)]
+    assert data == client.get("/api/products/").json()
+
+
+@pytest.mark.django_db
+def test_async_get_product(client, product):
+    """Testa busca assíncrona de produto e 404"""
+    response = client.get(f"/api/async/products/{product.uuid}")
+    assert response.status_code == 200
+    assert response.json()["name"] == product.name
+
+    assert client.get(f"/api/async/products/{uuid4()}").status_code == 404
+
+
+@pytest.mark.django_db
+def test_async_get_catalog(client, product):
+    """Testa o snapshot do catálogo pela rota assíncrona"""
+    response = client.get("/api/async/products/catalog")
+
+    assert response.status_code == 200
+    assert response.content == client.get("/api/products/catalog").content
+
+
+# --- TESTES PARA PEDIDOS (ASYNC) ---
+
+@pytest.mark.django_db
+def test_async_list_orders(client, order, another_order, auth_headers):
+    """Testa que a listagem assíncrona traz apenas os pedidos do usuário"""
+    response = client.get("/api/async/orders/", **auth_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["uuid"] for item in data] == [str(order.uuid)]
+    assert data[0]["delivery_address"]["city"] == "São Paulo"
+
+
+@pytest.mark.django_db
+def test_async_list_orders_staff(client, order, another_order, staff_auth_headers, auth_headers):
+    """Testa listagem assíncrona de todos os pedidos para staff"""
+    response = client.get("/api/async/orders/admin", **staff_auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+    assert "user" in response.json()["items"][0]
+
+    assert client.get("/api/async/orders/admin", **auth_headers).status_code == 403
+
+
+@pytest.mark.django_db
+def test_async_get_order(client, order, another_order, auth_headers, staff_auth_headers):
+    """Testa busca assíncrona de pedido"""
+    assert client.get(f"/api/async/orders/{order.uuid}", **auth_headers).status_code == 200
+    assert client.get(f"/api/async/orders/{another_order.uuid}", **auth_headers).status_code == 404
+    response = client.get(f"/api/async/orders/admin/{another_order.uuid}", **staff_auth_headers)
+    assert response.json()["user"]["username"] == "anotheruser"
+
+
+@pytest.mark.django_db
+def test_async_orders_with_claims(client, order, another_order, user, staff_user, settings,
+                                  django_capture_on_commit_callbacks):
+    """Testa as rotas assíncronas com claims no access token, inclusive após desativação"""
+    from accounts.utils import access_token_claims
+    settings.ACCESS_TOKEN_CLAIMS = True
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {create_access_token(user.id, access_token_claims(user))}"}
+    staff = {"HTTP_AUTHORIZATION": f"Bearer {create_access_token(staff_user.id, access_token_claims(staff_user))}"}
+
+    assert [item["uuid"] for item in client.get("/api/async/orders/", **headers).json()] == [str(order.uuid)]
+    assert client.get("/api/async/orders/admin", **staff).status_code == 200
+    assert client.get("/api/async/orders/admin", **headers).status_code == 403
+
+    user.is_active = False
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+    assert client.get("/api/async/orders/", **headers).status_code == 401
+
+
+@pytest.mark.django_db
+def test_async_orders_without_auth(client):
+    """Testa rotas assíncronas sem autenticação"""
+    assert client.get("/api/async/orders/").status_code == 401
+
+
+# --- TESTES PARA ITENS DO PEDIDO (ASYNC) ---
+
+@pytest.mark.django_db
+def test_async_list_order_items(client, order, auth_headers):
+    """Testa listagem assíncrona de pedidos com itens"""
+    response = client.get("/api/async/order-items/", **auth_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data == client.get("/api/order-items/", **auth_headers).json()
+    assert data[0]["products"][0]["quantity"] == 2
+
+
+@pytest.mark.django_db
+def test_async_order_items_staff(client, order, another_order, staff_auth_headers):
+    """Testa listagem e busca assíncronas de pedidos com itens para staff"""
+    response = client.get("/api/async/order-items/admin", **staff_auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+    response = client.get(f"/api/async/order-items/admin/{order.uuid}", **staff_auth_headers)
+    assert response.json()["user"]["username"] == "testuser"
+
+
+@pytest.mark.django_db
+def test_async_get_order_item(client, order, another_order, auth_headers):
+    """Testa busca assíncrona de pedido com itens"""
+    response = client.get(f"/api/async/order-items/{order.uuid}", **auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()["products"]) == 1
+
+    assert client.get(f"/api/async/order-items/{another_order.uuid}", **auth_headers).status_code == 404
+
+
+# --- TESTES PARA ENDEREÇOS E USUÁRIO (ASYNC) ---
+
+@pytest.mark.django_db
+def test_async_delivery_addresses(client, delivery_address, another_delivery_address, auth_headers):
+    """Testa listagem e busca assíncronas de endereços"""
+    response = client.get("/api/async/delivery-addresses/", **auth_headers)
+    assert [item["uuid"] for item in response.json()] == [str(delivery_address.uuid)]
+
+    assert client.get(f"/api/async/delivery-addresses/{delivery_address.uuid}", **auth_headers).status_code == 200
+    response = client.get(f"/api/async/delivery-addresses/{another_delivery_address.uuid}", **auth_headers)
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_async_get_me(client, user, auth_headers):
+    """Testa a rota assíncrona do usuário autenticado"""
+    response = client.get("/api/async/users/me", **auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["username"] == user.username
+
+
+@pytest.mark.django_db
+def test_async_get_me_inactive_user(client, user, auth_headers):
+    """Testa que usuário desativado é rejeitado pelo AsyncAuthBearer"""
+    user.is_active = False
+    user.save()
+
+    assert client.get("/api/async/users/me", **auth_headers).status_code == 401
+
+
+# --- TESTES PARA AUTENTICAÇÃO (ASYNC) ---
+
+@pytest.mark.django_db
+def test_async_login(client, user):
+    """Testa login assíncrono, com o hash calculado no pool de senhas"""
+    response = client.post("/api/async/auth/login", data={"username": "testuser", "password": "testpass123"},
+                           content_type="application/json")
+
+    assert response.status_code == 200
+    assert decode_token(response.json()["access"])["user_id"] == user.id
+    assert password_hashing.pending == 0
+
+
+@pytest.mark.django_db
+def test_async_login_invalid_credentials(client, user):
+    """Testa login assíncrono com senha errada, usuário inexistente e usuário inativo"""
+    for username, password in [("testuser", "wrong"), ("nobody", "testpass123")]:
+        response = client.post("/api/async/auth/login", data={"username": username, "password": password},
+                               content_type="application/json")
+        assert response.status_code == 401
+
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    response = client.post("/api/async/auth/login", data={"username": "testuser", "password": "testpass123"},
+                           content_type="application/json")
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_async_login_rehashes_legacy_password(client, user, settings):
+    """Testa que o login assíncrono também converte hashes antigos para o hasher preferido"""
+    settings.PASSWORD_PBKDF2_ITERATIONS = 1000
+    User.objects.filter(pk=user.pk).update(password=make_password("testpass123", hasher="pbkdf2_sha256"))
+
+    response = client.post("/api/async/auth/login", data={"username": "testuser", "password": "testpass123"},
+                           content_type="application/json")
+
+    assert response.status_code == 200
+    user.refresh_from_db()
+    assert identify_hasher(user.password).algorithm == get_hasher().algorithm
+    assert user.check_password("testpass123")
+
+
+@pytest.mark.django_db
+def test_async_signup(client):
+    """Testa cadastro assíncrono"""
+    data = {"username": "newuser", "email": "newuser@example.com", "password": "newpass123",
+            "first_name": "New", "last_name": "User", "cpf": "98765432100"}
+    response = client.post("/api/async/auth/signup", data=data, content_type="application/json")
+
+    assert response.status_code == 200
+    created = User.objects.get(username="newuser")
+    assert str(created.uuid) == response.json()["uuid"]
+    assert created.check_password("newpass123")
+
+    response = client.post("/api/async/auth/signup", data=data, content_type="application/json")
+    assert response.json() == {"error": "User already exists"}
+
+
+@pytest.mark.django_db
+def test_async_change_password(client, user, auth_headers):
+    """Testa troca de senha assíncrona"""
+    url = "/api/async/users/me/change-password"
+    data = {"old_password": "wrong", "new_password": "newpass456"}
+    assert client.post(url, data=data, content_type="application/json", **auth_headers).json()["success"] is False
+
+    data = {"old_password": "testpass123", "new_password": "newpass456"}
+    assert client.post(url, data=data, content_type="application/json", **auth_headers).json()["success"] is True
+    user.refresh_from_db()
+    assert user.check_password("newpass456")
+
+
+@pytest.mark.django_db
+def test_async_change_password_with_stale_cache(client, user, auth_headers):
+    """Testa que a troca de senha assíncrona confere o hash do banco e não regrava is_active"""
+    client.get("/api/async/users/me", **auth_headers)
+    User.objects.filter(pk=user.pk).update(password=make_password("changedpass456"), first_name="Outro")
+    url = "/api/async/users/me/change-password"
+
+    data = {"old_password": "testpass123", "new_password": "newpass456"}
+    assert client.post(url, data=data, content_type="application/json", **auth_headers).json()["success"] is False
+
+    data = {"old_password": "changedpass456", "new_password": "newpass456"}
+    assert client.post(url, data=data, content_type="application/json", **auth_headers).json()["success"] is True
+    user.refresh_from_db()
+    assert user.check_password("newpass456")
+    assert user.first_name == "Outro"
+
+
+@pytest.mark.django_db
+def test_async_login_pool_saturated(client, user, settings, monkeypatch):
+    """Testa que com o pool de senhas cheio o login responde 503 sem calcular hash"""
+    settings.PASSWORD_HASH_WORKERS = 1
+    settings.PASSWORD_HASH_QUEUE_SIZE = 0
+    monkeypatch.setattr(password_hashing, "pending", 1)
+    rejected = password_hashing.rejected
+
+    response = client.post("/api/async/auth/login", data={"username": "testuser", "password": "testpass123"},
+                           content_type="application/json")
+
+    assert response.status_code == 503
+    assert response["Retry-After"] == "1"
+    assert password_hashing.rejected == rejected + 1
@@ -0,0 +1,94 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Order, DeliveryAddress, Product
+from api.services.ordernumbers import order_numbers
+
+User = get_user_model()
+
+pytestmark = pytest.mark.skipif(connection.vendor != "postgresql", reason="EXPLAIN plans are checked on PostgreSQL")
+
+
+@pytest.fixture
+def seeded(user):
+    """Some thousands of rows (10% soft deleted) and fresh planner statistics"""
+    users = [user] + User.objects.bulk_create(
+        [User(username=f"seed_{n}", email=f"seed{n}@example.com", password="!") for n in range(60)]
+    )
+    addresses = DeliveryAddress.objects.bulk_create([
+        DeliveryAddress(user=owner, address_name=f"Casa {n}", address_description="Rua Teste, 123",
+                        city="São Paulo", state="SP", zip_code="01234567", is_active=n % 10 != 0)
+        for owner in users
+        for n in range(20)
+    ])
+    active_addresses = {}
+    for address in addresses:
+        active_addresses.setdefault(address.user_id, address)
+    numbers = iter(order_numbers.reserve(len(users) * 50))
+    statuses = Order.OrderStatus.values
+    Order.objects.bulk_create([
+        Order(user=owner, delivery_address=active_addresses[owner.id], payment_method="PIX",
+              order_number=next(numbers), status=statuses[n % len(statuses)], is_active=n % 10 != 0)
+        for owner in users
+        for n in range(50)
+    ])
+    Product.objects.bulk_create([
+        Product(name=f"Cupcake {n}", description="Cupcake", price="10.00", is_active=n % 10 != 0)
+        for n in range(3000)
+    ])
+    with connection.cursor() as cursor:
+        for table in ("api_order", "api_product", "api_deliveryaddress"):
+            cursor.execute(f"ANALYZE {table}")
+
+
+def _plan(client, url, headers, table):
+    """EXPLAIN of the query the endpoint actually ran against `table`"""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, **headers)
+    assert response.status_code == 200
+    sql = next(
+        query["sql"] for query in context.captured_queries
+        if query["sql"].startswith("SELECT") and f'FROM "{table}"' in query["sql"]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN {sql}")
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+# --- TESTES PARA PLANOS DE CONSULTA ---
+
+@pytest.mark.django_db
+def test_product_list_uses_partial_index(client, seeded):
+    """Testa que a listagem de produtos usa o índice parcial de produtos ativos"""
+    plan = _plan(client, "/api/products/", {}, "api_product")
+    assert "product_active_created_idx" in plan
+    assert "Seq Scan" not in plan
+
+
+@pytest.mark.django_db
+def test_user_orders_use_partial_index(client, seeded, auth_headers):
+    """Testa que a listagem de pedidos do usuário usa o índice (user, created_at) de pedidos ativos"""
+    plan = _plan(client, "/api/orders/", auth_headers, "api_order")
+    assert "order_active_user_idx" in plan
+    assert "Seq Scan on api_order" not in plan
+
+
+@pytest.mark.django_db
+def test_staff_dashboard_uses_partial_indexes(client, seeded, staff_auth_headers):
+    """Testa que o painel de staff usa os índices parciais, com e sem filtro de status"""
+    plan = _plan(client, "/api/orders/admin", staff_auth_headers, "api_order")
+    assert "order_active_created_idx" in plan
+
+    plan = _plan(client, "/api/orders/admin?status=CONFIRMED", staff_auth_headers, "api_order")
+    assert "order_active_status_idx" in plan
+    assert "Seq Scan on api_order" not in plan
+
+
+@pytest.mark.django_db
+def test_user_addresses_use_partial_index(client, seeded, auth_headers):
+    """Testa que a listagem de endereços usa o índice (user, created_at) de endereços ativos"""
+    plan = _plan(client, "/api/delivery-addresses/", auth_headers, "api_deliveryaddress")
+    assert "address_active_user_idx" in plan
+    assert "Seq Scan on api_deliveryaddress" not in plan
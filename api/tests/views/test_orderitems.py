@@ -1,8 +1,14 @@
+import json
+from decimal import Decimal
+from io import StringIO
 from uuid import uuid4
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.db import connection
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
 
 from accounts.utils import create_access_token
 from api.models import Order, DeliveryAddress, Product, OrderItem
@@ -374,7 +380,7 @@ def test_list_order_items_staff_success(client, order, another_order, order_item
     response = client.get("/api/order-items/admin", **staff_auth_headers)
 
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
     assert len(data) == 2
     uuids = [item["order_uuid"] for item in data]
     assert str(order.uuid) in uuids
@@ -388,6 +394,21 @@ def test_list_order_items_staff_forbidden_for_regular_user(client, auth_headers)
     assert response.status_code == 403
 
 
+@pytest.mark.django_db
+def test_list_order_items_staff_summary(client, order, another_order, order_item, another_order_item,
+                                        staff_auth_headers):
+    """Testa a projeção resumida com quantidade de itens e total do pedido"""
+    response = client.get(f"/api/order-items/admin?view=summary&user_uuid={order.user.uuid}", **staff_auth_headers)
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == 1
+    assert items[0]["uuid"] == str(order.uuid)
+    assert items[0]["items_count"] == 1
+    assert items[0]["total_amount"] == float(order_item.quantity * order_item.unit_price)
+    assert "products" not in items[0]
+
+
 # --- TESTES PARA GET ORDER ITEM ---
 
 @pytest.mark.django_db
@@ -402,6 +423,16 @@ def test_get_order_item_success(client, user, order, order_item, auth_headers):
     assert data["products"][0]["quantity"] == order_item.quantity
 
 
+@pytest.mark.django_db
+def test_get_order_item_product_sku(client, order, product, order_item, auth_headers):
+    """Testa que os itens trazem o SKU do produto"""
+    Product.objects.filter(pk=product.pk).update(sku="CUP-001")
+
+    response = client.get(f"/api/order-items/{order.uuid}", **auth_headers)
+
+    assert response.json()["products"][0]["sku"] == "CUP-001"
+
+
 @pytest.mark.django_db
 def test_get_order_item_not_found(client, auth_headers):
     """Testa busca de pedido inexistente"""
@@ -630,3 +661,286 @@ def test_delete_order_item_staff_not_found(client, order, staff_auth_headers):
     )
 
     assert response.status_code == 404
+
+
+# --- TESTES PARA SINCRONIZAÇÃO DO CARRINHO (BULK) ---
+
+def _products(count):
+    return [
+        Product.objects.create(name=f"Cupcake {i}", description="Cupcake", price=10 + i)
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+def test_sync_order_items_add_update_remove(client, order, product, another_product, order_item, auth_headers):
+    """Testa adição, atualização e remoção de vários itens em uma única requisição"""
+    new_product = Product.objects.create(name="Cupcake Novo", description="Novo", price=20)
+    data = {
+        "order_uuid": str(order.uuid),
+        "items": [
+            {"product_uuid": str(product.uuid), "quantity": 0},
+            {"product_uuid": str(another_product.uuid), "quantity": 4},
+            {"product_uuid": str(new_product.uuid), "quantity": 1},
+        ]
+    }
+
+    response = client.post("/api/order-items/bulk", data=data, content_type="application/json", **auth_headers)
+
+    assert response.status_code == 200
+    quantities = {item["uuid"]: item["quantity"] for item in response.json()["products"]}
+    assert quantities == {str(another_product.uuid): 4, str(new_product.uuid): 1}
+    assert not OrderItem.objects.filter(order=order, product=product).exists()
+    assert OrderItem.objects.get(order=order, product=new_product).unit_price == new_product.price
+
+    data["items"] = [{"product_uuid": str(another_product.uuid), "quantity": 2}]
+    response = client.post("/api/order-items/bulk", data=data, content_type="application/json", **auth_headers)
+    assert OrderItem.objects.get(order=order, product=another_product).quantity == 2
+    assert len(response.json()["products"]) == 2
+
+
+@pytest.mark.django_db
+def test_sync_order_items_query_count_is_constant(client, order, auth_headers):
+    """Testa que o número de queries não cresce com a quantidade de itens"""
+    def sync(products, quantity):
+        data = {
+            "order_uuid": str(order.uuid),
+            "items": [{"product_uuid": str(p.uuid), "quantity": quantity} for p in products],
+        }
+        with CaptureQueriesContext(connection) as context:
+            response = client.post("/api/order-items/bulk", data=data, content_type="application/json",
+                                   **auth_headers)
+        assert response.status_code == 200
+        return len(context.captured_queries)
+
+    client.get("/api/order-items/", **auth_headers)  # aquece o cache do usuário autenticado
+    few, many = _products(2), _products(20)
+
+    assert sync(few, 1) == sync(many, 1)
+    assert sync(few, 3) == sync(many, 3)
+    assert sync(few, 0) == sync(many, 0)
+    assert OrderItem.objects.filter(order=order).count() == 0
+
+
+@pytest.mark.django_db
+def test_sync_order_items_product_not_found(client, order, product, auth_headers):
+    """Testa que nenhum item é alterado quando algum produto não existe"""
+    data = {
+        "order_uuid": str(order.uuid),
+        "items": [
+            {"product_uuid": str(product.uuid), "quantity": 1},
+            {"product_uuid": str(uuid4()), "quantity": 1},
+        ]
+    }
+
+    response = client.post("/api/order-items/bulk", data=data, content_type="application/json", **auth_headers)
+
+    assert response.status_code == 404
+    assert OrderItem.objects.filter(order=order).count() == 0
+
+
+@pytest.mark.django_db
+def test_sync_order_items_confirmed_order(client, confirmed_order, product, auth_headers):
+    """Testa que não é possível alterar itens de pedido confirmado"""
+    data = {"order_uuid": str(confirmed_order.uuid), "items": [{"product_uuid": str(product.uuid), "quantity": 1}]}
+
+    response = client.post("/api/order-items/bulk", data=data, content_type="application/json", **auth_headers)
+
+    assert response.status_code == 400
+    assert "cannot change items" in response.json()["detail"].lower()
+
+
+@pytest.mark.django_db
+def test_sync_cart_rechecks_status_under_lock(order, product):
+    """Testa que a sincronização recusa um pedido confirmado depois de ter sido lido"""
+    from ninja.errors import HttpError
+    from api.schemas.orderitems import CartItemIn
+    from api.services.orderitems import sync_cart
+
+    Order.objects.filter(pk=order.pk).update(status=Order.OrderStatus.CONFIRMED)  # o pedido lido ficou velho
+
+    with pytest.raises(HttpError) as error:
+        sync_cart(order, [CartItemIn(product_uuid=product.uuid, quantity=1)])
+
+    assert error.value.status_code == 400
+    assert OrderItem.objects.filter(order=order).count() == 0
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="concurrent writers require PostgreSQL")
+@pytest.mark.django_db(transaction=True)
+def test_sync_cart_concurrent_same_new_product(order, product):
+    """Testa que sincronizações simultâneas que incluem o mesmo produto novo não falham"""
+    from concurrent.futures import ThreadPoolExecutor
+    from api.schemas.orderitems import CartItemIn
+    from api.services.orderitems import sync_cart
+
+    def sync(quantity):
+        try:
+            sync_cart(Order.objects.get(pk=order.pk), [CartItemIn(product_uuid=product.uuid, quantity=quantity)])
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(sync, range(1, 9)))
+
+    assert OrderItem.objects.filter(order=order).count() == 1
+    order.refresh_from_db()
+    assert order.items_count == 1
+
+
+@pytest.mark.django_db
+def test_sync_order_items_forbidden_other_user_order(client, another_order, product, auth_headers):
+    """Testa que usuário não pode alterar itens de pedido de outro usuário"""
+    data = {"order_uuid": str(another_order.uuid), "items": [{"product_uuid": str(product.uuid), "quantity": 1}]}
+
+    response = client.post("/api/order-items/bulk", data=data, content_type="application/json", **auth_headers)
+
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_sync_order_items_negative_quantity(client, order, product, auth_headers):
+    """Testa validação de quantidade negativa"""
+    data = {"order_uuid": str(order.uuid), "items": [{"product_uuid": str(product.uuid), "quantity": -1}]}
+
+    response = client.post("/api/order-items/bulk", data=data, content_type="application/json", **auth_headers)
+
+    assert response.status_code == 422
+
+
+# --- TESTES DE NÚMERO DE QUERIES ---
+
+def _create_orders_with_items(user, delivery_address, products, count):
+    for _ in range(count):
+        order = Order.objects.create(
+            user=user,
+            delivery_address=delivery_address,
+            payment_method=Order.PaymentMethod.PIX,
+        )
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.price)
+
+
+def _count_queries(client, url, headers):
+    client.get(url, **headers)  # aquece o cache do usuário autenticado
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, **headers)
+    assert response.status_code == 200
+    return len(context.captured_queries), response.json()
+
+
+@pytest.mark.django_db
+def test_list_order_items_query_count_is_constant(client, user, delivery_address, product, another_product,
+                                                  auth_headers):
+    """Testa que o número de queries não cresce com a quantidade de pedidos"""
+    _create_orders_with_items(user, delivery_address, [product, another_product], 1)
+    queries_with_one_order, data = _count_queries(client, "/api/order-items/", auth_headers)
+    assert len(data) == 1
+
+    _create_orders_with_items(user, delivery_address, [product, another_product], 10)
+    queries_with_many_orders, data = _count_queries(client, "/api/order-items/", auth_headers)
+    assert len(data) == 11
+    assert all(len(order["products"]) == 2 for order in data)
+
+    assert queries_with_many_orders == queries_with_one_order
+
+
+@pytest.mark.django_db
+def test_list_order_items_staff_query_count_is_constant(client, user, delivery_address, another_user,
+                                                        another_delivery_address, product, another_product,
+                                                        staff_auth_headers):
+    """Testa que o número de queries da listagem de staff não cresce com a quantidade de pedidos"""
+    _create_orders_with_items(user, delivery_address, [product], 1)
+    queries_with_one_order, data = _count_queries(client, "/api/order-items/admin", staff_auth_headers)
+    assert len(data["items"]) == 1
+
+    _create_orders_with_items(user, delivery_address, [product, another_product], 5)
+    _create_orders_with_items(another_user, another_delivery_address, [another_product], 5)
+    queries_with_many_orders, data = _count_queries(client, "/api/order-items/admin", staff_auth_headers)
+    assert len(data["items"]) == 11
+    assert {order["user"]["username"] for order in data["items"]} == {user.username, another_user.username}
+
+    assert queries_with_many_orders == queries_with_one_order
+
+
+# --- TESTES PARA EXPORT ORDER ITEMS STAFF ---
+
+@pytest.mark.django_db
+def test_export_order_items_staff_ndjson(client, order, another_order, order_item, another_order_item,
+                                         staff_auth_headers):
+    """Testa exportação em NDJSON dos pedidos com itens"""
+    response = client.get("/api/order-items/admin/export", **staff_auth_headers)
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert {row["order_uuid"] for row in rows} == {str(order.uuid), str(another_order.uuid)}
+    products = {row["order_uuid"]: [item["uuid"] for item in row["products"]] for row in rows}
+    assert products[str(order.uuid)] == [str(order_item.product.uuid)]
+    assert {row["user"]["username"] for row in rows} == {order.user.username, another_order.user.username}
+
+
+@pytest.mark.django_db
+def test_export_order_items_staff_queries_per_chunk(client, user, delivery_address, product, another_product,
+                                                    staff_auth_headers, settings):
+    """Testa que a exportação faz uma consulta de itens por bloco de pedidos, não por pedido"""
+    settings.EXPORT_CHUNK_SIZE = 5
+    _create_orders_with_items(user, delivery_address, [product, another_product], 11)
+    client.get("/api/order-items/admin", **staff_auth_headers)  # aquece o cache do usuário autenticado
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get("/api/order-items/admin/export?format=json", **staff_auth_headers)
+        rows = json.loads(b"".join(response.streaming_content))
+
+    assert len(rows) == 11
+    assert all(len(row["products"]) == 2 for row in rows)
+    assert len(context.captured_queries) == 1 + 3  # pedidos + itens de cada bloco de 5
+
+
+@pytest.mark.django_db
+def test_export_order_items_staff_forbidden_for_regular_user(client, auth_headers):
+    """Testa que usuário comum não pode exportar pedidos"""
+    response = client.get("/api/order-items/admin/export", **auth_headers)
+    assert response.status_code == 403
+
+
+# --- TESTES PARA TOTAIS DO PEDIDO ---
+
+@pytest.mark.django_db
+def test_order_totals_follow_item_changes(client, order, product, another_product, auth_headers):
+    """Testa que quantidade de itens e total do pedido acompanham criação, alteração e remoção"""
+    data = {"order_uuid": str(order.uuid), "product_uuid": str(product.uuid), "quantity": 2}
+    response = client.post("/api/order-items/", data=data, content_type="application/json", **auth_headers)
+    assert (response.json()["items_count"], response.json()["total_amount"]) == (1, 200.0)
+
+    data["quantity"] = 3
+    response = client.put("/api/order-items/", data=data, content_type="application/json", **auth_headers)
+    assert (response.json()["items_count"], response.json()["total_amount"]) == (1, 300.0)
+
+    data = {"order_uuid": str(order.uuid), "items": [{"product_uuid": str(another_product.uuid), "quantity": 4}]}
+    response = client.post("/api/order-items/bulk", data=data, content_type="application/json", **auth_headers)
+    assert (response.json()["items_count"], response.json()["total_amount"]) == (2, 500.0)
+
+    client.delete(f"/api/order-items/{order.uuid}/{product.uuid}", **auth_headers)
+    order.refresh_from_db()
+    assert (order.items_count, order.total_amount) == (1, Decimal("200.00"))
+
+    response = client.get("/api/orders/", **auth_headers)
+    assert (response.json()[0]["items_count"], response.json()[0]["total_amount"]) == (1, 200.0)
+
+
+@pytest.mark.django_db
+def test_reconcile_order_totals(order, order_item, another_order):
+    """Testa que o comando recalcula os totais que saíram de sincronia com os itens"""
+    Order.objects.filter(pk=order.pk).update(items_count=5, total_amount=1)
+
+    with pytest.raises(CommandError):
+        call_command("reconcile_order_totals", "--check", stdout=StringIO())
+
+    out = StringIO()
+    call_command("reconcile_order_totals", "--batch-size", "1", stdout=out)
+    assert "Checked 2 orders, fixed 1" in out.getvalue()
+    order.refresh_from_db()
+    assert (order.items_count, order.total_amount) == (1, order_item.quantity * order_item.unit_price)
+
+    call_command("reconcile_order_totals", "--check", stdout=StringIO())
@@ -1,11 +1,19 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from uuid import uuid4
 
 import pytest
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
-from django.test import Client
+from django.db import connection
+from django.test import AsyncRequestFactory, Client, RequestFactory
+from ninja import Schema
 
 from accounts.utils import create_access_token
 from api.models import Order, DeliveryAddress
+from api.services.exports import streaming_export
+from api.services.ordernumbers import OrderNumberAllocator
 
 User = get_user_model()
 
@@ -137,7 +145,7 @@ def test_list_orders_staff_success(client, order, another_order, staff_auth_head
     response = client.get("/api/orders/admin", **staff_auth_headers)
 
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
     assert len(data) == 2
     uuids = [item["uuid"] for item in data]
     assert str(order.uuid) in uuids
@@ -151,6 +159,156 @@ def test_list_orders_staff_forbidden_for_regular_user(client, auth_headers):
     assert response.status_code == 403
 
 
+@pytest.mark.django_db
+def test_list_orders_staff_filters(client, order, another_order, another_user, staff_auth_headers):
+    """Testa filtros de status, forma de pagamento e usuário na listagem de staff"""
+    Order.objects.filter(pk=another_order.pk).update(status=Order.OrderStatus.CONFIRMED)
+
+    data = client.get("/api/orders/admin?status=CONFIRMED", **staff_auth_headers).json()
+    assert [item["uuid"] for item in data["items"]] == [str(another_order.uuid)]
+
+    data = client.get("/api/orders/admin?payment_method=PIX", **staff_auth_headers).json()
+    assert [item["uuid"] for item in data["items"]] == [str(order.uuid)]
+
+    data = client.get(f"/api/orders/admin?user_uuid={another_user.uuid}", **staff_auth_headers).json()
+    assert [item["uuid"] for item in data["items"]] == [str(another_order.uuid)]
+
+
+@pytest.mark.django_db
+def test_list_orders_staff_date_range(client, order, another_order, staff_auth_headers):
+    """Testa filtro por intervalo de datas (data final inclusiva)"""
+    Order.objects.filter(pk=order.pk).update(created_at=datetime(2025, 1, 10, 23, 30, tzinfo=timezone.utc))
+    Order.objects.filter(pk=another_order.pk).update(created_at=datetime(2025, 1, 11, 0, 30, tzinfo=timezone.utc))
+
+    data = client.get("/api/orders/admin?created_from=2025-01-10&created_to=2025-01-10",
+                      **staff_auth_headers).json()
+    assert [item["uuid"] for item in data["items"]] == [str(order.uuid)]
+
+    data = client.get("/api/orders/admin?created_from=2025-01-11", **staff_auth_headers).json()
+    assert [item["uuid"] for item in data["items"]] == [str(another_order.uuid)]
+
+
+@pytest.mark.django_db
+def test_list_orders_staff_invalid_status(client, staff_auth_headers):
+    """Testa filtro com status inexistente"""
+    response = client.get("/api/orders/admin?status=LOST", **staff_auth_headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_list_orders_staff_pagination(client, user, delivery_address, staff_auth_headers):
+    """Testa paginação por cursor e ordenação por número do pedido"""
+    orders = [
+        Order.objects.create(user=user, delivery_address=delivery_address, payment_method="PIX")
+        for _ in range(5)
+    ]
+
+    response = client.get("/api/orders/admin?limit=2&sort=order_number", **staff_auth_headers)
+    seen = []
+    while True:
+        data = response.json()
+        seen += [item["order_number"] for item in data["items"]]
+        if not data["next"]:
+            break
+        response = client.get(data["next"], **staff_auth_headers)
+
+    assert seen == [order.order_number for order in orders]
+
+
+@pytest.mark.django_db
+def test_list_orders_staff_summary(client, order, staff_auth_headers, user):
+    """Testa a projeção resumida, sem endereço e com uuid/username do usuário"""
+    response = client.get("/api/orders/admin?view=summary", **staff_auth_headers)
+
+    assert response.status_code == 200
+    item = response.json()["items"][0]
+    assert item["uuid"] == str(order.uuid)
+    assert item["user_uuid"] == str(user.uuid)
+    assert item["username"] == user.username
+    assert "delivery_address" not in item
+
+
+# --- TESTES PARA EXPORT ORDERS STAFF ---
+
+@pytest.mark.django_db
+def test_export_orders_staff_ndjson(client, user, delivery_address, another_order, staff_auth_headers, settings):
+    """Testa exportação em NDJSON de todos os pedidos, lidos em blocos"""
+    settings.EXPORT_CHUNK_SIZE = 2
+    orders = [
+        Order.objects.create(user=user, delivery_address=delivery_address, payment_method="PIX")
+        for _ in range(4)
+    ]
+
+    response = client.get("/api/orders/admin/export?sort=order_number&payment_method=PIX", **staff_auth_headers)
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert response["Content-Disposition"] == 'attachment; filename="orders.ndjson"'
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert [row["order_number"] for row in rows] == [order.order_number for order in orders]
+    assert rows[0]["user"]["username"] == user.username
+    assert rows[0]["delivery_address"]["uuid"] == str(delivery_address.uuid)
+
+
+@pytest.mark.django_db
+def test_export_orders_staff_json_summary(client, order, another_order, staff_auth_headers):
+    """Testa exportação como um único array JSON na projeção resumida"""
+    response = client.get("/api/orders/admin/export?format=json&view=summary", **staff_auth_headers)
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/json"
+    rows = json.loads(b"".join(response.streaming_content))
+    assert {row["uuid"] for row in rows} == {str(order.uuid), str(another_order.uuid)}
+    assert "delivery_address" not in rows[0]
+
+
+@pytest.mark.django_db
+def test_export_orders_staff_empty(client, staff_auth_headers):
+    """Testa exportação sem pedidos: array JSON vazio"""
+    response = client.get("/api/orders/admin/export?format=json", **staff_auth_headers)
+    assert json.loads(b"".join(response.streaming_content)) == []
+
+
+class _ExportRow(Schema):
+    in_transaction: bool
+
+
+def _export_rows(count):
+    for _ in range(count):
+        yield _ExportRow(in_transaction=connection.in_atomic_block)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_streaming_export_reads_in_transaction():
+    """Testa que os registros são lidos, durante o envio da resposta, dentro de uma transação"""
+    response = streaming_export(RequestFactory().get("/"), _export_rows(3), "ndjson", "rows")
+
+    assert not response.is_async
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert rows == [{"in_transaction": True}] * 3
+    assert not connection.in_atomic_block
+
+
+@pytest.mark.django_db(transaction=True)
+def test_streaming_export_async_iterator_under_asgi():
+    """Testa que, sob ASGI, a resposta usa um iterador assíncrono (sem ler tudo para uma lista antes)"""
+    response = streaming_export(AsyncRequestFactory().get("/"), _export_rows(3), "json", "rows")
+
+    async def content():
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    assert response.is_async
+    assert json.loads(async_to_sync(content)()) == [{"in_transaction": True}] * 3
+
+
+@pytest.mark.django_db
+def test_export_orders_staff_forbidden_for_regular_user(client, auth_headers):
+    """Testa que usuário comum não pode exportar pedidos"""
+    response = client.get("/api/orders/admin/export", **auth_headers)
+    assert response.status_code == 403
+
+
 # --- TESTES PARA GET ORDER ---
 
 @pytest.mark.django_db
@@ -348,6 +506,141 @@ def test_update_order_user_confirm_not_found(client, auth_headers):
     assert response.status_code == 404
 
 
+# --- TESTES PARA O FLUXO DE STATUS DO PEDIDO ---
+
+def _set_status(client, order, status, headers):
+    return client.put(
+        f"/api/orders/{order.uuid}",
+        data={"payment_method": order.payment_method, "delivery_address_uuid": str(uuid4()), "status": status},
+        content_type="application/json",
+        **headers
+    )
+
+
+@pytest.mark.django_db
+def test_update_order_staff_returns_updated_order(client, order, staff_auth_headers):
+    """Testa que a transição devolve o pedido atualizado, com o endereço de entrega"""
+    updated_at = order.updated_at
+
+    response = _set_status(client, order, "PREPARATION", staff_auth_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "PREPARATION"
+    assert data["uuid"] == str(order.uuid)
+    assert data["delivery_address"]["city"] == "São Paulo"
+    order.refresh_from_db()
+    assert order.updated_at > updated_at
+
+
+@pytest.mark.django_db
+def test_update_order_staff_backward_transition_rejected(client, order, staff_auth_headers):
+    """Testa que staff não pode voltar o pedido a um status anterior"""
+    Order.objects.filter(id=order.id).update(status=Order.OrderStatus.DELIVERED)
+
+    response = _set_status(client, order, "PREPARATION", staff_auth_headers)
+
+    assert response.status_code == 400
+    assert "DELIVERED" in response.json()["detail"]
+    order.refresh_from_db()
+    assert order.status == "DELIVERED"
+
+
+@pytest.mark.django_db
+def test_update_order_staff_final_statuses(client, order, staff_auth_headers):
+    """Testa que pedidos finalizados ou cancelados não mudam mais de status"""
+    assert _set_status(client, order, "CANCELED", staff_auth_headers).status_code == 200
+    assert _set_status(client, order, "CONFIRMED", staff_auth_headers).status_code == 400
+
+    # o status atual pode ser mantido (apenas a forma de pagamento muda)
+    order.payment_method = Order.PaymentMethod.CASH
+    assert _set_status(client, order, "CANCELED", staff_auth_headers).status_code == 200
+    order.refresh_from_db()
+    assert order.payment_method == "CASH"
+
+
+@pytest.mark.django_db
+def test_update_order_staff_invalid_values(client, order, staff_auth_headers):
+    """Testa status e forma de pagamento fora das opções"""
+    assert _set_status(client, order, "SHIPPED", staff_auth_headers).status_code == 422
+
+    order.payment_method = "INVALID_METHOD"
+    assert _set_status(client, order, "CONFIRMED", staff_auth_headers).status_code == 422
+
+
+@pytest.mark.django_db
+def test_update_order_staff_single_update(client, order, staff_auth_headers,
+                                          django_assert_num_queries):
+    """Testa que a transição é um único UPDATE (mais a leitura do endereço para a resposta)"""
+    _set_status(client, order, "PENDING", staff_auth_headers)
+
+    with django_assert_num_queries(2) as context:
+        response = _set_status(client, order, "CONFIRMED", staff_auth_headers)
+
+    assert response.status_code == 200
+    assert context.captured_queries[0]["sql"].startswith("UPDATE")
+    assert "RETURNING" in context.captured_queries[0]["sql"]
+
+
+@pytest.mark.django_db
+def test_update_order_user_confirm_twice(client, order, auth_headers):
+    """Testa que um pedido já confirmado não é confirmado de novo"""
+    assert client.put(f"/api/orders/confirm/{order.uuid}", **auth_headers).status_code == 200
+
+    response = client.put(f"/api/orders/confirm/{order.uuid}", **auth_headers)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_update_order_user_confirm_after_staff_cancel(client, order, auth_headers, staff_auth_headers):
+    """Testa que o usuário não desfaz um cancelamento feito pelo staff"""
+    _set_status(client, order, "CANCELED", staff_auth_headers)
+
+    response = client.put(f"/api/orders/confirm/{order.uuid}", **auth_headers)
+
+    assert response.status_code == 400
+    order.refresh_from_db()
+    assert order.status == "CANCELED"
+
+
+@pytest.mark.django_db
+def test_update_order_user_confirm_other_user(client, another_order, auth_headers):
+    """Testa que o usuário não confirma pedidos de outros usuários"""
+    response = client.put(f"/api/orders/confirm/{another_order.uuid}", **auth_headers)
+
+    assert response.status_code == 404
+    another_order.refresh_from_db()
+    assert another_order.status == "DRAFT"
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="concurrent writers require PostgreSQL")
+@pytest.mark.django_db(transaction=True)
+def test_order_transitions_race(user, delivery_address):
+    """Testa que, entre confirmações e cancelamentos concorrentes, só uma transição vence"""
+    from ninja.errors import HttpError
+    from api.services.orderstatus import STAFF_TRANSITIONS, USER_TRANSITIONS, transition_order
+
+    order = Order.objects.create(user=user, delivery_address=delivery_address, payment_method="PIX")
+
+    def attempt(index):
+        try:
+            if index % 2:
+                transition_order({"uuid": order.uuid, "user": user.id}, "CONFIRMED", USER_TRANSITIONS)
+            else:
+                transition_order({"uuid": order.uuid}, "CONFIRMED", STAFF_TRANSITIONS)
+            return "CONFIRMED"
+        except HttpError:
+            return None
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(attempt, range(16)))
+
+    assert results.count("CONFIRMED") == 1
+
+
 # --- TESTES PARA DELETE ORDER STAFF ---
 
 @pytest.mark.django_db
@@ -373,3 +666,69 @@ def test_delete_order_staff_not_found(client, staff_auth_headers):
     fake_uuid = uuid4()
     response = client.delete(f"/api/orders/{fake_uuid}", **staff_auth_headers)
     assert response.status_code == 404
+
+
+# --- TESTES PARA NUMERAÇÃO DOS PEDIDOS ---
+
+@pytest.mark.django_db
+def test_order_numbers_are_sequential(user, delivery_address):
+    """Testa que pedidos criados em sequência recebem números crescentes e únicos"""
+    orders = [
+        Order.objects.create(user=user, delivery_address=delivery_address, payment_method=Order.PaymentMethod.PIX)
+        for _ in range(5)
+    ]
+    numbers = [order.order_number for order in orders]
+    assert numbers == sorted(numbers)
+    assert len(set(numbers)) == 5
+
+
+def test_order_number_allocator_reserves_blocks(mocker):
+    """Testa que o alocador só vai ao banco uma vez por bloco de números"""
+    allocator = OrderNumberAllocator(block_size=3)
+    mocker.patch.object(connection, "vendor", "postgresql")
+    blocks = iter([[10, 11, 12], [20, 21, 22]])
+    reserve = mocker.patch.object(allocator, "_reserve", side_effect=lambda using, count: next(blocks))
+
+    numbers = [allocator.next() for _ in range(5)]
+
+    assert numbers == [10, 11, 12, 20, 21]
+    assert reserve.call_count == 2
+
+
+@pytest.mark.django_db
+def test_order_number_reserve_many(user, delivery_address):
+    """Testa reserva de vários números de uma vez, após o último em uso"""
+    order = Order.objects.create(user=user, delivery_address=delivery_address, payment_method="PIX")
+
+    numbers = OrderNumberAllocator().reserve(3)
+
+    assert numbers == [order.order_number + 1, order.order_number + 2, order.order_number + 3]
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="order number sequence requires PostgreSQL")
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("block_size", [1, 50])
+def test_order_numbers_unique_under_concurrency(user, delivery_address, settings, block_size):
+    """Testa que checkouts concorrentes nunca geram números de pedido duplicados"""
+    settings.ORDER_NUMBER_BLOCK_SIZE = block_size
+    threads, orders_per_thread = 8, 250
+
+    def checkout(_):
+        try:
+            return [
+                Order.objects.create(
+                    user=user,
+                    delivery_address=delivery_address,
+                    payment_method=Order.PaymentMethod.PIX,
+                ).order_number
+                for _ in range(orders_per_thread)
+            ]
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        numbers = [number for chunk in executor.map(checkout, range(threads)) for number in chunk]
+
+    assert len(numbers) == threads * orders_per_thread
+    assert len(set(numbers)) == len(numbers)
+    assert Order.objects.count() == len(numbers)
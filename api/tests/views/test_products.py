@@ -1,15 +1,23 @@
-from io import BytesIO
+import json
+from decimal import Decimal
+from io import BytesIO, StringIO
 from uuid import uuid4
 
 import pytest
 from PIL import Image
 from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.db import connection
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 
 from accounts.utils import create_access_token
-from api.models import Product
+from api.models import DeliveryAddress, Order, OrderItem, Product
+from api.services.catalog import bump_catalog_version
+from api.services.images import VARIANTS, image_uploads, schedule_image_upload, spool_image, upload_spooled_image
 
 User = get_user_model()
 
@@ -92,8 +100,9 @@ def test_list_products_success(client, product, another_product):
 
     assert response.status_code == 200
     data = response.json()
-    assert len(data) == 2
-    names = [item["name"] for item in data]
+    assert len(data["items"]) == 2
+    assert data["next"] is None
+    names = [item["name"] for item in data["items"]]
     assert product.name in names
     assert another_product.name in names
 
@@ -105,7 +114,246 @@ def test_list_products_empty(client):
 
     assert response.status_code == 200
     data = response.json()
-    assert len(data) == 0
+    assert len(data["items"]) == 0
+    assert data["next"] is None
+
+
+@pytest.mark.django_db
+def test_list_products_keyset_pagination(client, settings):
+    """Testa que a paginação por cursor percorre todos os produtos sem repetir nenhum"""
+    settings.PAGINATION_MAX_PAGE_SIZE = 3
+    created = [
+        Product.objects.create(name=f"Cupcake {i}", description="Cupcake", price=10)
+        for i in range(7)
+    ]
+    # empates em created_at são desfeitos pelo id
+    Product.objects.filter(uuid__in=[p.uuid for p in created[:4]]).update(created_at=created[0].created_at)
+
+    seen = []
+    url = "/api/products/?limit=50"
+    pages = 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["items"]) <= 3
+        seen.extend(item["uuid"] for item in data["items"])
+        url = data["next"]
+        pages += 1
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 7
+    expected = [str(p.uuid) for p in Product.objects.order_by("-created_at", "id")]
+    assert seen == expected
+
+
+@pytest.mark.django_db
+def test_list_products_next_link_keeps_limit(client, product, another_product):
+    """Testa que o link `next` mantém o tamanho de página e traz a página seguinte"""
+    response = client.get("/api/products/?limit=1")
+
+    data = response.json()
+    assert len(data["items"]) == 1
+    assert data["next"].startswith("http://testserver/api/products/?")
+    assert "limit=1" in data["next"]
+
+    response = client.get(data["next"])
+    data_next = response.json()
+    assert len(data_next["items"]) == 1
+    assert data_next["items"][0]["uuid"] != data["items"][0]["uuid"]
+    assert data_next["next"] is None
+
+
+@pytest.mark.django_db
+def test_list_products_invalid_cursor(client, product):
+    """Testa listagem com cursor inválido"""
+    response = client.get("/api/products/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_list_products_invalid_limit(client):
+    """Testa listagem com tamanho de página inválido"""
+    response = client.get("/api/products/?limit=0")
+    assert response.status_code == 422
+
+
+# --- TESTES PARA CACHE DO CATÁLOGO ---
+
+@pytest.mark.django_db
+def test_list_products_cached_response(client, product):
+    """Testa que a segunda listagem é servida do cache, sem consultar o banco"""
+    first = client.get("/api/products/")
+
+    with CaptureQueriesContext(connection) as context:
+        second = client.get("/api/products/")
+
+    assert len(context.captured_queries) == 0
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second["ETag"] == first["ETag"]
+    assert "max-age" in second["Cache-Control"]
+
+
+@pytest.mark.django_db
+def test_list_products_not_modified(client, product):
+    """Testa resposta 304 quando o cliente já possui a versão atual"""
+    etag = client.get("/api/products/")["ETag"]
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    assert response.content == b""
+    assert len(context.captured_queries) == 0
+
+
+@pytest.mark.django_db
+def test_get_product_not_modified(client, product):
+    """Testa resposta 304 para o detalhe do produto"""
+    etag = client.get(f"/api/products/{product.uuid}")["ETag"]
+
+    response = client.get(f"/api/products/{product.uuid}", HTTP_IF_NONE_MATCH=f'W/{etag}, "other"')
+
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_catalog_cache_invalidated_on_product_write(client, product):
+    """Testa que alterar um produto gera nova versão do catálogo e novo ETag"""
+    first = client.get("/api/products/")
+    first_detail = client.get(f"/api/products/{product.uuid}")
+
+    product.name = "Cupcake de Limão"
+    product.save()
+
+    second = client.get("/api/products/", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert second.status_code == 200
+    assert second["ETag"] != first["ETag"]
+    assert second.json()["items"][0]["name"] == "Cupcake de Limão"
+
+    detail = client.get(f"/api/products/{product.uuid}", HTTP_IF_NONE_MATCH=first_detail["ETag"])
+    assert detail.status_code == 200
+    assert detail.json()["name"] == "Cupcake de Limão"
+
+
+@pytest.mark.django_db
+def test_catalog_cache_invalidated_on_soft_delete(client, product, another_product, staff_auth_headers):
+    """Testa que o produto removido some da listagem em cache"""
+    assert len(client.get("/api/products/").json()["items"]) == 2
+
+    client.delete(f"/api/products/{product.uuid}", **staff_auth_headers)
+
+    data = client.get("/api/products/").json()
+    assert [item["uuid"] for item in data["items"]] == [str(another_product.uuid)]
+
+
+# --- TESTES PARA SNAPSHOT DO CATÁLOGO ---
+
+@pytest.mark.django_db
+def test_get_catalog_snapshot(client, product, another_product):
+    """Testa o catálogo completo pré-renderizado"""
+    response = client.get("/api/products/catalog")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["uuid"] for item in data] == [
+        str(p.uuid) for p in Product.objects.order_by("-created_at", "id")
+    ]
+    assert data[0].keys() == {"uuid", "sku", "name", "description", "price", "promotion", "image", "image_status",
+                              "image_thumbnail", "image_medium", "image_webp"}
+
+
+@pytest.mark.django_db
+def test_get_catalog_snapshot_served_without_queries(client, product):
+    """Testa que o snapshot é servido como bytes, sem ORM, enquanto a versão não muda"""
+    first = client.get("/api/products/catalog")
+
+    with CaptureQueriesContext(connection) as context:
+        second = client.get("/api/products/catalog")
+        not_modified = client.get("/api/products/catalog", HTTP_IF_NONE_MATCH=first["ETag"])
+
+    assert len(context.captured_queries) == 0
+    assert second.content == first.content
+    assert not_modified.status_code == 304
+
+
+@pytest.mark.django_db
+def test_get_catalog_snapshot_rebuilt_on_write(client, product, another_product):
+    """Testa que o snapshot é refeito quando um produto muda"""
+    first = client.get("/api/products/catalog")
+
+    another_product.soft_delete()
+
+    second = client.get("/api/products/catalog")
+    assert second["ETag"] != first["ETag"]
+    assert [item["uuid"] for item in second.json()] == [str(product.uuid)]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_catalog_snapshot_rebuilt_after_commit(client, product, another_product, mocker):
+    """Testa que o snapshot da nova versão é montado uma vez, na primeira leitura após a transação de escrita"""
+    from django.db import transaction
+    from api.services import catalog
+
+    client.get("/api/products/catalog")
+    render = mocker.spy(catalog, "_render_catalog")
+    with transaction.atomic():
+        product.name = "Cupcake de Coco"
+        product.save()
+        another_product.soft_delete()
+
+    assert render.call_count == 0
+    response = client.get("/api/products/catalog")
+    assert render.call_count == 1
+    assert [item["name"] for item in response.json()] == ["Cupcake de Coco"]
+
+    with CaptureQueriesContext(connection) as context:
+        client.get("/api/products/catalog")
+    assert len(context.captured_queries) == 0
+    assert render.call_count == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_catalog_version_bumped_once_per_commit(mocker):
+    """Testa que o incremento no commit é agendado uma vez por transação, de novo após um rollback"""
+    from contextlib import suppress
+    from django.db import transaction
+    from api.services import catalog
+
+    incr = mocker.spy(catalog, "_incr_catalog_version")
+    with suppress(RuntimeError), transaction.atomic():
+        bump_catalog_version()
+        raise RuntimeError
+    assert incr.call_count == 1  # só o incremento imediato
+
+    with transaction.atomic():
+        with suppress(RuntimeError), transaction.atomic():
+            bump_catalog_version()
+            raise RuntimeError  # o savepoint desfeito leva o callback junto
+        bump_catalog_version()
+        bump_catalog_version()
+        assert incr.call_count == 4
+    assert incr.call_count == 5
+
+
+@pytest.mark.django_db
+def test_get_catalog_snapshot_expires(client, product, mocker, settings):
+    """Testa que a cópia local do snapshot expira mesmo sem mudança de versão (cache não compartilhado)"""
+    from api.services import catalog
+
+    client.get("/api/products/catalog")
+    # outro worker apagou o produto: a versão deste processo não muda
+    Product.objects.filter(pk=product.pk).update(is_active=False)
+    assert len(client.get("/api/products/catalog").json()) == 1
+
+    later = catalog.time.monotonic() + settings.CATALOG_CACHE_TIMEOUT + 1
+    mocker.patch("api.services.catalog.time.monotonic", return_value=later)
+    mocker.patch("django.core.cache.backends.locmem.time.time",
+                 return_value=catalog.time.time() + settings.CATALOG_CACHE_TIMEOUT + 1)
+
+    assert client.get("/api/products/catalog").json() == []
 
 
 # --- TESTES PARA GET PRODUCT ---
@@ -156,7 +404,7 @@ def test_create_product_success(client, staff_auth_headers):
 
 
 @pytest.mark.django_db
-def test_create_product_with_image(staff_auth_headers, sample_image, mocker):
+def test_create_product_with_image(staff_auth_headers, sample_image, mocker, django_capture_on_commit_callbacks):
     """Testa criação de produto com imagem"""
     # Mock do upload do Cloudinary
     mock_upload = mocker.patch('cloudinary.uploader.upload')
@@ -181,20 +429,24 @@ def test_create_product_with_image(staff_auth_headers, sample_image, mocker):
         "image": sample_image
     }
 
-    response = client.post(
-        "/api/products/",
-        data=data,
-        format="multipart"
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            "/api/products/",
+            data=data,
+            format="multipart"
+        )
 
     assert response.status_code == 200
     response_data = response.json()
     assert response_data["name"] == "Cupcake com Imagem"
-    assert response_data["image"] is not None
-    assert Product.objects.filter(name="Cupcake com Imagem").exists()
+    assert response_data["image"] is None
+    assert response_data["image_status"] == "PENDING"
+    product = Product.objects.get(name="Cupcake com Imagem")
+    assert product.image
+    assert product.image_status == Product.ImageStatus.READY
 
-    # Verifica que o upload foi chamado
-    mock_upload.assert_called_once()
+    # Verifica que o upload foi chamado para o original e cada variante
+    assert mock_upload.call_count == 1 + len(VARIANTS)
 
 
 @pytest.mark.django_db
@@ -252,7 +504,7 @@ def test_create_product_invalid_data(client, staff_auth_headers):
 # --- TESTES PARA UPDATE PRODUCT ---
 
 @pytest.mark.django_db
-def test_update_product_success(product, staff_auth_headers, tmp_path, mocker):
+def test_update_product_success(product, staff_auth_headers, tmp_path, mocker, django_capture_on_commit_callbacks):
     """
     Testa atualização de produto com sucesso.
     Usa APIClient do rest_framework.test porque o client do Django tem problemas no teste com PUT e multipart/form-data.
@@ -272,9 +524,9 @@ def test_update_product_success(product, staff_auth_headers, tmp_path, mocker):
     client = APIClient()
     client.credentials(HTTP_AUTHORIZATION=staff_auth_headers["HTTP_AUTHORIZATION"])
 
-    # Cria um arquivo temporário simulando o upload de imagem
+    # Cria um arquivo temporário com a nova imagem
     image_path = tmp_path / "cupcake_2.webp"
-    image_path.write_bytes(b"fake image content")
+    Image.new('RGB', (100, 100), color='blue').save(image_path, format='WEBP')
 
     with open(image_path, "rb") as image_file:
         data = {
@@ -285,23 +537,24 @@ def test_update_product_success(product, staff_auth_headers, tmp_path, mocker):
             "image": image_file,
         }
 
-        response = client.put(
-            f"/api/products/{product.uuid}",
-            data,
-            format="multipart"
-        )
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.put(
+                f"/api/products/{product.uuid}",
+                data,
+                format="multipart"
+            )
 
     assert response.status_code == 200
     product.refresh_from_db()
     assert product.name == "Cupcake Atualizado"
     assert product.price == 18.00
 
-    # Verifica que o upload foi chamado
-    mock_upload.assert_called_once()
+    # Verifica que o upload foi chamado para o original e cada variante
+    assert mock_upload.call_count == 1 + len(VARIANTS)
 
 
 @pytest.mark.django_db
-def test_update_product_with_image(product, staff_auth_headers, tmp_path, mocker):
+def test_update_product_with_image(product, staff_auth_headers, tmp_path, mocker, django_capture_on_commit_callbacks):
     """
     Testa atualização de produto com nova imagem.
     Usa APIClient do rest_framework.test porque o client do Django tem problemas no teste com PUT e multipart/form-data.
@@ -321,9 +574,9 @@ def test_update_product_with_image(product, staff_auth_headers, tmp_path, mocker
     client = APIClient()
     client.credentials(HTTP_AUTHORIZATION=staff_auth_headers["HTTP_AUTHORIZATION"])
 
-    # Cria um arquivo temporário simulando o upload de imagem
+    # Cria um arquivo temporário com a nova imagem
     image_path = tmp_path / "cupcake_2.webp"
-    image_path.write_bytes(b"fake image content")
+    Image.new('RGB', (100, 100), color='blue').save(image_path, format='WEBP')
 
     with open(image_path, "rb") as image_file:
         data = {
@@ -334,19 +587,20 @@ def test_update_product_with_image(product, staff_auth_headers, tmp_path, mocker
             "image": image_file
         }
 
-        response = client.put(
-            f"/api/products/{product.uuid}",
-            data,
-            format="multipart"
-        )
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.put(
+                f"/api/products/{product.uuid}",
+                data,
+                format="multipart"
+            )
 
     assert response.status_code == 200
     product.refresh_from_db()
     assert product.name == "Cupcake com Nova Imagem"
     assert product.image is not None
 
-    # Verifica que o upload foi chamado
-    mock_upload.assert_called_once()
+    # Verifica que o upload foi chamado para o original e cada variante
+    assert mock_upload.call_count == 1 + len(VARIANTS)
 
 
 @pytest.mark.django_db
@@ -450,7 +704,8 @@ def test_delete_product_not_found(client, staff_auth_headers):
 # --- TESTES PARA UPLOAD IMAGE ---
 
 @pytest.mark.django_db
-def test_upload_product_image_success(client, product, staff_auth_headers, sample_image, mocker):
+def test_upload_product_image_success(client, product, staff_auth_headers, sample_image, mocker,
+                                      django_capture_on_commit_callbacks):
     """Testa upload de imagem para produto existente"""
     # Mock do upload do Cloudinary
     mock_upload = mocker.patch('cloudinary.uploader.upload')
@@ -464,18 +719,21 @@ def test_upload_product_image_success(client, product, staff_auth_headers, sampl
     mock_cloudinary_resource = mocker.patch('cloudinary.CloudinaryResource.build_url')
     mock_cloudinary_resource.return_value = 'https://res.cloudinary.com/test/image/upload/test_image.jpg'
 
-    response = client.post(
-        f"/api/products/{product.uuid}/upload-image",
-        data={"image": sample_image},
-        **staff_auth_headers
-    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            f"/api/products/{product.uuid}/upload-image",
+            data={"image": sample_image},
+            **staff_auth_headers
+        )
 
     assert response.status_code == 200
+    assert response.json()["image_status"] == "PENDING"
     product.refresh_from_db()
-    assert product.image is not None
+    assert product.image
+    assert product.image_status == Product.ImageStatus.READY
 
-    # Verifica que o upload foi chamado
-    mock_upload.assert_called_once()
+    # Verifica que o upload foi chamado para o original e cada variante
+    assert mock_upload.call_count == 1 + len(VARIANTS)
 
 
 @pytest.mark.django_db
@@ -521,3 +779,462 @@ def test_upload_product_image_missing_file(client, product, staff_auth_headers):
         **staff_auth_headers
     )
     assert response.status_code == 422
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name, content", [
+    ("broken.jpg", b"not an image"),
+    ("notes.txt", b"not an image"),
+])
+def test_upload_product_image_not_an_image(client, product, staff_auth_headers, local_storage, name, content):
+    """Testa que um arquivo que não é imagem é recusado antes de ir para o spool"""
+    response = client.post(
+        f"/api/products/{product.uuid}/upload-image",
+        data={"image": SimpleUploadedFile(name, content)},
+        **staff_auth_headers
+    )
+
+    assert response.status_code == 422
+    assert "image" in str(response.json()["detail"])
+    product.refresh_from_db()
+    assert product.image_status == Product.ImageStatus.NONE
+    assert list((local_storage / "spool").glob("*")) == []
+
+
+@pytest.mark.django_db
+def test_create_product_not_an_image(client, staff_auth_headers, local_storage):
+    """Testa que a criação com um arquivo que não é imagem é recusada sem salvar o produto"""
+    response = client.post(
+        "/api/products/",
+        data={"name": "Cupcake", "description": "Sem foto", "price": "10.00", "promotion": "false",
+              "image": SimpleUploadedFile("broken.png", b"not an image")},
+        **staff_auth_headers
+    )
+
+    assert response.status_code == 422
+    assert not Product.objects.filter(name="Cupcake").exists()
+
+
+# --- TESTES PARA UPLOAD DE IMAGEM EM SEGUNDO PLANO ---
+
+@pytest.fixture
+def local_storage(settings, tmp_path):
+    """FileSystemStorage no lugar do Cloudinary, spool e mídia em diretórios temporários"""
+    settings.STORAGES = {**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"}}
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    settings.IMAGE_SPOOL_DIR = str(tmp_path / "spool")
+    settings.IMAGE_UPLOAD_RETRY_DELAY = 0
+    return tmp_path
+
+
+@pytest.mark.django_db
+def test_image_upload_pipeline(client, product, staff_auth_headers, sample_image, local_storage,
+                               django_capture_on_commit_callbacks):
+    """Testa que a imagem passa pelo spool e vai para o storage depois do commit"""
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = client.post(f"/api/products/{product.uuid}/upload-image", data={"image": sample_image},
+                               **staff_auth_headers)
+
+    assert response.json()["image_status"] == "PENDING"
+    product.refresh_from_db()
+    assert not product.image
+    assert (local_storage / "spool" / product.pending_image).exists()
+
+    for callback in callbacks:
+        callback()
+
+    product.refresh_from_db()
+    assert product.image_status == Product.ImageStatus.READY
+    assert product.image.name.startswith("products/")
+    assert (local_storage / "media" / product.image.name).exists()
+    assert product.pending_image == ""
+    assert list((local_storage / "spool").iterdir()) == []
+    assert client.get(f"/api/products/{product.uuid}").json()["image"] == product.image.url
+
+
+@pytest.mark.django_db
+def test_image_upload_retries(product, sample_image, local_storage, mocker, django_capture_on_commit_callbacks):
+    """Testa que falhas temporárias do storage são repetidas"""
+    real_save = FileSystemStorage._save
+    failures = [OSError("timeout"), OSError("timeout")]
+
+    def flaky_save(storage, name, content):
+        if failures:
+            raise failures.pop()
+        return real_save(storage, name, content)
+
+    save = mocker.patch.object(FileSystemStorage, "_save", autospec=True, side_effect=flaky_save)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        schedule_image_upload(product, sample_image)
+
+    product.refresh_from_db()
+    assert save.call_count == 3 + len(VARIANTS)
+    assert product.image_status == Product.ImageStatus.READY
+    assert product.image.name == "products/test_image.jpg"
+
+
+@pytest.mark.django_db
+def test_image_upload_fails_and_resumes(product, sample_image, local_storage, settings, mocker,
+                                        django_capture_on_commit_callbacks):
+    """Testa que esgotadas as tentativas o produto fica FAILED e o comando retoma o upload"""
+    settings.IMAGE_UPLOAD_RETRIES = 1
+    mocker.patch.object(FileSystemStorage, "_save", autospec=True, side_effect=OSError("storage down"))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        schedule_image_upload(product, sample_image)
+
+    product.refresh_from_db()
+    assert product.image_status == Product.ImageStatus.FAILED
+    assert (local_storage / "spool" / product.pending_image).exists()
+
+    mocker.stopall()
+    call_command("resume_image_uploads", stdout=StringIO())
+
+    product.refresh_from_db()
+    assert product.image_status == Product.ImageStatus.READY
+    assert product.image
+
+
+@pytest.mark.django_db
+def test_image_upload_superseded(product, sample_image, local_storage, django_capture_on_commit_callbacks):
+    """Testa que um upload mais novo do mesmo produto prevalece sobre o anterior"""
+    newer_image = SimpleUploadedFile("newer.jpg", sample_image.read(), content_type="image/jpeg")
+    sample_image.seek(0)
+    with django_capture_on_commit_callbacks() as callbacks:
+        schedule_image_upload(product, sample_image)
+        schedule_image_upload(product, newer_image)
+
+    for callback in callbacks:
+        callback()
+
+    product.refresh_from_db()
+    assert product.image.name == "products/newer.jpg"
+    assert sorted(p.name for p in (local_storage / "media" / "products").iterdir()) == ["newer.jpg", "variants"]
+    assert sorted(p.name for p in (local_storage / "media" / "products" / "variants").iterdir()) == [
+        "newer_medium.jpg", "newer_thumbnail.jpg", "newer_webp.webp"
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_image_upload_in_worker_thread(client, product, staff_auth_headers, sample_image, local_storage, settings):
+    """Testa o upload pelo pool de threads, fora da requisição"""
+    settings.IMAGE_UPLOAD_ASYNC = True
+
+    response = client.post(f"/api/products/{product.uuid}/upload-image", data={"image": sample_image},
+                           **staff_auth_headers)
+    assert response.json()["image_status"] == "PENDING"
+    image_uploads.wait()
+
+    product.refresh_from_db()
+    assert product.image_status == Product.ImageStatus.READY
+
+
+# --- TESTES PARA VARIANTES DE IMAGEM ---
+
+@pytest.fixture
+def large_image():
+    """Cria uma imagem maior que as variantes, com transparência"""
+    image_io = BytesIO()
+    Image.new('RGBA', (1600, 1200), color=(0, 128, 255, 128)).save(image_io, format='PNG')
+    return SimpleUploadedFile("large.png", image_io.getvalue(), content_type="image/png")
+
+
+@pytest.mark.django_db
+def test_image_variants_generated(client, product, large_image, local_storage, django_capture_on_commit_callbacks):
+    """Testa que miniatura, média e WebP são gerados uma vez junto com o upload"""
+    with django_capture_on_commit_callbacks(execute=True):
+        schedule_image_upload(product, large_image)
+
+    product.refresh_from_db()
+    assert product.image_variants.keys() == VARIANTS.keys()
+    expected = {"thumbnail": ("JPEG", (240, 180)), "medium": ("JPEG", (800, 600)), "webp": ("WEBP", (800, 600))}
+    for key, (format, size) in expected.items():
+        with Image.open(local_storage / "media" / product.image_variants[key]) as variant:
+            assert (variant.format, variant.size) == (format, size)
+
+    data = client.get(f"/api/products/{product.uuid}").json()
+    assert data["image_thumbnail"] == product.image_variant_url("thumbnail")
+    assert data["image_webp"].endswith(".webp")
+
+
+@pytest.mark.django_db
+def test_image_variants_in_order_items(client, user, product, large_image, local_storage, auth_headers,
+                                       django_capture_on_commit_callbacks):
+    """Testa que os itens do pedido expõem as URLs das variantes"""
+    with django_capture_on_commit_callbacks(execute=True):
+        schedule_image_upload(product, large_image)
+
+    address = DeliveryAddress.objects.create(user=user, address_name="Casa", address_description="Rua Teste, 123",
+                                             city="São Paulo", state="SP", zip_code="01234567")
+    order = Order.objects.create(user=user, delivery_address=address, payment_method=Order.PaymentMethod.PIX)
+    OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=product.price)
+
+    item = client.get(f"/api/order-items/{order.uuid}", **auth_headers).json()["products"][0]
+
+    product.refresh_from_db()
+    assert item["image_thumbnail"] == product.image_variant_url("thumbnail")
+    assert item["image_medium"] == product.image_variant_url("medium")
+
+
+def _spooled(product, upload):
+    spool_name = spool_image(upload)
+    Product.objects.filter(pk=product.pk).update(image_status=Product.ImageStatus.PENDING, pending_image=spool_name)
+    return spool_name
+
+
+@pytest.mark.django_db
+def test_image_variants_skipped_for_unreadable_image(product, local_storage):
+    """Testa que um arquivo do spool que o Pillow não lê é armazenado sem variantes"""
+    spool_name = _spooled(product, SimpleUploadedFile("broken.jpg", b"not an image", content_type="image/jpeg"))
+
+    assert upload_spooled_image(product.pk, spool_name)
+
+    product.refresh_from_db()
+    assert product.image_status == Product.ImageStatus.READY
+    assert product.image_variants == {}
+    assert product.image_variant_url("thumbnail") is None
+
+
+@pytest.mark.django_db
+def test_image_bomb_refused(client, product, large_image, local_storage, staff_auth_headers, monkeypatch):
+    """Testa que uma imagem acima do limite de pixels do Pillow é recusada no envio"""
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1600 * 1200 // 4)
+
+    response = client.post(f"/api/products/{product.uuid}/upload-image", data={"image": large_image},
+                           **staff_auth_headers)
+
+    assert response.status_code == 422
+    assert list((local_storage / "spool").glob("*")) == []
+
+
+@pytest.mark.django_db
+def test_image_variants_skipped_for_bomb(product, large_image, local_storage, monkeypatch):
+    """Testa que uma imagem do spool acima do limite de pixels é armazenada sem variantes, sem erro"""
+    spool_name = _spooled(product, large_image)
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 1600 * 1200 // 4)
+
+    image_uploads.submit(product.pk, spool_name)
+
+    product.refresh_from_db()
+    assert product.image_status == Product.ImageStatus.READY
+    assert product.image_variants == {}
+
+
+@pytest.mark.django_db
+def test_image_variants_skipped_when_encoding_fails(product, large_image, local_storage, mocker):
+    """Testa que um erro ao codificar as variantes não impede o armazenamento do original"""
+    spool_name = _spooled(product, large_image)
+    mocker.patch.object(Image.Image, "save", side_effect=OSError("cannot write mode"))
+
+    image_uploads.submit(product.pk, spool_name)
+
+    product.refresh_from_db()
+    assert product.image_status == Product.ImageStatus.READY
+    assert product.image_variants == {}
+
+
+@pytest.mark.django_db
+def test_image_upload_error_marks_failed(client, product, sample_image, local_storage, staff_auth_headers, mocker,
+                                         django_capture_on_commit_callbacks):
+    """Testa que um erro inesperado no upload síncrono marca FAILED em vez de falhar a requisição"""
+    mocker.patch("api.services.images.render_variants", side_effect=RuntimeError("boom"))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(f"/api/products/{product.uuid}/upload-image", data={"image": sample_image},
+                               **staff_auth_headers)
+
+    assert response.status_code == 200
+    product.refresh_from_db()
+    assert product.image_status == Product.ImageStatus.FAILED
+    assert (local_storage / "spool" / product.pending_image).exists()
+
+
+@pytest.mark.django_db
+def test_generate_image_variants_command(product, large_image, local_storage):
+    """Testa que o comando gera as variantes de imagens antigas"""
+    product.image.save("products/large.png", large_image)
+    assert product.image_variants == {}
+
+    out = StringIO()
+    call_command("generate_image_variants", stdout=out)
+
+    product.refresh_from_db()
+    assert product.image_variants.keys() == VARIANTS.keys()
+    assert "Variants created for 1 images" in out.getvalue()
+
+
+# --- TESTES PARA CACHE DE URLS DE IMAGEM ---
+
+@pytest.mark.django_db
+def test_image_urls_built_once(client, product, another_product, local_storage, mocker):
+    """Testa que a URL de cada imagem é montada pelo storage uma única vez por processo"""
+    Product.objects.filter(pk=product.pk).update(image="products/a.jpg",
+                                                 image_variants={"thumbnail": "products/variants/a_thumbnail.jpg"})
+    Product.objects.filter(pk=another_product.pk).update(image="products/b.jpg")
+    url = mocker.spy(FileSystemStorage, "url")
+
+    first = client.get("/api/products/").json()["items"]
+    bump_catalog_version()  # a listagem é montada de novo
+    second = client.get("/api/products/").json()["items"]
+
+    assert first == second
+    assert {item["image"] for item in second} == {"/media/products/a.jpg", "/media/products/b.jpg"}
+    assert url.call_count == 3
+
+
+@pytest.mark.django_db
+def test_image_urls_follow_storage_settings(product, local_storage, settings):
+    """Testa que as URLs memorizadas são descartadas quando o storage muda"""
+    Product.objects.filter(pk=product.pk).update(image="products/a.jpg")
+    product.refresh_from_db()
+    assert product.image_url() == "/media/products/a.jpg"
+
+    settings.MEDIA_URL = "/cdn/"
+    assert product.image_url() == "/cdn/products/a.jpg"
+
+
+# --- TESTES PARA IMPORTAÇÃO EM LOTE ---
+
+PRODUCTS_CSV = (
+    "sku,name,description,price,promotion\n"
+    "CUP-001,Cupcake de Limão,Cupcake de limão siciliano,11.50,false\n"
+    "CUP-002,Cupcake de Coco,Cupcake de coco queimado,12.00,\n"
+    "CUP-003,,Sem nome,10.00,false\n"
+    "CUP-004,Cupcake Caro,Preço inválido,abc,false\n"
+    "CUP-001,Cupcake Repetido,SKU repetido,9.00,false\n"
+)
+
+
+@pytest.mark.django_db
+def test_import_products_csv(client, staff_auth_headers, django_capture_on_commit_callbacks):
+    """Testa importação de CSV: linhas válidas criadas, inválidas relatadas por linha"""
+    upload = SimpleUploadedFile("products.csv", PRODUCTS_CSV.encode(), content_type="text/csv")
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post("/api/products/import", data={"file": upload}, **staff_auth_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["updated"]) == (2, 0)
+    assert {error["row"]: (error["sku"], list(error["errors"])) for error in data["errors"]} == {
+        3: ("CUP-003", ["name"]),
+        4: ("CUP-004", ["price"]),
+        5: ("CUP-001", ["sku"]),
+    }
+    product = Product.objects.get(sku="CUP-002")
+    assert product.promotion is False
+    assert {item["sku"] for item in client.get("/api/products/catalog").json()} == {"CUP-001", "CUP-002"}
+
+
+@pytest.mark.django_db
+def test_import_products_upsert_json(client, staff_auth_headers, product):
+    """Testa que uma nova importação do mesmo SKU atualiza o produto existente"""
+    Product.objects.filter(pk=product.pk).update(sku="CUP-001")
+    rows = [
+        {"sku": "CUP-001", "name": "Cupcake Renomeado", "description": "Nova descrição", "price": "15.00",
+         "promotion": True},
+        {"sku": "CUP-002", "name": "Cupcake Novo", "description": "Novo", "price": 8},
+    ]
+    upload = SimpleUploadedFile("products.json", json.dumps(rows).encode(), content_type="application/json")
+    response = client.post("/api/products/import", data={"file": upload}, **staff_auth_headers)
+
+    assert response.json() == {"created": 1, "updated": 1, "errors": []}
+    updated = Product.objects.get(pk=product.pk)
+    assert (updated.uuid, updated.name, updated.price, updated.promotion) == (
+        product.uuid, "Cupcake Renomeado", Decimal("15.00"), True
+    )
+    assert Product.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_import_products_sku_stripped(client, staff_auth_headers, product):
+    """Testa que espaços em volta do SKU são removidos e que um SKU em branco é recusado"""
+    Product.objects.filter(pk=product.pk).update(sku="CUP-001")
+    rows = [
+        {"sku": " CUP-001 ", "name": "Cupcake Renomeado", "description": "Nova descrição", "price": "15.00"},
+        {"sku": "   ", "name": "Sem SKU", "description": "Sem SKU", "price": "8.00"},
+    ]
+    upload = SimpleUploadedFile("products.json", json.dumps(rows).encode(), content_type="application/json")
+    response = client.post("/api/products/import", data={"file": upload}, **staff_auth_headers)
+
+    data = response.json()
+    assert (data["created"], data["updated"]) == (0, 1)
+    assert [(error["row"], list(error["errors"])) for error in data["errors"]] == [(2, ["sku"])]
+    assert Product.objects.get(pk=product.pk).name == "Cupcake Renomeado"
+    assert not Product._base_manager.filter(sku="").exists()
+
+
+@pytest.mark.django_db
+def test_import_products_reactivates_deleted_sku(client, staff_auth_headers, product):
+    """Testa que importar o SKU de um produto excluído o devolve ao catálogo"""
+    Product.objects.filter(pk=product.pk).update(sku="CUP-001")
+    product.refresh_from_db()
+    product.soft_delete()
+    rows = [{"sku": "CUP-001", "name": "Cupcake de Volta", "description": "Voltou", "price": "16.00"}]
+    upload = SimpleUploadedFile("products.json", json.dumps(rows).encode(), content_type="application/json")
+
+    response = client.post("/api/products/import", data={"file": upload}, **staff_auth_headers)
+
+    assert response.json() == {"created": 0, "updated": 1, "errors": []}
+    assert Product.objects.get(pk=product.pk).name == "Cupcake de Volta"
+    assert [item["sku"] for item in client.get("/api/products/catalog").json()] == ["CUP-001"]
+
+
+@pytest.mark.django_db
+def test_import_products_invalid_file(client, staff_auth_headers):
+    """Testa arquivo com extensão ou conteúdo inválido"""
+    upload = SimpleUploadedFile("products.txt", b"sku,name", content_type="text/plain")
+    assert client.post("/api/products/import", data={"file": upload}, **staff_auth_headers).status_code == 400
+
+    upload = SimpleUploadedFile("products.json", b'{"sku": "x"}', content_type="application/json")
+    assert client.post("/api/products/import", data={"file": upload}, **staff_auth_headers).status_code == 400
+
+
+@pytest.mark.django_db
+def test_import_products_forbidden_for_regular_user(client, auth_headers):
+    """Testa que usuário comum não pode importar produtos"""
+    upload = SimpleUploadedFile("products.csv", PRODUCTS_CSV.encode(), content_type="text/csv")
+    response = client.post("/api/products/import", data={"file": upload}, **auth_headers)
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_import_products_command(tmp_path):
+    """Testa o comando de importação em lotes, com erros por linha"""
+    path = tmp_path / "products.csv"
+    path.write_text(PRODUCTS_CSV)
+    out, err = StringIO(), StringIO()
+
+    with pytest.raises(CommandError, match="3 rows rejected"):
+        call_command("import_products", str(path), "--batch-size", "2", stdout=out, stderr=err)
+
+    assert "Created 2 products, updated 0" in out.getvalue()
+    assert "row 4 (CUP-004): price:" in err.getvalue()
+    assert set(Product.objects.values_list("sku", flat=True)) == {"CUP-001", "CUP-002"}
+
+
+@pytest.mark.django_db
+def test_create_product_duplicate_sku(client, staff_auth_headers, product):
+    """Testa que o SKU informado na criação é único"""
+    Product.objects.filter(pk=product.pk).update(sku="CUP-001")
+    data = {"name": "Outro", "description": "Outro", "price": 10, "promotion": False, "sku": "CUP-001"}
+
+    response = client.post("/api/products/", data=data, **staff_auth_headers)
+    assert response.status_code == 422
+
+
+@pytest.mark.django_db
+def test_create_product_sku_of_deleted_product(client, staff_auth_headers, product):
+    """Testa que o SKU de um produto excluído (soft delete) também não pode ser reutilizado"""
+    Product.objects.filter(pk=product.pk).update(sku="CUP-001", is_active=False)
+    data = {"name": "Outro", "description": "Outro", "price": 10, "promotion": False, "sku": "CUP-001"}
+
+    response = client.post("/api/products/", data=data, **staff_auth_headers)
+    assert response.status_code == 422
+    assert "sku" in str(response.json()["detail"])
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=staff_auth_headers["HTTP_AUTHORIZATION"])
+    another = Product.objects.create(name="Outro", description="Outro", price=10)
+    response = client.put(f"/api/products/{another.uuid}", {**data, "sku": "CUP-001"}, format="multipart")
+    assert response.status_code == 422
@@ -0,0 +1,174 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.urls import resolve
+
+from accounts.utils import create_access_token
+from api.models import Product
+from api.profiling import QueryBudgetExceeded, request_profiling_middleware, reset_stats
+from api.utils import query_budget
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    reset_stats()
+    yield
+    reset_stats()
+
+
+@pytest.fixture
+def client():
+    return Client()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        username="testuser",
+        email="test@example.com",
+        password="testpass123"
+    )
+
+
+@pytest.fixture
+def staff_user():
+    return User.objects.create_user(
+        username="staffuser",
+        email="staff@example.com",
+        password="staffpass123",
+        is_staff=True
+    )
+
+
+@pytest.fixture
+def auth_headers(user):
+    token = create_access_token(user.id)
+    return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+
+@pytest.fixture
+def staff_headers(staff_user):
+    token = create_access_token(staff_user.id)
+    return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+
+def _profiled_request(view, path="/api/products/"):
+    request = RequestFactory().get(path)
+    request.resolver_match = resolve(path)
+    return request_profiling_middleware(lambda r: view(r))(request)
+
+
+# --- TESTES PARA SERVER-TIMING ---
+
+@pytest.mark.django_db
+def test_server_timing_header(client, settings):
+    """Testa que a resposta informa consultas, tempo de banco, serialização e total"""
+    settings.REQUEST_PROFILING_HEADERS = True
+    Product.objects.create(name="Cupcake", price="10.00")
+
+    response = client.get("/api/products/")
+
+    assert response.status_code == 200
+    timing = response["Server-Timing"]
+    assert 'db;desc="1 queries"' in timing
+    assert "serialize;dur=" in timing
+    assert "total;dur=" in timing
+
+
+@pytest.mark.django_db
+def test_server_timing_header_disabled(client, settings):
+    """Testa que o cabeçalho pode ser desligado"""
+    settings.REQUEST_PROFILING_HEADERS = False
+
+    response = client.get("/api/products/")
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response
+
+
+# --- TESTES PARA QUERY BUDGET ---
+
+@pytest.mark.django_db
+def test_query_budget_exceeded_strict(settings):
+    """Testa que uma rota acima do orçamento de consultas falha no modo estrito"""
+    settings.QUERY_BUDGET_STRICT = True
+
+    @query_budget(1)
+    def view(request):
+        list(Product.objects.all())
+        list(Product.objects.all())
+        return HttpResponse()
+
+    with pytest.raises(QueryBudgetExceeded):
+        _profiled_request(view)
+
+
+@pytest.mark.django_db
+def test_query_budget_exceeded_warns(settings, caplog):
+    """Testa que fora do modo estrito o excesso de consultas só gera um aviso"""
+    settings.QUERY_BUDGET_STRICT = False
+
+    @query_budget(1)
+    def view(request):
+        list(Product.objects.all())
+        list(Product.objects.all())
+        return HttpResponse()
+
+    response = _profiled_request(view)
+
+    assert response.status_code == 200
+    assert "over its budget of 1" in caplog.text
+
+
+@pytest.mark.django_db
+def test_query_budget_within(settings):
+    """Testa que uma rota dentro do orçamento responde normalmente"""
+    settings.QUERY_BUDGET_STRICT = True
+
+    @query_budget(2)
+    def view(request):
+        list(Product.objects.all())
+        return HttpResponse()
+
+    assert _profiled_request(view).status_code == 200
+
+
+# --- TESTES PARA STATS ---
+
+@pytest.mark.django_db
+def test_stats_staff(client, staff_headers):
+    """Testa que staff vê as médias por rota e os contadores dos caches"""
+    client.get("/api/products/")
+    client.get("/api/products/")
+
+    response = client.get("/api/stats/", **staff_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    routes = {route["route"]: route for route in data["routes"]}
+    assert routes["GET /api/products/"]["count"] == 2
+    assert "avg_queries" in routes["GET /api/products/"]
+    assert "hits" in data["caches"]["users"]
+    assert "hits" in data["caches"]["tokens"]
+    assert "hits" in data["caches"]["revoked_tokens"]
+    assert "hits" in data["caches"]["image_urls"]
+    assert "rejected" in data["password_hashing"]
+
+
+@pytest.mark.django_db
+def test_stats_regular_user_forbidden(client, auth_headers):
+    """Testa que usuário comum não acessa as estatísticas"""
+    response = client.get("/api/stats/", **auth_headers)
+
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_stats_without_auth(client):
+    """Testa acesso sem autenticação"""
+    response = client.get("/api/stats/")
+
+    assert response.status_code == 401
@@ -1,6 +1,9 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
 
 from accounts.utils import create_access_token
 
@@ -380,4 +383,121 @@ def test_change_password_weak_password(client, user, auth_headers):
 
     # Dependendo da configuração do Django, pode aceitar ou rejeitar
     # Este teste documenta o comportamento atual
-    assert response.status_code in [200, 422]
\ No newline at end of file
+    assert response.status_code in [200, 422]
+
+# --- TESTES PARA O CACHE DE USUÁRIOS AUTENTICADOS ---
+
+@pytest.mark.django_db
+def test_authenticated_requests_do_not_query_users(client, user, auth_headers):
+    """Testa que requisições autenticadas repetidas não consultam a tabela de usuários"""
+    client.get("/api/users/me", **auth_headers)
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get("/api/users/me", **auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["username"] == user.username
+    assert len(context.captured_queries) == 0
+
+
+@pytest.mark.django_db
+def test_user_cache_invalidated_on_deactivation(client, user, auth_headers):
+    """Testa que a desativação do usuário derruba o cache e bloqueia o token"""
+    assert client.get("/api/users/me", **auth_headers).status_code == 200
+
+    user.is_active = False
+    user.save()
+
+    assert client.get("/api/users/me", **auth_headers).status_code == 401
+
+
+@pytest.mark.django_db
+def test_user_cache_invalidated_on_update(client, user, auth_headers):
+    """Testa que alterações do perfil aparecem na próxima requisição"""
+    client.get("/api/users/me", **auth_headers)
+
+    client.put("/api/users/me", data={"first_name": "Novo"}, content_type="application/json", **auth_headers)
+
+    response = client.get("/api/users/me", **auth_headers)
+    assert response.json()["first_name"] == "Novo"
+
+
+@pytest.mark.django_db
+def test_user_cache_invalidated_on_commit(client, user, auth_headers, django_capture_on_commit_callbacks):
+    """Testa que a linha antiga, lida e guardada por outra requisição antes do commit, não sobrevive a ele"""
+    import copy
+    from accounts.cache import user_cache
+
+    stale = copy.copy(user)
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_active = False
+        user.save()
+        # outra requisição leu o usuário antes do commit
+        user_cache.set(user.pk, (stale, 0))
+
+    assert client.get("/api/users/me", **auth_headers).status_code == 401
+
+
+@pytest.mark.django_db
+def test_user_cache_shared_version_stamp(client, user, auth_headers, settings):
+    """Testa que a mudança de versão feita por outro processo invalida o cache local"""
+    settings.AUTH_USER_CACHE_SHARED = True
+    client.get("/api/users/me", **auth_headers)
+
+    # outro worker desativou o usuário: só o carimbo de versão compartilhado muda aqui
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    assert client.get("/api/users/me", **auth_headers).status_code == 200
+    cache.set(f"accounts:user-version:{user.pk}", 99)
+
+    assert client.get("/api/users/me", **auth_headers).status_code == 401
+
+
+@pytest.mark.django_db
+def test_update_me_with_stale_cache_keeps_password_and_status(client, user, auth_headers):
+    """Testa que o PUT /me com o usuário do cache desatualizado não regrava senha nem is_active"""
+    from django.contrib.auth.hashers import make_password
+    client.get("/api/users/me", **auth_headers)
+
+    # outro worker trocou a senha: update() não passa pelos sinais, o cache local fica velho
+    new_hash = make_password("changedpass456")
+    User.objects.filter(pk=user.pk).update(password=new_hash)
+
+    response = client.put("/api/users/me", data={"first_name": "Novo"}, content_type="application/json",
+                          **auth_headers)
+
+    assert response.status_code == 200
+    user.refresh_from_db()
+    assert user.first_name == "Novo"
+    assert user.password == new_hash
+    assert user.is_active is True
+
+
+@pytest.mark.django_db
+def test_update_me_with_stale_cache_keeps_deactivation(client, user, auth_headers):
+    """Testa que uma desativação feita em outro worker não é desfeita pelo cache local"""
+    client.get("/api/users/me", **auth_headers)
+    User.objects.filter(pk=user.pk).update(is_active=False)
+
+    response = client.put("/api/users/me", data={"first_name": "Novo"}, content_type="application/json",
+                          **auth_headers)
+
+    assert response.status_code == 401
+    user.refresh_from_db()
+    assert user.is_active is False
+    assert user.first_name == "Test"
+
+
+@pytest.mark.django_db
+def test_change_password_with_stale_cache_checks_current_hash(client, user, auth_headers):
+    """Testa que a senha atual é conferida com o hash do banco, não com o do cache"""
+    from django.contrib.auth.hashers import make_password
+    client.get("/api/users/me", **auth_headers)
+    User.objects.filter(pk=user.pk).update(password=make_password("changedpass456"))
+
+    response = client.post("/api/users/me/change-password",
+                           data={"old_password": "testpass123", "new_password": "otherpass789"},
+                           content_type="application/json", **auth_headers)
+
+    assert response.json()["success"] is False
+    user.refresh_from_db()
+    assert user.check_password("changedpass456")
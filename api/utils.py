@@ -1,10 +1,22 @@
+import inspect
 from functools import wraps
 
 from django.http import HttpResponse
 
+from api.profiling import current_profile
+
 
 # --- Decorator to require the user to be staff ---
 def staff_required(func):
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(request, *args, **kwargs):
+            user = request.auth
+            if not user or not user.is_staff:
+                return HttpResponse(status=403)
+            return await func(request, *args, **kwargs)
+        return async_wrapper
+
     @wraps(func)
     def wrapper(request, *args, **kwargs):
         user = request.auth
@@ -12,3 +24,27 @@ def staff_required(func):
             return HttpResponse(status=403)
         return func(request, *args, **kwargs)
     return wrapper
+
+
+# --- Decorator to declare how many SQL queries a route may run ---
+def query_budget(max_queries: int):
+    """Over budget: a warning, or QueryBudgetExceeded with QUERY_BUDGET_STRICT (tests)"""
+    def decorator(func):
+        def declare():
+            profile = current_profile()
+            if profile is not None:
+                profile.budget = max_queries
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(request, *args, **kwargs):
+                declare()
+                return await func(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(request, *args, **kwargs):
+            declare()
+            return func(request, *args, **kwargs)
+        return wrapper
+    return decorator
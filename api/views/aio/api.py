@@ -0,0 +1,27 @@
+from ninja import NinjaAPI
+
+from accounts.passwords import PasswordHashingBusy
+from accounts.views import aio as auth
+from api.profiling import ProfilingJSONRenderer
+from . import users, products, deliveryaddresses, orders, orderitems
+
+# Async variants of the read endpoints and of the password hashing auth endpoints, mounted
+# at /api/async/ (see config/urls.py). They only free the worker while waiting on the
+# database (or on the password pool) when served through ASGI.
+async_api = NinjaAPI(title="Cupcake API (async)", urls_namespace="async_api",
+                     renderer=ProfilingJSONRenderer())
+
+
+@async_api.exception_handler(PasswordHashingBusy)
+def password_hashing_busy(request, exc):
+    response = async_api.create_response(request, {"error": "Too many logins in progress, try again"}, status=503)
+    response["Retry-After"] = "1"
+    return response
+
+
+async_api.add_router("/auth/", auth.router)
+async_api.add_router("/users/", users.router)
+async_api.add_router("/products/", products.router)
+async_api.add_router("/orders/", orders.router)
+async_api.add_router("/order-items/", orderitems.router)
+async_api.add_router("/delivery-addresses/", deliveryaddresses.router)
@@ -0,0 +1,31 @@
+from uuid import UUID
+
+from django.shortcuts import aget_object_or_404
+from ninja import Router
+from ninja.errors import HttpError
+
+from accounts.deps import AsyncAuthBearer, AsyncClaimsBearer
+from api.models import DeliveryAddress
+from api.schemas.deliveryaddresses import DeliveryAddressOut
+
+router = Router(tags=["delivery addresses (async)"], auth=AsyncAuthBearer())
+
+
+# --- READ ALL ---
+@router.get("/", response=list[DeliveryAddressOut], auth=AsyncClaimsBearer())
+async def list_delivery_addresses(request):
+    """List all delivery addresses"""
+    user = request.auth
+    addresses = DeliveryAddress.objects.all() if user.is_staff else DeliveryAddress.objects.filter(user=user)
+    return [address async for address in addresses]
+
+
+# --- READ ONE ---
+@router.get("/{uuid}", response=DeliveryAddressOut, auth=AsyncClaimsBearer())
+async def get_delivery_address(request, uuid: UUID):
+    """Get a delivery address by UUID"""
+    user = request.auth
+    delivery_address = await aget_object_or_404(DeliveryAddress, uuid=uuid)
+    if not user.is_staff and delivery_address.user_id != user.id:
+        raise HttpError(403, "You do not have permission to access this delivery address.")
+    return delivery_address
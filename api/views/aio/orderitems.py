@@ -0,0 +1,57 @@
+from uuid import UUID
+
+from django.shortcuts import aget_object_or_404
+from ninja import Router, Query
+
+from accounts.deps import AsyncAuthBearer, AsyncClaimsBearer
+from api.models import Order
+from api.pagination import apaginate_keyset
+from api.schemas.orderitems import OrderItemOut, OrderItemAdminOut, OrderItemAdminPageOut, OrderItemSummaryPageOut
+from api.schemas.orders import OrderFilterIn
+from api.services.orderitems import build_order_item_response, build_order_item_response_staff, order_aggregates
+from api.services.orders import SORT_KEYS, filter_orders, order_summaries
+from api.utils import staff_required
+
+router = Router(tags=["order-items (async)"], auth=AsyncAuthBearer())
+
+
+# --- READ ALL ---
+@router.get("/", response=list[OrderItemOut], auth=AsyncClaimsBearer())
+async def list_order_items(request):
+    """List all order with items"""
+    user = request.auth
+    orders = order_aggregates(Order.objects.filter(user=user))
+    return [build_order_item_response(order) async for order in orders]
+
+
+# --- READ ALL (staff only)---
+@router.get("/admin", response=OrderItemAdminPageOut | OrderItemSummaryPageOut, auth=AsyncClaimsBearer())
+@staff_required
+async def list_order_items_staff(request, filters: Query[OrderFilterIn]):
+    """List orders with items from all users to staff, filtered and one page at a time (follow `next`)"""
+    orders = filter_orders(filters)
+    if filters.view == "summary":
+        return await apaginate_keyset(request, order_summaries(orders), SORT_KEYS[filters.sort],
+                                      filters.cursor, filters.limit)
+    page = await apaginate_keyset(request, order_aggregates(orders, with_user=True), SORT_KEYS[filters.sort],
+                                  filters.cursor, filters.limit)
+    page["items"] = [build_order_item_response_staff(order) for order in page["items"]]
+    return page
+
+
+# --- READ ONE ---
+@router.get("/{order_uuid}", response=OrderItemOut, auth=AsyncClaimsBearer())
+async def get_order_item(request, order_uuid: UUID):
+    """Get an order with items by uuid"""
+    user = request.auth
+    order = await aget_object_or_404(order_aggregates(), user=user, uuid=order_uuid)
+    return build_order_item_response(order)
+
+
+# --- READ ONE (staff only)---
+@router.get("/admin/{order_uuid}", response=OrderItemAdminOut, auth=AsyncClaimsBearer())
+@staff_required
+async def get_order_item_staff(request, order_uuid: UUID):
+    """Get an order with items by uuid to staff"""
+    order = await aget_object_or_404(order_aggregates(with_user=True), uuid=order_uuid)
+    return build_order_item_response_staff(order)
@@ -0,0 +1,50 @@
+from uuid import UUID
+
+from django.shortcuts import aget_object_or_404
+from ninja import Router, Query
+
+from accounts.deps import AsyncAuthBearer, AsyncClaimsBearer
+from api.models import Order
+from api.pagination import apaginate_keyset
+from api.schemas.orders import OrderOut, OrderAdminOut, OrderFilterIn, OrderAdminPageOut, OrderSummaryPageOut
+from api.services.orders import SORT_KEYS, filter_orders, order_summaries
+from api.utils import staff_required
+
+router = Router(tags=["orders (async)"], auth=AsyncAuthBearer())
+
+
+# --- READ ALL ---
+@router.get("/", response=list[OrderOut], auth=AsyncClaimsBearer())
+async def list_orders(request):
+    """List all orders"""
+    user = request.auth
+    return [order async for order in Order.objects.filter(user=user).select_related("delivery_address")]
+
+
+# --- READ ALL (staff only)---
+@router.get("/admin", response=OrderAdminPageOut | OrderSummaryPageOut, auth=AsyncClaimsBearer())
+@staff_required
+async def list_orders_staff(request, filters: Query[OrderFilterIn]):
+    """List orders from all users to staff, filtered and one page at a time (follow `next`)"""
+    orders = filter_orders(filters)
+    if filters.view == "summary":
+        orders = order_summaries(orders)
+    else:
+        orders = orders.select_related("delivery_address", "user")
+    return await apaginate_keyset(request, orders, SORT_KEYS[filters.sort], filters.cursor, filters.limit)
+
+
+# --- READ ONE ---
+@router.get("/{order_uuid}", response=OrderOut, auth=AsyncClaimsBearer())
+async def get_order(request, order_uuid: UUID):
+    """Get an order by uuid"""
+    user = request.auth
+    return await aget_object_or_404(Order.objects.select_related("delivery_address"), user=user, uuid=order_uuid)
+
+
+# --- READ ONE (staff only)---
+@router.get("/admin/{order_uuid}", response=OrderAdminOut, auth=AsyncClaimsBearer())
+@staff_required
+async def get_order_staff(request, order_uuid: UUID):
+    """Get an order by uuid to staff"""
+    return await aget_object_or_404(Order.objects.select_related("delivery_address", "user"), uuid=order_uuid)
@@ -0,0 +1,43 @@
+from uuid import UUID
+
+from django.shortcuts import aget_object_or_404
+from ninja import Router, Query
+
+from api.models import Product
+from api.pagination import apaginate_keyset
+from api.schemas.pagination import KeysetPageIn
+from api.schemas.products import ProductOut, ProductPageOut
+from api.services.catalog import acached_catalog_response, acatalog_snapshot, conditional_json_response
+
+router = Router(tags=["products (async)"])
+
+
+# --- READ ALL (public) ---
+@router.get("/", response=ProductPageOut)
+async def list_products(request, page: Query[KeysetPageIn]):
+    """List all products, one page at a time (follow `next` for the following page)"""
+    async def render():
+        result = await apaginate_keyset(request, Product.objects.all(), Product._meta.ordering,
+                                        page.cursor, page.limit)
+        return ProductPageOut.model_validate(result).model_dump_json().encode()
+
+    return await acached_catalog_response(request, render)
+
+
+# --- READ ALL, pre-rendered (public) ---
+@router.get("/catalog", response=list[ProductOut])
+async def get_catalog(request):
+    """Whole active catalog in one response, served from the pre-rendered snapshot"""
+    etag, body = await acatalog_snapshot()
+    return conditional_json_response(request, body, etag)
+
+
+# --- READ ONE (public) ---
+@router.get("/{uuid}", response=ProductOut)
+async def get_product(request, uuid: UUID):
+    """Get a product by UUID"""
+    async def render():
+        product = await aget_object_or_404(Product, uuid=uuid)
+        return ProductOut.model_validate(product).model_dump_json().encode()
+
+    return await acached_catalog_response(request, render)
@@ -0,0 +1,39 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from ninja import Router
+from ninja.errors import HttpError
+
+from accounts.deps import AsyncAuthBearer
+from accounts.passwords import acheck_user_password, aset_user_password
+from accounts.tokens import revoke_user_tokens
+from api.schemas.users import UserOut, ChangePasswordIn
+
+User = get_user_model()
+router = Router(tags=["users (async)"], auth=AsyncAuthBearer())
+
+
+@router.get("/me", response=UserOut)
+async def get_me(request):
+    """Return the data of authenticated user"""
+    return request.auth  # request.auth is the user coming from AsyncAuthBearer
+
+
+@router.post("/me/change-password")
+async def change_password(request, data: ChangePasswordIn):
+    """
+    Allow the user to change their password (hashing on the bounded password pool)
+    Necessary to provide the current and new passwords
+    """
+    # request.auth comes from the per-process user cache and may be stale: check the current
+    # hash, and write only the password
+    user = await User.objects.filter(pk=request.auth.pk, is_active=True).afirst()
+    if user is None:
+        raise HttpError(401, "Unauthorized")
+
+    if not await acheck_user_password(user, data.old_password):
+        return {"success": False, "message": "Current password incorrect"}
+
+    await aset_user_password(user, data.new_password)
+    await user.asave(update_fields=["password"])
+    await sync_to_async(revoke_user_tokens)(user.id)  # every session, this one included, logs in again
+    return {"success": True, "message": "Password changed successfully"}
@@ -1,9 +1,10 @@
 from ninja import NinjaAPI
 
 from accounts.views import auth
-from . import users, products, deliveryaddresses, orders, orderitems
+from api.profiling import ProfilingJSONRenderer
+from . import users, products, deliveryaddresses, orders, orderitems, stats
 
-api = NinjaAPI()
+api = NinjaAPI(renderer=ProfilingJSONRenderer())
 
 
 api.add_router("/auth/", auth.router)
@@ -12,3 +13,4 @@ api.add_router("/products/", products.router)
 api.add_router("/orders/", orders.router)
 api.add_router("/order-items/", orderitems.router)
 api.add_router("/delivery-addresses/", deliveryaddresses.router)
+api.add_router("/stats/", stats.router)
@@ -7,7 +7,7 @@ from ninja import Router
 from ninja.errors import HttpError
 from ninja.errors import ValidationError as NinjaValidationError
 
-from accounts.deps import AuthBearer
+from accounts.deps import AuthBearer, ClaimsBearer
 from api.models import DeliveryAddress
 from api.schemas.deliveryaddresses import DeliveryAddressOut, DeliveryAddressIn
 
@@ -15,7 +15,7 @@ router = Router(tags=["delivery addresses"], auth=AuthBearer())
 
 
 # --- READ ALL ---
-@router.get("/", response=list[DeliveryAddressOut])
+@router.get("/", response=list[DeliveryAddressOut], auth=ClaimsBearer())
 def list_delivery_addresses(request):
     """List all delivery addresses"""
     user = request.auth
@@ -25,12 +25,12 @@ def list_delivery_addresses(request):
 
 
 # --- READ ONE ---
-@router.get("/{uuid}", response=DeliveryAddressOut)
+@router.get("/{uuid}", response=DeliveryAddressOut, auth=ClaimsBearer())
 def get_delivery_address(request, uuid: UUID):
     """Get a delivery address by UUID"""
     user = request.auth
     delivery_address = get_object_or_404(DeliveryAddress, uuid=uuid)
-    if not user.is_staff and delivery_address.user != user:
+    if not user.is_staff and delivery_address.user_id != user.id:
         raise HttpError(403, "You do not have permission to access this delivery address.")
     return delivery_address
 
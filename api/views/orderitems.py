@@ -4,14 +4,25 @@ from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from ninja import Router
+from ninja import Router, Query
 from ninja.errors import ValidationError as NinjaValidationError, HttpError
 
-from accounts.deps import AuthBearer
+from accounts.deps import AuthBearer, ClaimsBearer
 from api.models import OrderItem, Order, Product
-from api.schemas.orderitems import OrderItemIn, OrderItemOut, OrderItemAdminOut
-from api.services.orderitems import build_order_item_response, build_order_item_response_staff
-from api.utils import staff_required
+from api.pagination import paginate_keyset
+from api.schemas.orderitems import OrderItemIn, OrderItemOut, OrderItemAdminOut, CartIn, OrderItemAdminPageOut, \
+    OrderItemSummaryPageOut
+from api.schemas.orders import OrderFilterIn, OrderExportIn, OrderSummaryOut
+from api.services.exports import export_records, streaming_export
+from api.services.orderitems import (
+    build_order_item_response,
+    build_order_item_response_staff,
+    load_order_items,
+    order_aggregates,
+    sync_cart,
+)
+from api.services.orders import SORT_KEYS, filter_orders, order_summaries
+from api.utils import query_budget, staff_required
 
 router = Router(tags=["order-items"], auth=AuthBearer())
 
@@ -21,7 +32,7 @@ router = Router(tags=["order-items"], auth=AuthBearer())
 def create_order_item(request, data: OrderItemIn):
     """Create a new item in an order"""
     user = request.auth
-    order = get_object_or_404(Order, user=user, uuid=data.order_uuid)
+    order = get_object_or_404(Order.objects.select_related("delivery_address"), user=user, uuid=data.order_uuid)
 
     if order.status not in (Order.OrderStatus.DRAFT, Order.OrderStatus.PENDING):
         raise HttpError(400, f"Order cannot add items at '{order.status}' status")
@@ -41,46 +52,82 @@ def create_order_item(request, data: OrderItemIn):
         try:
             order_item.full_clean()
             order_item.save()
-            return build_order_item_response(order)
+            return build_order_item_response(load_order_items(order))
         except ValidationError as e:
             raise NinjaValidationError(e.message_dict)
 
 
+# --- CREATE / UPDATE / DELETE MANY (cart sync) ---
+@router.post("/bulk", response=OrderItemOut)
+@query_budget(12)
+def sync_order_items(request, data: CartIn):
+    """Set the quantity of many products of an order in one request (quantity 0 removes the product)"""
+    user = request.auth
+    order = get_object_or_404(Order.objects.select_related("delivery_address"), user=user, uuid=data.order_uuid)
+
+    if order.status not in (Order.OrderStatus.DRAFT, Order.OrderStatus.PENDING):
+        raise HttpError(400, f"Order cannot change items at '{order.status}' status")
+
+    return build_order_item_response(sync_cart(order, data.items))
+
+
 # --- READ ALL ---
-@router.get("/", response=list[OrderItemOut])
+@router.get("/", response=list[OrderItemOut], auth=ClaimsBearer())
+@query_budget(3)
 def list_order_items(request):
     """List all order with items"""
     user = request.auth
-    orders = Order.objects.filter(user=user).all()
+    orders = order_aggregates(Order.objects.filter(user=user))
     order_items_out = [build_order_item_response(order) for order in orders]
     return order_items_out
 
 
 # --- READ ALL (staff only)---
-@router.get("/admin", response=list[OrderItemAdminOut])
+@router.get("/admin", response=OrderItemAdminPageOut | OrderItemSummaryPageOut, auth=ClaimsBearer())
 @staff_required
-def list_order_items_staff(request):
-    """List all order with items from all users to staff"""
-    orders = Order.objects.all()
-    order_items_out = [build_order_item_response_staff(order) for order in orders]
-    return order_items_out
+@query_budget(3)
+def list_order_items_staff(request, filters: Query[OrderFilterIn]):
+    """List orders with items from all users to staff, filtered and one page at a time (follow `next`)"""
+    orders = filter_orders(filters)
+    if filters.view == "summary":
+        return paginate_keyset(request, order_summaries(orders), SORT_KEYS[filters.sort],
+                               filters.cursor, filters.limit)
+    page = paginate_keyset(request, order_aggregates(orders, with_user=True), SORT_KEYS[filters.sort],
+                           filters.cursor, filters.limit)
+    page["items"] = [build_order_item_response_staff(order) for order in page["items"]]
+    return page
+
+
+# --- EXPORT (staff only)---
+@router.get("/admin/export", auth=ClaimsBearer())
+@staff_required
+def export_order_items_staff(request, filters: Query[OrderExportIn]):
+    """Stream every order matching the filters, with its items, to staff as NDJSON or one JSON array"""
+    orders = filter_orders(filters).order_by(*SORT_KEYS[filters.sort])
+    if filters.view == "summary":
+        records = export_records(order_summaries(orders), OrderSummaryOut.model_validate)
+    else:
+        records = export_records(order_aggregates(orders, with_user=True), build_order_item_response_staff)
+    return streaming_export(request, records, filters.format, "order-items")
 
 
 # --- READ ONE ---
-@router.get("/{order_uuid}", response=OrderItemOut)
+@router.get("/{order_uuid}", response=OrderItemOut, auth=ClaimsBearer())
+@query_budget(3)
 def get_order_item(request, order_uuid: UUID):
     """Get an order with items by uuid"""
     user = request.auth
-    order = get_object_or_404(Order, user=user, uuid=order_uuid)
+    order = get_object_or_404(order_aggregates(), user=user, uuid=order_uuid)
     return build_order_item_response(order)
 
 
 # --- READ ONE (staff only)---
-@router.get("/admin/{order_uuid}", response=OrderItemAdminOut)
+@router.get("/admin/{order_uuid}", response=OrderItemAdminOut, auth=ClaimsBearer())
 @staff_required
+@query_budget(3)
 def get_order_item_staff(request, order_uuid: UUID):
     """Get an order with items by uuid to staff"""
-    order = get_object_or_404(Order, uuid=order_uuid)
+    order = get_object_or_404(order_aggregates(with_user=True), uuid=order_uuid)
     return build_order_item_response_staff(order)
 
 
@@ -89,17 +136,19 @@ def get_order_item_staff(request, order_uuid: UUID):
 def update_order_item(request, data: OrderItemIn):
     """Update an order item"""
     user = request.auth
-    order = get_object_or_404(Order, user=user, uuid=data.order_uuid)
+    order = get_object_or_404(Order.objects.select_related("delivery_address"), user=user, uuid=data.order_uuid)
     product = get_object_or_404(Product, uuid=data.product_uuid)
-    order_item = get_object_or_404(OrderItem, order=order, product=product)
-    for field, value in data.dict(exclude_unset=True).items():
-        setattr(order_item, field, value)
-    try:
-        order_item.full_clean()
-        order_item.save()
-        return build_order_item_response(order)
-    except ValidationError as e:
-        raise NinjaValidationError(e.message_dict)
+    with transaction.atomic():
+        # through order.items the item keeps this order instance, whose totals save() refreshes
+        order_item = get_object_or_404(order.items.select_for_update(), product=product)
+        for field, value in data.dict(exclude_unset=True).items():
+            setattr(order_item, field, value)
+        try:
+            order_item.full_clean()
+            order_item.save()
+        except ValidationError as e:
+            raise NinjaValidationError(e.message_dict)
+    return build_order_item_response(load_order_items(order))
 
 
 # --- DELETE ---
@@ -4,19 +4,24 @@ from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from ninja import Router
+from ninja import Router, Query
 from ninja.errors import ValidationError as NinjaValidationError
 
-from accounts.deps import AuthBearer
+from accounts.deps import AuthBearer, ClaimsBearer
 from api.models import Order, DeliveryAddress
-from api.schemas.orders import OrderOut, OrderAdminOut, OrderIn, OrderInUpdate
-from api.utils import staff_required
+from api.pagination import paginate_keyset
+from api.schemas.orders import OrderOut, OrderAdminOut, OrderIn, OrderInUpdate, OrderFilterIn, OrderAdminPageOut, \
+    OrderSummaryPageOut, OrderExportIn, OrderSummaryOut
+from api.services.exports import export_records, streaming_export
+from api.services.orders import SORT_KEYS, filter_orders, order_summaries
+from api.services.orderstatus import STAFF_TRANSITIONS, USER_TRANSITIONS, transition_order
+from api.utils import query_budget, staff_required
 
 router = Router(tags=["orders"], auth=AuthBearer())
 
 
 # --- READ ALL ---
-@router.get("/", response=list[OrderOut])
+@router.get("/", response=list[OrderOut], auth=ClaimsBearer())
 def list_orders(request):
     """List all orders"""
     user = request.auth
@@ -24,15 +29,34 @@ def list_orders(request):
 
 
 # --- READ ALL (staff only)---
-@router.get("/admin", response=list[OrderAdminOut])
+@router.get("/admin", response=OrderAdminPageOut | OrderSummaryPageOut, auth=ClaimsBearer())
 @staff_required
-def list_orders_staff(request):
-    """List all orders from all users to staff"""
-    return Order.objects.all()
+@query_budget(2)
+def list_orders_staff(request, filters: Query[OrderFilterIn]):
+    """List orders from all users to staff, filtered and one page at a time (follow `next`)"""
+    orders = filter_orders(filters)
+    if filters.view == "summary":
+        orders = order_summaries(orders)
+    else:
+        orders = orders.select_related("delivery_address", "user")
+    return paginate_keyset(request, orders, SORT_KEYS[filters.sort], filters.cursor, filters.limit)
+
+
+# --- EXPORT (staff only)---
+@router.get("/admin/export", auth=ClaimsBearer())
+@staff_required
+def export_orders_staff(request, filters: Query[OrderExportIn]):
+    """Stream every order matching the filters to staff, as NDJSON or one JSON array"""
+    orders = filter_orders(filters).order_by(*SORT_KEYS[filters.sort])
+    if filters.view == "summary":
+        records = export_records(order_summaries(orders), OrderSummaryOut.model_validate)
+    else:
+        records = export_records(orders.select_related("delivery_address", "user"), OrderAdminOut.model_validate)
+    return streaming_export(request, records, filters.format, "orders")
 
 
 # --- READ ONE ---
-@router.get("/{order_uuid}", response=OrderOut)
+@router.get("/{order_uuid}", response=OrderOut, auth=ClaimsBearer())
 def get_order(request, order_uuid: UUID):
     """Get an order by uuid"""
     user = request.auth
@@ -40,7 +64,7 @@ def get_order(request, order_uuid: UUID):
 
 
 # --- READ ONE (staff only)---
-@router.get("/admin/{order_uuid}", response=OrderAdminOut)
+@router.get("/admin/{order_uuid}", response=OrderAdminOut, auth=ClaimsBearer())
 @staff_required
 def get_order_staff(request, order_uuid: UUID):
     """Get an order by uuid to staff"""
@@ -70,32 +94,21 @@ def create_order(request, data: OrderIn):
 # --- UPDATE (staff only) ---
 @router.put("/{order_uuid}", response=OrderOut)
 @staff_required
-def update_order_staff(request, order_uuid: str, data: OrderInUpdate):
-    """Update an order (only staff)"""
-    order = get_object_or_404(Order, uuid=order_uuid)
-    for field, value in data.dict(exclude_unset=True).items():
-        setattr(order, field, value)
+def update_order_staff(request, order_uuid: UUID, data: OrderInUpdate):
+    """Update an order (only staff); the status must follow the order workflow"""
     try:
-        order.full_clean()
-        order.save()
-        return order
+        return transition_order({"uuid": order_uuid}, data.status, STAFF_TRANSITIONS,
+                                payment_method=data.payment_method)
     except ValidationError as e:
         raise NinjaValidationError(e.message_dict)
 
 
 # --- UPDATE (user confirm) ---
 @router.put("/confirm/{order_uuid}", response=OrderOut)
-def update_order_user_confirm(request, order_uuid: str):
-    """Confirm an order (by user)"""
+def update_order_user_confirm(request, order_uuid: UUID):
+    """Confirm an order (by user), while it is a draft or pending"""
     user = request.auth
-    order = get_object_or_404(Order, uuid=order_uuid, user=user)
-    order.status = Order.OrderStatus.CONFIRMED
-    try:
-        order.full_clean()
-        order.save()
-        return order
-    except ValidationError as e:
-        raise NinjaValidationError(e.message_dict)
+    return transition_order({"uuid": order_uuid, "user": user.id}, Order.OrderStatus.CONFIRMED, USER_TRANSITIONS)
 
 
 # --- DELETE (staff only) ---
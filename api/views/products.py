@@ -2,24 +2,55 @@ from decimal import Decimal
 from uuid import UUID
 
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from ninja import Router, File, UploadedFile, Form
-from ninja.errors import ValidationError as NinjaValidationError
+from ninja import Router, File, UploadedFile, Form, Query
+from ninja.errors import ValidationError as NinjaValidationError, HttpError
 
 from accounts.deps import AuthBearer
 from api.models import Product
-from api.schemas.products import ProductOut
-from api.utils import staff_required
+from api.pagination import paginate_keyset
+from api.schemas.pagination import KeysetPageIn
+from api.schemas.products import ProductOut, ProductPageOut, ProductImportOut
+from api.services.catalog import cached_catalog_response, catalog_snapshot, conditional_json_response
+from api.services.images import schedule_image_upload
+from api.services.products import import_products, product_file_format, read_product_file
+from api.utils import query_budget, staff_required
 
 router = Router(tags=["products"])
 
 
 # --- READ ALL (public) ---
-@router.get("/", response=list[ProductOut])
-def list_products(request):
-    """List all products"""
-    return Product.objects.all()
+@router.get("/", response=ProductPageOut)
+@query_budget(1)
+def list_products(request, page: Query[KeysetPageIn]):
+    """List all products, one page at a time (follow `next` for the following page)"""
+    def render():
+        result = paginate_keyset(request, Product.objects.all(), Product._meta.ordering, page.cursor, page.limit)
+        return ProductPageOut.model_validate(result).model_dump_json().encode()
+
+    return cached_catalog_response(request, render)
+
+
+# --- READ ALL, pre-rendered (public) ---
+@router.get("/catalog", response=list[ProductOut])
+def get_catalog(request):
+    """Whole active catalog in one response, served from the pre-rendered snapshot"""
+    etag, body = catalog_snapshot()
+    return conditional_json_response(request, body, etag)
+
+
+# --- BULK IMPORT (staff only) ---
+@router.post("/import", response=ProductImportOut, auth=AuthBearer())
+@staff_required
+def import_products_staff(request, file: UploadedFile = File(...)):
+    """Create or update many products from a CSV or JSON file, keyed on sku (only staff)"""
+    try:
+        rows = read_product_file(file.read(), product_file_format(file.name))
+    except ValueError as e:
+        raise HttpError(400, f"Invalid product file: {e}")
+    return import_products(rows)
 
 
 # --- UPDATE (staff only) ---
@@ -32,32 +63,41 @@ def update_product(
     description: str = Form(...),
     price: Decimal = Form(...),
     promotion: bool = Form(...),
+    sku: str | None = Form(None),
     image: UploadedFile | None = File(None),
 ):
     """Update a product (only staff)"""
     product = get_object_or_404(Product, uuid=uuid)
 
+    if sku is not None:
+        product.sku = sku or None
     product.name = name
     product.description = description
     product.price = price
     product.promotion = promotion
 
-    if image:
-        product.image = image  # Django + Cloudinary fazem o upload automaticamente
-
     try:
-        product.full_clean()
-        product.save()
-        return product
+        # an image that is not valid rolls the product changes back too
+        with transaction.atomic():
+            product.full_clean()
+            product.save()
+            if image:
+                schedule_image_upload(product, image)  # uploaded in the background, image_status PENDING until then
     except ValidationError as e:
         raise NinjaValidationError(e.message_dict)
+    return product
 
 
 # --- READ ONE (public) ---
 @router.get("/{uuid}", response=ProductOut)
+@query_budget(1)
 def get_product(request, uuid: UUID):
     """Get a product by UUID"""
-    return get_object_or_404(Product, uuid=uuid)
+    def render():
+        product = get_object_or_404(Product, uuid=uuid)
+        return ProductOut.model_validate(product).model_dump_json().encode()
+
+    return cached_catalog_response(request, render)
 
 
 # --- CREATE (staff only) ---
@@ -69,24 +109,26 @@ def create_product(
     description: str = Form(...),
     price: Decimal = Form(...),
     promotion: bool = Form(...),
+    sku: str | None = Form(None),
     image: UploadedFile | None = File(None),
 ):
     """Create a new product (only staff)"""
-    product = Product(name=name,
+    product = Product(sku=sku or None,
+                      name=name,
                       description=description,
                       price=price,
                       promotion=promotion)
-                      # image=image_path)
-
-    if image:
-        product.image = image  # Django + Cloudinary fazem o upload automaticamente
 
     try:
-        product.full_clean()
-        product.save()
-        return product
+        # an image that is not valid rolls the product changes back too
+        with transaction.atomic():
+            product.full_clean()
+            product.save()
+            if image:
+                schedule_image_upload(product, image)  # uploaded in the background, image_status PENDING until then
     except ValidationError as e:
         raise NinjaValidationError(e.message_dict)
+    return product
 
 
 # --- DELETE (staff only) ---
@@ -103,12 +145,10 @@ def delete_product(request, uuid: str):
 @router.post("/{product_uuid}/upload-image", response=ProductOut, auth=AuthBearer())
 @staff_required
 def upload_product_image(request, product_uuid: UUID, image: UploadedFile = File(...)):
-    """Make upload or replace the product image"""
+    """Make upload or replace the product image (in the background: image_status stays PENDING until it is done)"""
     product = get_object_or_404(Product, uuid=product_uuid)
-    product.image = image  # Django + Cloudinary fazem o upload automaticamente
     try:
-        product.full_clean()
-        product.save()
-        return product
+        schedule_image_upload(product, image)
     except ValidationError as e:
         raise NinjaValidationError(e.message_dict)
+    return product
@@ -0,0 +1,29 @@
+from ninja import Router
+
+from accounts.cache import user_cache
+from accounts.passwords import password_hashing
+from accounts.tokens import revoked_token_stats
+from accounts.deps import ClaimsBearer
+from accounts.utils import token_cache_stats
+from api.profiling import route_stats
+from api.services.imageurls import image_url_stats
+from api.utils import staff_required
+
+router = Router(tags=["stats"], auth=ClaimsBearer())
+
+
+# --- READ (staff only) ---
+@router.get("/")
+@staff_required
+def get_stats(request):
+    """Per-route latency, query and serialization averages of this worker, cache hit rates and password pool load"""
+    return {
+        "routes": route_stats(),
+        "caches": {
+            "users": user_cache.stats(),
+            "tokens": token_cache_stats(),
+            "revoked_tokens": revoked_token_stats(),
+            "image_urls": image_url_stats(),
+        },
+        "password_hashing": password_hashing.stats(),
+    }
@@ -1,16 +1,31 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from ninja import Router
+from ninja.errors import HttpError
 from ninja.errors import ValidationError as NinjaValidationError
 
 from accounts.deps import AuthBearer  # your authentication via token
+from accounts.tokens import revoke_user_tokens
 from api.schemas.users import UserOut, UserUpdate, UserDeactivate, ChangePasswordIn
 
 User = get_user_model()
 router = Router(tags=["users"], auth=AuthBearer())
 
 
+def _locked_user(request):
+    """
+    The authenticated user read again and locked until the end of the transaction. request.auth
+    is a copy from the per-process user cache, possibly stale: saving it could write back an
+    old password or is_active, so the views that write start from this row
+    """
+    user = User.objects.select_for_update().get(pk=request.auth.pk)
+    if not user.is_active:
+        raise HttpError(401, "Unauthorized")
+    return user
+
+
 @router.get("/me", response=UserOut)
 def get_me(request):
     """Return the data of authenticated user"""
@@ -20,25 +35,28 @@ def get_me(request):
 @router.put("/me", response=UserOut)
 def update_me(request, data: UserUpdate):
     """Update the data of authenticated user"""
-    user = request.auth
-    for field, value in data.dict(exclude_unset=True).items():
-        setattr(user, field, value)
-    try:
-        user.full_clean()
-        user.save()
-        return user
-    except ValidationError as e:
-        raise NinjaValidationError(e.message_dict)
+    with transaction.atomic():
+        user = _locked_user(request)
+        for field, value in data.dict(exclude_unset=True).items():
+            setattr(user, field, value)
+        try:
+            user.full_clean()
+            user.save()
+            return user
+        except ValidationError as e:
+            raise NinjaValidationError(e.message_dict)
 
 
 @router.patch("/me")
 def deactivate_me(request, data: UserDeactivate):
     """Deactivate the authenticated user"""
-    user = request.auth
     if data.is_active:
         return {'message': 'Nothing changed, user remains active'}
-    user.is_active = data.is_active
-    user.save()
+    with transaction.atomic():
+        user = _locked_user(request)
+        user.is_active = data.is_active
+        user.save(update_fields=["is_active"])
+    revoke_user_tokens(user.id)
     return {'message': 'User successfully deactivated'}
 
 
@@ -56,11 +74,13 @@ def change_password(request, data: ChangePasswordIn):
     Allow the user to change their password
     Necessary to provide the current and new passwords
     """
-    user = request.auth
+    with transaction.atomic():
+        user = _locked_user(request)
 
-    if not check_password(data.old_password, user.password):
-        return {"success": False, "message": "Current password incorrect"}
+        if not check_password(data.old_password, user.password):
+            return {"success": False, "message": "Current password incorrect"}
 
-    user.set_password(data.new_password)
-    user.save()
+        user.set_password(data.new_password)
+        user.save(update_fields=["password"])
+    revoke_user_tokens(user.id)  # every session, this one included, logs in again with the new password
     return {"success": True, "message": "Password changed successfully"}
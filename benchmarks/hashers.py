@@ -0,0 +1,103 @@
+"""
+Password hasher benchmark: logins per second per worker core.
+
+A login spends almost all of its CPU verifying the password, so the time of one
+check_password() on one core is what bounds the logins a worker can serve. For every
+hasher of the stack (accounts.hashers) this measures that time with the configured
+costs, which can be overridden for a run:
+
+    python benchmarks/hashers.py
+    python benchmarks/hashers.py --argon2-memory-cost 65536 --argon2-time-cost 3
+    python benchmarks/hashers.py --hasher pbkdf2 --pbkdf2-iterations 600000 --output pbkdf2.json
+
+Hashers whose library is missing (bcrypt is optional) are skipped. Costs are applied
+through the same PASSWORD_* settings the application reads.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+# option -> setting (read from the environment when the settings module is imported)
+COSTS = {
+    "argon2_time_cost": "PASSWORD_ARGON2_TIME_COST",
+    "argon2_memory_cost": "PASSWORD_ARGON2_MEMORY_COST",
+    "argon2_parallelism": "PASSWORD_ARGON2_PARALLELISM",
+    "bcrypt_rounds": "PASSWORD_BCRYPT_ROUNDS",
+    "pbkdf2_iterations": "PASSWORD_PBKDF2_ITERATIONS",
+}
+
+
+def measure(hasher, iterations: int, warmup: int) -> dict:
+    encoded = hasher.encode("correct horse battery staple", hasher.salt())
+    for _ in range(warmup):
+        hasher.verify("correct horse battery staple", encoded)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        hasher.verify("correct horse battery staple", encoded)
+        timings.append(time.perf_counter() - started)
+    mean = statistics.fmean(timings)
+    return {
+        "algorithm": hasher.algorithm,
+        "params": {key: value for key, value in hasher.decode(encoded).items()
+                   if isinstance(value, int) or key == "variety"},
+        "mean_ms": round(mean * 1000, 2),
+        "p95_ms": round(sorted(timings)[min(len(timings) - 1, round(0.95 * (len(timings) - 1)))] * 1000, 2),
+        "logins_per_sec_per_core": round(1 / mean, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hasher", action="append", choices=["argon2", "bcrypt", "pbkdf2"],
+                        help="measure only these hashers (repeatable)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    for option in COSTS:
+        parser.add_argument(f"--{option.replace('_', '-')}", type=int)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    for option, setting in COSTS.items():
+        if getattr(args, option) is not None:
+            os.environ[setting] = str(getattr(args, option))
+
+    import django
+
+    django.setup()
+    from django.conf import settings
+    from django.contrib.auth.hashers import get_hashers
+
+    names = {"argon2": "argon2", "bcrypt_sha256": "bcrypt", "pbkdf2_sha256": "pbkdf2"}
+    results = []
+    for hasher in get_hashers():
+        name = names.get(hasher.algorithm)
+        if name is None or (args.hasher and name not in args.hasher):
+            continue
+        try:
+            if hasher.library:
+                hasher._load_library()
+        except ValueError as exc:
+            print(f"{name:8} skipped: {exc}")
+            continue
+        result = {"hasher": name, "preferred": name == settings.PASSWORD_HASHER,
+                  **measure(hasher, args.iterations, args.warmup)}
+        results.append(result)
+        print(f"{name:8} {result['mean_ms']:8.2f} ms/login (p95 {result['p95_ms']:.2f})  "
+              f"{result['logins_per_sec_per_core']:8.1f} logins/s/core  {result['params']}"
+              f"{'  <- PASSWORD_HASHER' if result['preferred'] else ''}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Concurrent-request load test, used to compare deployments of the same API.
+
+Start both servers against the same database, e.g.
+
+    gunicorn config.wsgi:application -w 4 -b 127.0.0.1:8000
+    CUPCAKE_DB_CONN_MAX_AGE=0 gunicorn config.asgi:application -w 4 -k uvicorn_worker.UvicornWorker -b 127.0.0.1:8001
+
+and run the same paths through each target (paths are relative to the target):
+
+    python benchmarks/loadtest.py \
+        --target wsgi=http://127.0.0.1:8000/api \
+        --target asgi=http://127.0.0.1:8001/api/async \
+        --path /products/ --path /order-items/ \
+        --token "$ACCESS_TOKEN" --concurrency 64 --requests 5000 --output loadtest.json
+
+Only the standard library is used, so it can run from any machine.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def run_target(base_url: str, paths: list[str], concurrency: int, total: int, token: str | None) -> dict:
+    """Fire `total` GET requests over `concurrency` keep-alive connections, cycling through paths"""
+    url = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    errors = 0
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        connection = connection_class(url.netloc, timeout=30)
+        while True:
+            with lock:
+                number = next(counter, None)
+            if number is None:
+                break
+            path = url.path.rstrip("/") + paths[number % len(paths)]
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = connection_class(url.netloc, timeout=30)
+                with lock:
+                    errors += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "duration_s": round(duration, 3),
+        "requests_per_s": round(len(latencies) / duration, 1) if duration else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(_percentile(latencies, 50) * 1000, 2),
+            "p95": round(_percentile(latencies, 95) * 1000, 2),
+            "p99": round(_percentile(latencies, 99) * 1000, 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", required=True, metavar="NAME=BASE_URL")
+    parser.add_argument("--path", action="append", required=True)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--token", help="access token sent as Authorization: Bearer")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for target in args.target:
+        name, _, base_url = target.partition("=")
+        results[name] = run_target(base_url, args.path, args.concurrency, args.requests, args.token)
+
+    print(f"{'target':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        print(f"{name:<12}{result['requests_per_s']:>10}{latency['p50']:>10}{latency['p95']:>10}"
+              f"{latency['p99']:>10}{result['errors']:>8}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"concurrency": args.concurrency, "paths": args.path, "results": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Seed realistic volumes of users, delivery addresses, products, orders and order items.
+
+Rows are written with bulk_create, sharing one password hash, so seeding a few
+thousand orders takes seconds. Used by benchmarks/suite.py against its test database.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from api.models import DeliveryAddress, Order, OrderItem, Product
+from api.services.ordernumbers import order_numbers
+
+User = get_user_model()
+
+PASSWORD = "benchpass123"
+BATCH_SIZE = 1000
+
+
+def seed(users=200, products=500, orders_per_user=10, items_per_order=5, seed_value=42) -> dict:
+    """Create the rows and return the volumes and the staff/customer usernames to log in with"""
+    rng = random.Random(seed_value)
+    password = make_password(PASSWORD)
+
+    User.objects.bulk_create(
+        [User(username="bench_staff", email="staff@bench.local", password=password, is_staff=True)]
+        + [
+            User(username=f"bench_user_{n}", email=f"user{n}@bench.local", password=password,
+                 first_name="Bench", last_name=f"User {n}", cpf=f"{n:011d}")
+            for n in range(users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    customers = list(User.objects.filter(username__startswith="bench_user_").order_by("id"))
+
+    DeliveryAddress.objects.bulk_create(
+        [
+            DeliveryAddress(user=user, address_name="Casa", address_description=f"Rua {user.id}, 100",
+                            city="São Paulo", state="SP", zip_code="01000000")
+            for user in customers
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    addresses = {address.user_id: address for address in DeliveryAddress.objects.all()}
+
+    Product.objects.bulk_create(
+        [
+            Product(name=f"Cupcake {n}", description="Massa de baunilha com cobertura de chocolate",
+                    price=Decimal(rng.randrange(500, 3000)) / 100, promotion=n % 10 == 0)
+            for n in range(products)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    product_rows = list(Product.objects.values_list("id", "price"))
+
+    statuses = list(Order.OrderStatus.values)
+    methods = list(Order.PaymentMethod.values)
+    numbers = iter(order_numbers.reserve(len(customers) * orders_per_user))
+    Order.objects.bulk_create(
+        [
+            Order(user=user, delivery_address=addresses[user.id], order_number=next(numbers),
+                  payment_method=rng.choice(methods), status=rng.choice(statuses))
+            for user in customers
+            for _ in range(orders_per_user)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    items = []
+    for order_id in Order.objects.values_list("id", flat=True):
+        for product_id, price in rng.sample(product_rows, min(items_per_order, len(product_rows))):
+            items.append(OrderItem(order_id=order_id, product_id=product_id,
+                                   quantity=rng.randint(1, 6), unit_price=price))
+    OrderItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+
+    return {
+        "volumes": {
+            "users": users + 1,
+            "delivery_addresses": len(addresses),
+            "products": products,
+            "orders": users * orders_per_user,
+            "order_items": len(items),
+        },
+        "staff_username": "bench_staff",
+        "customer_username": customers[0].username,
+        "password": PASSWORD,
+    }
@@ -0,0 +1,242 @@
+"""
+Benchmark suite for the API hot paths.
+
+Creates a throwaway test database (same engine as the configured one), seeds it with
+benchmarks/seed.py and runs each scenario through Django's test client, measuring:
+
+  * latency (mean, p50, p95, max) over the timed iterations
+  * SQL queries per request
+  * memory allocated per request and peak, with tracemalloc (separate, untimed pass)
+
+Results are written as JSON so two commits can be compared:
+
+    python benchmarks/suite.py --output before.json
+    git checkout my-branch
+    python benchmarks/suite.py --output after.json --compare before.json
+
+--compare prints the change of every metric and exits with status 1 when a scenario's
+p50 latency, queries or allocations grow more than --threshold percent.
+Run it with the production settings (PostgreSQL) for numbers that mean something.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_databases, setup_test_environment, \
+    teardown_databases  # noqa: E402
+
+from api.models import DeliveryAddress, Order, Product  # noqa: E402
+from seed import seed  # noqa: E402
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _login(client: Client, username: str, password: str) -> dict:
+    response = client.post("/api/auth/login", {"username": username, "password": password},
+                           content_type="application/json", secure=True)
+    assert response.status_code == 200, response.content
+    return {"HTTP_AUTHORIZATION": f"Bearer {response.json()['access']}"}
+
+
+def build_scenarios(client: Client, seeded: dict) -> dict:
+    """Name -> (callable issuing one request, prepare callable run untimed before each one)"""
+    password = seeded["password"]
+    customer = _login(client, seeded["customer_username"], password)
+    staff = _login(client, seeded["staff_username"], password)
+
+    address = DeliveryAddress.objects.filter(user__username=seeded["customer_username"]).first()
+    cart_order = Order.objects.create(user=address.user, delivery_address=address, payment_method="PIX")
+    products = [str(uuid) for uuid in Product.objects.values_list("uuid", flat=True)[:20]]
+    # alternate between two carts that overlap: each sync creates, updates and deletes items
+    carts = [
+        [{"product_uuid": uuid, "quantity": 2} for uuid in products[:12]],
+        [{"product_uuid": uuid, "quantity": 3} for uuid in products[6:18]],
+    ]
+    turn = iter(range(10 ** 9))
+
+    def request(method, path, headers=None, body=None, status=200):
+        def call():
+            if body is None:
+                response = getattr(client, method)(path, secure=True, **(headers or {}))
+            else:
+                payload = body() if callable(body) else body
+                response = getattr(client, method)(path, payload, content_type="application/json", secure=True,
+                                                   **(headers or {}))
+            assert response.status_code == status, (path, response.status_code, response.content[:200])
+            # consume streamed bodies as a real client would (secure=True: production settings redirect to HTTPS)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return call
+
+    return {
+        "login": (request("post", "/api/auth/login", body={"username": seeded["customer_username"],
+                                                             "password": password}), None),
+        "products_list": (request("get", "/api/products/"), cache.clear),
+        "products_list_cached": (request("get", "/api/products/"), None),
+        "order_items_list": (request("get", "/api/order-items/", customer), None),
+        "order_items_list_staff": (request("get", "/api/order-items/admin", staff), None),
+        "cart_sync": (request("post", "/api/order-items/bulk", customer,
+                              body=lambda: {"order_uuid": str(cart_order.uuid), "items": carts[next(turn) % 2]}),
+                      None),
+        "order_create": (request("post", "/api/orders/", customer,
+                                 body={"payment_method": "PIX", "delivery_address_uuid": str(address.uuid)}),
+                         None),
+    }
+
+
+def measure(call, prepare, iterations: int, warmup: int, traced: int) -> dict:
+    for _ in range(warmup):
+        if prepare:
+            prepare()
+        call()
+
+    latencies, queries = [], []
+    for _ in range(iterations):
+        if prepare:
+            prepare()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            call()
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+
+    allocated, peaks = [], []
+    for _ in range(traced):
+        if prepare:
+            prepare()
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        call()
+        after, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        allocated.append(after - before)
+        peaks.append(peak - before)
+
+    return {
+        "iterations": iterations,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3),
+            "p50": round(_percentile(latencies, 50), 3),
+            "p95": round(_percentile(latencies, 95), 3),
+            "max": round(max(latencies), 3),
+        },
+        "queries": {"min": min(queries), "max": max(queries)},
+        "memory_kib": {
+            "retained": round(statistics.median(allocated) / 1024, 1) if allocated else None,
+            "peak": round(statistics.median(peaks) / 1024, 1) if peaks else None,
+        },
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """Print the change of each metric; return True when any of them regressed over the threshold"""
+    regressed = False
+    print(f"\n{'scenario':<26}{'metric':<14}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            print(f"{name:<26}(new scenario)")
+            continue
+        for label, old, new in (
+            ("p50 ms", previous["latency_ms"]["p50"], current["latency_ms"]["p50"]),
+            ("queries", previous["queries"]["max"], current["queries"]["max"]),
+            ("peak KiB", previous["memory_kib"]["peak"], current["memory_kib"]["peak"]),
+        ):
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else (0.0 if new == old else float("inf"))
+            flag = ""
+            if change > threshold:
+                regressed = True
+                flag = "  <-- regression"
+            print(f"{name:<26}{label:<14}{old:>12}{new:>12}{change:>+9.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--orders-per-user", type=int, default=10)
+    parser.add_argument("--items-per-order", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--traced", type=int, default=3, help="untimed iterations run under tracemalloc")
+    parser.add_argument("--scenario", action="append", help="run only these scenarios (repeatable)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare the results with")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    databases = setup_databases(verbosity=0, interactive=False)
+    try:
+        started = time.perf_counter()
+        seeded = seed(args.users, args.products, args.orders_per_user, args.items_per_order)
+        print(f"seeded {seeded['volumes']} in {time.perf_counter() - started:.1f}s")
+
+        client = Client()
+        scenarios = build_scenarios(client, seeded)
+        results = {
+            "meta": {
+                "commit": _commit(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "volumes": seeded["volumes"],
+            },
+            "scenarios": {},
+        }
+        for name, (call, prepare) in scenarios.items():
+            if args.scenario and name not in args.scenario:
+                continue
+            result = measure(call, prepare, args.iterations, args.warmup, args.traced)
+            results["scenarios"][name] = result
+            print(f"{name:<26}p50 {result['latency_ms']['p50']:>9.2f} ms   p95 {result['latency_ms']['p95']:>9.2f} ms"
+                  f"   queries {result['queries']['max']:>4}   peak {result['memory_kib']['peak']:>9} KiB")
+    finally:
+        teardown_databases(databases, verbosity=0)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,13 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Production entrypoint (serves the whole API; the async read endpoints live under /api/async/):
+
+    gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker
+
+Run it with CUPCAKE_DB_CONN_MAX_AGE=0: persistent connections are not reused across the
+threads async views run their queries on.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -80,12 +81,72 @@ STORAGES = {
 
 MEDIA_URL = '/media/'
 
+# Product images are spooled to local disk and sent to the storage backend by a thread pool
+# (api.services.images), so a slow upload never holds a request. IMAGE_UPLOAD_ASYNC=False
+# uploads inline once the request's transaction commits.
+IMAGE_SPOOL_DIR = os.getenv('IMAGE_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'cupcake-image-spool'))
+IMAGE_UPLOAD_ASYNC = os.getenv('IMAGE_UPLOAD_ASYNC', 'True') == 'True'
+IMAGE_UPLOAD_WORKERS = int(os.getenv('IMAGE_UPLOAD_WORKERS', 2))
+IMAGE_UPLOAD_RETRIES = int(os.getenv('IMAGE_UPLOAD_RETRIES', 3))
+IMAGE_UPLOAD_RETRY_DELAY = float(os.getenv('IMAGE_UPLOAD_RETRY_DELAY', 1))   # seconds, doubled on each retry
+
+# Per-process memo of image URLs (api.services.imageurls): stored names never change once
+# uploaded, so the storage backend builds each URL once instead of once per listed row.
+IMAGE_URL_CACHE_SIZE = int(os.getenv('IMAGE_URL_CACHE_SIZE', 4096))
+IMAGE_URL_CACHE_TTL = int(os.getenv('IMAGE_URL_CACHE_TTL', 3600))
+
 AUTH_USER_MODEL = "accounts.User"
 
 ACCESS_TOKEN_LIFETIME_MINUTES = 60   # 1 hour
 REFRESH_TOKEN_LIFETIME_DAYS = 7      # 7 days
 
+# Access tokens also carry uuid, is_staff and the user's security version, so routes
+# authenticated by ClaimsBearer (accounts.deps) never load the user row. The version is
+# read from the Django cache (kept AUTH_USER_CACHE_TTL seconds, or for good with
+# AUTH_USER_CACHE_SHARED); deactivating a user or changing is_staff bumps it.
+ACCESS_TOKEN_CLAIMS = os.getenv('ACCESS_TOKEN_CLAIMS', 'False') == 'True'
+
+# Per-process cache of authenticated users (accounts.cache); 0 seconds disables it.
+# AUTH_USER_CACHE_SHARED keeps version stamps in the Django cache so that changes made
+# by one worker are seen by the others right away (needs a shared CACHES backend).
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 1024))
+AUTH_USER_CACHE_SHARED = os.getenv('AUTH_USER_CACHE_SHARED', 'False') == 'True'
+
+# Decoded JWT payloads kept in memory until the token expires (accounts.utils.decode_token)
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 4096))
+
+# Used and revoked refresh tokens/families kept in memory (accounts.tokens), so replays and
+# refreshes of logged-out sessions are refused without a database round trip
+REVOKED_TOKEN_CACHE_SIZE = int(os.getenv('REVOKED_TOKEN_CACHE_SIZE', 16384))
+
+# Cache shared by all workers when REDIS_URL is set (catalog versions, user version stamps);
+# otherwise each process keeps its own local memory cache.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+# Public product endpoints (api.services.catalog): seconds a cached response is kept and
+# max-age sent to clients, who revalidate with If-None-Match
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 300))
+CATALOG_CACHE_MAX_AGE = int(os.getenv('CATALOG_CACHE_MAX_AGE', 0))
+
+# Keyset pagination of listings (?limit= is capped at PAGINATION_MAX_PAGE_SIZE)
+PAGINATION_PAGE_SIZE = int(os.getenv('PAGINATION_PAGE_SIZE', 50))
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv('PAGINATION_MAX_PAGE_SIZE', 200))
+
+# Staff exports stream every matching row, read from the database EXPORT_CHUNK_SIZE rows at a time
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 500))
+
+# Order numbers reserved per worker on each sequence round trip (1 keeps numbering strictly sequential)
+ORDER_NUMBER_BLOCK_SIZE = int(os.getenv('ORDER_NUMBER_BLOCK_SIZE', 1))
+
 MIDDLEWARE = [
+    'api.profiling.request_profiling_middleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -97,6 +158,11 @@ MIDDLEWARE = [
     'ninja.compatibility.files.fix_request_files_middleware',
 ]
 
+# Request profiling (api.profiling): Server-Timing headers with query count, DB, serialization
+# and total time, and failing routes that run more queries than their @query_budget
+REQUEST_PROFILING_HEADERS = os.getenv('REQUEST_PROFILING_HEADERS', str(DEBUG)) == 'True'
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -133,6 +199,29 @@ DATABASES = {
 }
 
 
+# Password hashing (accounts.hashers). PASSWORD_HASHER (argon2, bcrypt or pbkdf2) hashes new
+# passwords; the other hashers still verify older hashes, which are rehashed with the preferred
+# hasher and costs on the next successful login. Tune the costs against logins/s with
+# benchmarks/hashers.py. The Argon2 defaults are OWASP's minimum (19 MiB, 2 passes, 1 lane);
+# Django's own (100 MiB, 8 lanes) hold 100 MiB per concurrent login.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'argon2')
+PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', 19456))   # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv('PASSWORD_ARGON2_PARALLELISM', 1))
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))   # needs: pip install bcrypt
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 1_000_000))
+_HASHERS = {
+    'argon2': 'accounts.hashers.Argon2PasswordHasher',
+    'bcrypt': 'accounts.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'accounts.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_HASHERS[PASSWORD_HASHER]] + [path for name, path in _HASHERS.items() if name != PASSWORD_HASHER]
+
+# Async auth endpoints (/api/async/auth/, accounts.passwords) hash on a pool of
+# PASSWORD_HASH_WORKERS threads; beyond PASSWORD_HASH_QUEUE_SIZE waiting jobs they answer 503.
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 16))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
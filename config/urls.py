@@ -19,9 +19,11 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path
 
+from api.views.aio.api import async_api
 from api.views.api import api
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/async/', async_api.urls),   # async read endpoints (ASGI)
     path('api/', api.urls),   # API route
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
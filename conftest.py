@@ -1,8 +1,18 @@
 import os
+
 import django
+import pytest
 from django.conf import settings
 
 
 def pytest_configure():
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
     django.setup()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Each test starts with an empty Django cache (catalog responses, version stamps)"""
+    from django.core.cache import cache
+
+    cache.clear()